@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+import tarfile
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from storage import list_data_files, read_jsonl_session, write_json_atomic
+
+
+# A bundle is an uncompressed tar of gzip-compressed JSONL chunks plus manifest.json.
+# Each chunk line is {"path": <path relative to the data dir>, "document": <session document>};
+# voice recordings are stored as they are, under audio/<path relative to the data dir>
+FORMAT_VERSION = 2
+# Version 1 bundles have no recordings
+READABLE_VERSIONS = (1, 2)
+BUNDLE_PREFIX = "biographer-backup-"
+MANIFEST_NAME = "manifest.json"
+AUDIO_PREFIX = "audio/"
+
+
+def file_state(filepath: str) -> List[int]:
+    stat = os.stat(filepath)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def read_document(filepath: str) -> Dict:
+    """Read a session file as stored (JSONL logs in the session document layout)"""
+    if filepath.endswith('.jsonl'):
+        return read_jsonl_session(filepath)
+    with open(filepath, 'r', encoding='utf-8-sig') as f:
+        return json.load(f)
+
+
+def list_audio_files(data_dir: str) -> List[str]:
+    """List the voice recordings kept next to the sessions, in <session>.audio directories"""
+    files = []
+    for subdir in ("bio", "general"):
+        session_dir = os.path.join(data_dir, subdir)
+        if not os.path.isdir(session_dir):
+            continue
+        for name in os.listdir(session_dir):
+            audio_dir = os.path.join(session_dir, name)
+            if name.endswith('.audio') and os.path.isdir(audio_dir):
+                files.extend(os.path.join(audio_dir, f) for f in os.listdir(audio_dir))
+    return files
+
+
+def file_digest(f) -> str:
+    digest = hashlib.sha256()
+    for block in iter(lambda: f.read(1 << 20), b''):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def manifest_path(bundle_path: str) -> str:
+    """Manifest copy kept next to a bundle, so incremental exports need not open the previous bundle"""
+    return bundle_path[:-len('.tar')] + '.manifest.json'
+
+
+def read_manifest(bundle_path: str) -> Dict:
+    """Read the manifest of a bundle"""
+    with tarfile.open(bundle_path, 'r') as tar:
+        return json.load(tar.extractfile(MANIFEST_NAME))
+
+
+def latest_bundle(output_dir: str) -> Optional[str]:
+    """Find the most recent bundle in a backup directory"""
+    if not os.path.isdir(output_dir):
+        return None
+    bundles = sorted(f for f in os.listdir(output_dir) if f.startswith(BUNDLE_PREFIX) and f.endswith('.tar'))
+    return os.path.join(output_dir, bundles[-1]) if bundles else None
+
+
+class ChunkWriter:
+    """Stream records into gzip JSONL chunks added to a tar archive one by one"""
+
+    def __init__(self, tar: tarfile.TarFile, chunk_bytes: int, compresslevel: int = 6):
+        self.tar = tar
+        self.chunk_bytes = chunk_bytes
+        self.compresslevel = compresslevel
+        self.chunks = []
+        self._tmp = None
+        self._gzip = None
+        self._records = 0
+        self._raw_bytes = 0
+
+    def write(self, record: Dict):
+        if self._gzip is None:
+            self._tmp = tempfile.TemporaryFile()
+            self._gzip = gzip.GzipFile(fileobj=self._tmp, mode='wb', compresslevel=self.compresslevel, mtime=0)
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+        self._gzip.write(line)
+        self._records += 1
+        self._raw_bytes += len(line)
+        if self._raw_bytes >= self.chunk_bytes:
+            self.flush()
+
+    def flush(self):
+        """Finish the current chunk and add it to the archive"""
+        if self._gzip is None:
+            return
+        self._gzip.close()
+        size = self._tmp.tell()
+        self._tmp.seek(0)
+        digest = hashlib.sha256()
+        for block in iter(lambda: self._tmp.read(1 << 20), b''):
+            digest.update(block)
+        self._tmp.seek(0)
+
+        name = f"chunks/{len(self.chunks):05d}.jsonl.gz"
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(datetime.now().timestamp())
+        self.tar.addfile(info, self._tmp)
+        self._tmp.close()
+        self.chunks.append({"name": name, "sha256": digest.hexdigest(), "records": self._records, "bytes": size})
+        self._tmp = self._gzip = None
+        self._records = self._raw_bytes = 0
+
+    def discard(self):
+        """Drop the chunk being written without adding it to the archive"""
+        if self._gzip is None:
+            return
+        self._gzip.close()
+        self._tmp.close()
+        self._tmp = self._gzip = None
+
+
+def export_archive(data_dir: str, output_dir: str, full: bool = False, chunk_bytes: int = 32 << 20,
+                   verify: bool = True) -> Optional[str]:
+    """Write the sessions changed since the last bundle (or all of them) into a new bundle"""
+    os.makedirs(output_dir, exist_ok=True)
+    previous = None if full else latest_bundle(output_dir)
+    previous_manifest = None
+    if previous:
+        try:
+            with open(manifest_path(previous), 'r', encoding='utf-8') as f:
+                previous_manifest = json.load(f)
+        except (OSError, ValueError):
+            previous_manifest = read_manifest(previous)
+
+    # Catalog of every session at export time and the bundle that holds its current version
+    previous_sessions = previous_manifest["sessions"] if previous_manifest else {}
+    previous_audio = previous_manifest.get("audio", {}) if previous_manifest else {}
+    created = datetime.now()
+    name = f"{BUNDLE_PREFIX}{created.strftime('%Y%m%d-%H%M%S')}"
+    bundle_path = os.path.join(output_dir, name + ".tar")
+    suffix = 1
+    while os.path.exists(bundle_path):
+        # Names sort in creation order, which latest_bundle relies on
+        suffix += 1
+        bundle_path = os.path.join(output_dir, f"{name}_{suffix}.tar")
+    name = os.path.basename(bundle_path)[:-len('.tar')]
+    sessions = {}
+    changed = []
+    for filepath in sorted(list_data_files(data_dir)):
+        relative = os.path.relpath(filepath, data_dir).replace(os.sep, '/')
+        try:
+            state = file_state(filepath)
+        except OSError:
+            continue
+        known = previous_sessions.get(relative)
+        if known and known["state"] == state:
+            sessions[relative] = known
+        else:
+            sessions[relative] = {"state": state, "bundle": name}
+            changed.append((relative, filepath))
+
+    audio = {}
+    changed_audio = []
+    for filepath in sorted(list_audio_files(data_dir)):
+        relative = os.path.relpath(filepath, data_dir).replace(os.sep, '/')
+        try:
+            state = file_state(filepath)
+        except OSError:
+            continue
+        known = previous_audio.get(relative)
+        if known and known["state"] == state:
+            audio[relative] = known
+        else:
+            changed_audio.append((relative, filepath, state))
+
+    if (previous_manifest and not changed and not changed_audio and set(previous_sessions) == set(sessions)
+            and set(previous_audio) == set(audio)):
+        print("Nothing changed since the last backup")
+        return None
+
+    tmp_path = bundle_path + ".tmp"
+    writer = None
+    try:
+        with tarfile.open(tmp_path, 'w') as tar:
+            writer = ChunkWriter(tar, chunk_bytes)
+            exported = 0
+            for relative, filepath in changed:
+                # A session that cannot be read fails the backup rather than going missing from it
+                try:
+                    document = read_document(filepath)
+                except (OSError, ValueError) as e:
+                    raise ValueError(f"Cannot back up {filepath}: {e}") from e
+                writer.write({"path": relative, "document": document})
+                exported += 1
+            writer.flush()
+
+            for relative, filepath, state in changed_audio:
+                with open(filepath, 'rb') as f:
+                    sha256 = file_digest(f)
+                    info = tar.gettarinfo(fileobj=f, arcname=AUDIO_PREFIX + relative)
+                    f.seek(0)
+                    tar.addfile(info, f)
+                audio[relative] = {"state": state, "bundle": name, "sha256": sha256}
+
+            manifest = {
+                "format_version": FORMAT_VERSION,
+                "name": name,
+                "created": created.isoformat(),
+                "base": os.path.basename(previous) if previous_manifest else None,
+                "exported_sessions": exported,
+                "total_sessions": len(sessions),
+                "exported_audio": len(changed_audio),
+                "chunks": writer.chunks,
+                "sessions": sessions,
+                "audio": audio
+            }
+            manifest_bytes = json.dumps(manifest, ensure_ascii=False).encode('utf-8')
+            info = tarfile.TarInfo(MANIFEST_NAME)
+            info.size = len(manifest_bytes)
+            info.mtime = int(created.timestamp())
+            tar.addfile(info, io.BytesIO(manifest_bytes))
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if verify:
+        problems = verify_archive(tmp_path)
+        if problems:
+            os.remove(tmp_path)
+            raise ValueError(f"Verification of {bundle_path} failed: {'; '.join(problems)}")
+    os.replace(tmp_path, bundle_path)
+    write_json_atomic(manifest_path(bundle_path), manifest)
+    print(f"Exported {exported} of {len(sessions)} sessions and {len(changed_audio)} of {len(audio)} recordings "
+          f"to {bundle_path}")
+    return bundle_path
+
+
+def iter_records(bundle_path: str, manifest: Dict = None) -> Iterator[Dict]:
+    """Stream the records of a bundle chunk by chunk, checking each chunk's checksum"""
+    with tarfile.open(bundle_path, 'r') as tar:
+        manifest = manifest or json.load(tar.extractfile(MANIFEST_NAME))
+        for chunk in manifest["chunks"]:
+            raw = tar.extractfile(chunk["name"])
+            digest = hashlib.sha256()
+            with tempfile.TemporaryFile() as tmp:
+                for block in iter(lambda: raw.read(1 << 20), b''):
+                    digest.update(block)
+                    tmp.write(block)
+                if digest.hexdigest() != chunk["sha256"]:
+                    raise ValueError(f"Checksum mismatch in {chunk['name']}")
+                tmp.seek(0)
+                with gzip.GzipFile(fileobj=tmp, mode='rb') as lines:
+                    for line in lines:
+                        yield json.loads(line)
+
+
+def verify_archive(bundle_path: str) -> List[str]:
+    """Check a bundle's checksums, record counts and records; return the problems found"""
+    problems = []
+    try:
+        with tarfile.open(bundle_path, 'r') as tar:
+            manifest = json.load(tar.extractfile(MANIFEST_NAME))
+            names = set(tar.getnames())
+    except (OSError, ValueError, KeyError, tarfile.TarError) as e:
+        return [f"unreadable bundle: {e}"]
+
+    if manifest.get("format_version") not in READABLE_VERSIONS:
+        problems.append(f"unsupported format version {manifest.get('format_version')}")
+    for chunk in manifest["chunks"]:
+        if chunk["name"] not in names:
+            problems.append(f"missing {chunk['name']}")
+    problems.extend(verify_audio(bundle_path, manifest, names))
+
+    counted = 0
+    try:
+        for record in iter_records(bundle_path, manifest):
+            if "path" not in record or "document" not in record:
+                problems.append(f"malformed record after {counted} records")
+                break
+            counted += 1
+    except (OSError, ValueError, EOFError, tarfile.TarError) as e:
+        problems.append(str(e))
+    expected = sum(chunk["records"] for chunk in manifest["chunks"])
+    if not problems and counted != expected:
+        problems.append(f"{counted} records, manifest lists {expected}")
+    return problems
+
+
+def verify_audio(bundle_path: str, manifest: Dict, names: set) -> List[str]:
+    """Check the checksums of the recordings stored in a bundle"""
+    problems = []
+    stored = [(relative, entry) for relative, entry in manifest.get("audio", {}).items()
+              if entry["bundle"] == manifest["name"]]
+    if not stored:
+        return problems
+    try:
+        with tarfile.open(bundle_path, 'r') as tar:
+            for relative, entry in stored:
+                member = AUDIO_PREFIX + relative
+                if member not in names:
+                    problems.append(f"missing {member}")
+                elif file_digest(tar.extractfile(member)) != entry["sha256"]:
+                    problems.append(f"checksum mismatch in {member}")
+    except (OSError, tarfile.TarError) as e:
+        problems.append(str(e))
+    return problems
+
+
+def bundle_chain(bundle_path: str) -> List[Tuple[str, Dict]]:
+    """Get the bundles an incremental bundle builds on, oldest first"""
+    chain = []
+    path = bundle_path
+    while path:
+        manifest = read_manifest(path)
+        chain.append((path, manifest))
+        base = manifest.get("base")
+        path = os.path.join(os.path.dirname(bundle_path), base) if base else None
+        if path and not os.path.exists(path):
+            raise FileNotFoundError(f"Base bundle {base} of {os.path.basename(bundle_path)} is missing")
+    return list(reversed(chain))
+
+
+def import_archive(bundle_path: str, data_dir: str, overwrite: bool = False) -> int:
+    """Restore the sessions of a bundle (and the bundles it builds on) into a data directory"""
+    chain = bundle_chain(bundle_path)
+    # The newest bundle's catalog says which bundle holds the current version of each session
+    catalog = chain[-1][1]["sessions"]
+    audio_catalog = chain[-1][1].get("audio", {})
+    restored = 0
+    restored_audio = 0
+    for path, manifest in chain:
+        restored_audio += restore_audio(path, manifest["name"], audio_catalog, data_dir, overwrite)
+        for record in iter_records(path, manifest):
+            relative = record["path"]
+            entry = catalog.get(relative)
+            if entry is None or entry["bundle"] != manifest["name"]:
+                continue
+            # Open JSONL logs are restored in the compacted JSON layout
+            if relative.endswith('.jsonl'):
+                relative = relative[:-len('.jsonl')] + '.json'
+            target = os.path.join(data_dir, *relative.split('/'))
+            if os.path.exists(target) and not overwrite:
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            write_json_atomic(target, record["document"])
+            restored += 1
+    print(f"Restored {restored} sessions and {restored_audio} recordings into {data_dir}")
+    return restored
+
+
+def restore_audio(bundle_path: str, bundle_name: str, audio_catalog: Dict, data_dir: str, overwrite: bool) -> int:
+    """Extract the recordings whose current version a bundle holds"""
+    stored = [relative for relative, entry in audio_catalog.items() if entry["bundle"] == bundle_name]
+    if not stored:
+        return 0
+    restored = 0
+    with tarfile.open(bundle_path, 'r') as tar:
+        for relative in stored:
+            target = os.path.join(data_dir, *relative.split('/'))
+            if os.path.exists(target) and not overwrite:
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = target + ".tmp"
+            with tar.extractfile(AUDIO_PREFIX + relative) as source, open(tmp_path, 'wb') as f:
+                for block in iter(lambda: source.read(1 << 20), b''):
+                    f.write(block)
+            os.replace(tmp_path, target)
+            restored += 1
+    return restored
+
+
+def main():
+    """Export, import or verify backup bundles of the data directory"""
+    parser = argparse.ArgumentParser(description="Back up and restore biographer sessions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="write sessions changed since the last backup")
+    export_parser.add_argument("--data-dir", default="data")
+    export_parser.add_argument("--output-dir", default="backups")
+    export_parser.add_argument("--full", action="store_true", help="export all sessions, not only changes")
+    export_parser.add_argument("--chunk-mb", type=int, default=32, help="uncompressed size of each chunk")
+    export_parser.add_argument("--no-verify", action="store_true", help="skip verifying the written bundle")
+
+    import_parser = subparsers.add_parser("import", help="restore sessions from a bundle and its base bundles")
+    import_parser.add_argument("bundle")
+    import_parser.add_argument("--data-dir", default="data")
+    import_parser.add_argument("--overwrite", action="store_true", help="replace existing session files")
+
+    verify_parser = subparsers.add_parser("verify", help="check the checksums and records of a bundle")
+    verify_parser.add_argument("bundle")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        try:
+            export_archive(args.data_dir, args.output_dir, args.full, args.chunk_mb << 20, not args.no_verify)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    elif args.command == "import":
+        import_archive(args.bundle, args.data_dir, args.overwrite)
+    else:
+        problems = verify_archive(args.bundle)
+        for problem in problems:
+            print(f"Error: {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"{args.bundle} is valid")
+
+
+if __name__ == "__main__":
+    main()
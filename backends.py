@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Backend implementations are imported by create_backend, so the HTTP client of the backend
+# that is not configured is never loaded
+BACKENDS = ("ollama", "openai")
+
+
+class LLMBackend:
+    """Chat and embedding server used by the biographer, with retries and model fallback.
+
+    Streamed chat chunks use Ollama's shape: chunk['message']['content'] with the text, and a final
+    chunk with done=True and, where the server reports them, eval_count and prompt_eval_count."""
+
+    def __init__(self, model_name: str, fallback_name: str = None, retries: int = 2, retry_backoff: float = 0.5,
+                 options: Optional[Dict] = None):
+        self.model = model_name
+        self.fallback_name = fallback_name
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        # Model options sent with every request
+        self.options = options or {}
+        self._model_lock = threading.Lock()
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Check whether a failed request is worth retrying"""
+        return isinstance(error, ConnectionError)
+
+    def is_missing_model(self, error: Exception) -> bool:
+        """Check whether a request failed because the model is not installed"""
+        return False
+
+    def switch_to_fallback(self, error: Exception, model: str) -> bool:
+        """Switch to the fallback model if the main model is not available"""
+        if not self.is_missing_model(error):
+            return False
+        with self._model_lock:
+            if model != self.model or not self.fallback_name or self.model == self.fallback_name:
+                return False
+            print(f"Model '{self.model}' is not available, switching to '{self.fallback_name}'")
+            self.model = self.fallback_name
+            return True
+
+    def _with_retries(self, request, model: str = None, fallback: bool = True):
+        """Run a request with retry-with-backoff, and with fallback to the fallback model for requests to the
+        current chat model (no explicit model) unless fallback is False"""
+        attempt = 0
+        while True:
+            current_model = model or self.model
+            try:
+                return request(current_model)
+            except Exception as e:
+                if fallback and model is None and self.switch_to_fallback(e, current_model):
+                    continue
+                if attempt >= self.retries or not self.is_retryable(e):
+                    raise
+                time.sleep(self.retry_backoff * (2 ** attempt))
+                attempt += 1
+
+    def _stream_with_retries(self, open_stream, model: str = None) -> Iterator:
+        """Open a stream with retries; it is retried until its first chunk arrives"""
+        def request(current_model):
+            # Streams send the request lazily - pull the first chunk so failures surface here
+            chunks = iter(open_stream(current_model))
+            return next(chunks, None), chunks
+
+        first_chunk, chunks = self._with_retries(request, model)
+        return self._resume_stream(first_chunk, chunks)
+
+    def _resume_stream(self, first_chunk, chunks) -> Iterator:
+        if first_chunk is not None:
+            yield first_chunk
+        yield from chunks
+
+    def model_names(self) -> List[str]:
+        """Names of the models available on the server"""
+        raise NotImplementedError
+
+    def resolve_model(self):
+        """Use the fallback model right away if the main model is not installed"""
+        available = set()
+        for name in self.model_names():
+            available.add(name)
+            if name.endswith(':latest'):
+                available.add(name[:-len(':latest')])
+        if self.model not in available and self.fallback_name in available:
+            print(f"Model '{self.model}' is not installed, using '{self.fallback_name}'")
+            self.model = self.fallback_name
+
+    def chat(self, model: str = None, messages: List[Dict] = None, stream: bool = False, **kwargs):
+        """Chat with the current model"""
+        raise NotImplementedError
+
+    def embed(self, model: str, input, **kwargs) -> Dict:
+        """Embed texts with an embedding model; the result has an 'embeddings' list"""
+        raise NotImplementedError
+
+    def warm_up(self, extra_models: List[str] = None):
+        """Load the models into memory so the first real request does not pay the load time"""
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """OpenAI-compatible chat server (llama.cpp server, vLLM, LM Studio) over pooled HTTP with SSE streaming"""
+
+    # Ollama options with an OpenAI equivalent; the rest (num_ctx) are set when the server starts
+    OPTION_NAMES = {"temperature": "temperature", "seed": "seed", "top_p": "top_p", "num_predict": "max_tokens",
+                    "stop": "stop", "presence_penalty": "presence_penalty", "frequency_penalty": "frequency_penalty"}
+
+    def __init__(self, model_name: str, fallback_name: str = None, client_config: Optional[Dict] = None,
+                 options: Optional[Dict] = None):
+        import requests
+
+        client_config = client_config or {}
+        super().__init__(model_name, fallback_name, client_config.get("retries", 2),
+                         client_config.get("retry_backoff", 0.5), options)
+        self.requests = requests
+        self.base_url = client_config.get("base_url", "http://127.0.0.1:8080/v1").rstrip("/")
+        self.timeout = (client_config.get("connect_timeout", 5.0), client_config.get("read_timeout", 300.0))
+
+        # One pooled session shared by all requests, so connections are reused between turns
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=client_config.get("max_connections", 8))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if client_config.get("api_key"):
+            self.session.headers["Authorization"] = f"Bearer {client_config['api_key']}"
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, self.requests.HTTPError) and error.response is not None:
+            return error.response.status_code >= 500 or error.response.status_code == 429
+        return isinstance(error, (self.requests.ConnectionError, self.requests.Timeout))
+
+    def is_missing_model(self, error: Exception) -> bool:
+        return (isinstance(error, self.requests.HTTPError) and error.response is not None
+                and error.response.status_code == 404)
+
+    def _post(self, path: str, payload: Dict, stream: bool = False):
+        response = self.session.post(f"{self.base_url}{path}", json=payload, stream=stream, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def model_names(self) -> List[str]:
+        response = self._with_retries(
+            lambda _: self.session.get(f"{self.base_url}/models", timeout=self.timeout), fallback=False)
+        response.raise_for_status()
+        return [entry["id"] for entry in response.json().get("data", [])]
+
+    def request_payload(self, model: str, messages: List[Dict], options: Optional[Dict]) -> Dict:
+        payload = {"model": model, "messages": messages}
+        for name, value in dict(self.options, **(options or {})).items():
+            if name in self.OPTION_NAMES:
+                payload[self.OPTION_NAMES[name]] = value
+        return payload
+
+    def chat(self, model: str = None, messages: List[Dict] = None, stream: bool = False, **kwargs):
+        options = kwargs.get("options")
+        if not stream:
+            def request(current_model):
+                response = self._post("/chat/completions", self.request_payload(current_model, messages, options))
+                return self.to_chunk(response.json(), done=True)
+
+            return self._with_retries(request, model)
+
+        def open_stream(current_model):
+            payload = self.request_payload(current_model, messages, options)
+            payload["stream"] = True
+            # The final event then carries the token counts
+            payload["stream_options"] = {"include_usage": True}
+            return self._read_events(self._post("/chat/completions", payload, stream=True))
+
+        return self._stream_with_retries(open_stream, model)
+
+    def to_chunk(self, event: Dict, done: bool = False) -> Dict:
+        """Convert a completion (or streamed completion event) to an Ollama-shaped chat chunk"""
+        choice = (event.get("choices") or [{}])[0]
+        message = choice.get("delta") if "delta" in choice else choice.get("message")
+        chunk = {"message": {"role": "assistant", "content": (message or {}).get("content") or ""}, "done": done}
+        usage = event.get("usage")
+        if usage:
+            chunk["eval_count"] = usage.get("completion_tokens")
+            chunk["prompt_eval_count"] = usage.get("prompt_tokens")
+        return chunk
+
+    def _read_events(self, response) -> Iterator[Dict]:
+        """Parse a server-sent event stream of completion chunks"""
+        final_chunk = {"message": {"role": "assistant", "content": ""}, "done": True}
+        try:
+            # Event streams are UTF-8; servers that send no charset (llama.cpp) would be decoded as ISO-8859-1
+            for raw_line in response.iter_lines():
+                line = raw_line.decode('utf-8')
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = self.to_chunk(json.loads(data))
+                if "eval_count" in chunk:
+                    final_chunk.update(eval_count=chunk["eval_count"], prompt_eval_count=chunk["prompt_eval_count"])
+                if chunk["message"]["content"]:
+                    yield chunk
+        finally:
+            response.close()
+        yield final_chunk
+
+    def embed(self, model: str, input, **kwargs) -> Dict:
+        texts = [input] if isinstance(input, str) else list(input)
+
+        def request(current_model):
+            response = self._post("/embeddings", {"model": current_model, "input": texts})
+            data = sorted(response.json()["data"], key=lambda entry: entry["index"])
+            return {"embeddings": [entry["embedding"] for entry in data]}
+
+        return self._with_retries(request, model=model)
+
+    def warm_up(self, extra_models: List[str] = None):
+        try:
+            # A one-token completion makes the server load the model and fill its prompt cache slot
+            self.chat(messages=[{"role": "user", "content": ""}], options={"num_predict": 1})
+            print(f"Model '{self.model}' is loaded")
+        except Exception as e:
+            print(f"Error warming up model '{self.model}': {e}")
+
+        for model in extra_models or []:
+            try:
+                self.embed(model, "")
+            except Exception as e:
+                print(f"Error warming up model '{model}': {e}")
+
+
+def backend_config(config: Dict) -> Dict:
+    """Settings of the configured backend: its own section of the config file"""
+    name = config["model"].get("backend", "ollama")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}', expected one of: {', '.join(BACKENDS)}")
+    return config.get(name, {})
+
+
+def create_backend(config: Dict, model_name: str = None, options: Optional[Dict] = None) -> LLMBackend:
+    """Create the backend selected by model.backend in the config, with the settings of its section"""
+    model_name = model_name or config["model"]["name"]
+    fallback_name = config["model"].get("fallback_name")
+    client_config = backend_config(config)
+    if config["model"].get("backend", "ollama") == "openai":
+        return OpenAICompatibleBackend(model_name, fallback_name, client_config, options)
+    from ollama_client import OllamaConnection
+    return OllamaConnection(model_name, fallback_name, client_config, options)
+
+
+class MicroBatcher:
+    """Collect background requests for a short window and send them to the backend together.
+
+    Servers with continuous batching (vLLM, llama.cpp with parallel slots, Ollama with
+    OLLAMA_NUM_PARALLEL) process concurrent requests in one batch, so the requests of a batch
+    are sent at once. Each still holds its own scheduler slot, so a batch never runs more
+    requests than the scheduler's concurrency limit allows."""
+
+    def __init__(self, run: Callable, max_size: int = 1, window: float = 0.05, slot: Callable = None,
+                 metrics=None):
+        self.run = run
+        self.max_size = max(1, max_size)
+        self.window = window
+        self.slot = slot
+        self.metrics = metrics
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_size, thread_name_prefix="batch")
+        self._worker = threading.Thread(target=self._dispatch, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, *args, **kwargs) -> Future:
+        """Queue a request; the future resolves to the result of run(*args, **kwargs)"""
+        future = Future()
+        self._queue.put((future, args, kwargs))
+        return future
+
+    def _collect(self) -> List:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_one(self, future: Future, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            if self.slot is None:
+                future.set_result(self.run(*args, **kwargs))
+            else:
+                # Raises QueueFullError when the scheduler queue is full, which fails this request only
+                with self.slot():
+                    future.set_result(self.run(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _run_batch(self, batch: List):
+        if self.metrics is not None:
+            self.metrics.observe("llm_batch_size", len(batch))
+        wait([self._executor.submit(self._run_one, *job) for job in batch])
+
+    def _dispatch(self):
+        while True:
+            self._run_batch(self._collect())
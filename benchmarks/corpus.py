@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+import argparse
+import itertools
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+
+WORDS = (
+    "morning childhood school friend mother father city river summer winter work project book music "
+    "travel garden memory decision fear hope dream letter kitchen train evening walk sea mountain "
+    "question answer change year week quiet loud happy tired curious proud lonely grateful"
+).split()
+SYLLABLES = "ka lo mi ne ro su ta vi de pa li mo ru se ko na".split()
+
+
+def build_vocabulary(size: int = 5000, seed: int = 0) -> Tuple[List[str], List[float]]:
+    """Words with Zipf-like frequencies, as in natural text; the real words are spread over the ranks"""
+    rng = random.Random(seed)
+    vocabulary = []
+    seen = set(WORDS)
+    while len(vocabulary) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            vocabulary.append(word)
+    step = size // (len(WORDS) + 1)
+    for i, word in enumerate(WORDS):
+        vocabulary[(i + 1) * step] = word
+    weights = [1.0 / rank for rank in range(1, size + 1)]
+    return vocabulary, weights
+
+
+VOCABULARY, WEIGHTS = build_vocabulary()
+CUMULATIVE_WEIGHTS = list(itertools.accumulate(WEIGHTS))
+
+
+def sentence(rng: random.Random, min_words: int = 6, max_words: int = 40) -> str:
+    words = rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=rng.randint(min_words, max_words))
+    return " ".join(words).capitalize() + "."
+
+
+def make_session(rng: random.Random, session_type: str, start: datetime, messages_range) -> Dict:
+    """Build a session document in the layout written by the session store"""
+    messages = []
+    timestamp = start
+    for _ in range(rng.randint(*messages_range)):
+        timestamp += timedelta(seconds=rng.randint(30, 600))
+        messages.append({
+            "timestamp": timestamp.isoformat(),
+            "user": sentence(rng),
+            "assistant": " ".join(sentence(rng) for _ in range(rng.randint(1, 4)))
+        })
+    return {
+        "session_type": session_type,
+        "start_time": start.isoformat(),
+        "messages": messages,
+        "last_updated": timestamp.isoformat()
+    }
+
+
+def generate_corpus(data_dir: str, sessions: int, bio_ratio: float = 0.6, legacy_ratio: float = 0.02,
+                    messages_range=(2, 12), seed: int = 0) -> Dict:
+    """Write a synthetic data directory of bio, general and legacy single-message sessions"""
+    rng = random.Random(seed)
+    for subdir in ("bio", "general"):
+        os.makedirs(os.path.join(data_dir, subdir), exist_ok=True)
+
+    counts = {"bio": 0, "general": 0, "legacy": 0, "messages": 0}
+    start = datetime(2020, 1, 1, 8, 0, 0)
+    # Spread sessions over a few years, like a long-running diary
+    step = timedelta(seconds=max(60, int(4 * 365 * 24 * 3600 / max(1, sessions))))
+    for i in range(sessions):
+        session_start = start + step * i
+        name = session_start.strftime('%Y-%m-%d_%H-%M-%S') + f"_{i}.json"
+        roll = rng.random()
+        if roll < legacy_ratio:
+            # Legacy layout: one message pair per file in the data root
+            session_type = "biographical" if rng.random() < bio_ratio else "general"
+            document = {
+                "timestamp": session_start.isoformat(),
+                "user": sentence(rng),
+                "assistant": sentence(rng),
+                "session_type": session_type
+            }
+            path = os.path.join(data_dir, name)
+            counts["legacy"] += 1
+            counts["messages"] += 1
+        else:
+            location = "bio" if roll < legacy_ratio + (1 - legacy_ratio) * bio_ratio else "general"
+            session_type = "biographical" if location == "bio" else "general"
+            document = make_session(rng, session_type, session_start, messages_range)
+            path = os.path.join(data_dir, location, name)
+            counts[location] += 1
+            counts["messages"] += len(document["messages"])
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2, ensure_ascii=False)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic biography data directory")
+    parser.add_argument("data_dir")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--bio-ratio", type=float, default=0.6)
+    parser.add_argument("--legacy-ratio", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    counts = generate_corpus(args.data_dir, args.sessions, args.bio_ratio, args.legacy_ratio, seed=args.seed)
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
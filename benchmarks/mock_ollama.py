@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+
+class MockOllamaServer:
+    """Stand-in for the Ollama HTTP API with configurable latency and token rate"""
+    # Implements the endpoints the biographer uses: /api/tags, /api/chat, /api/generate and /api/embed
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, first_token_latency: float = 0.05,
+                 tokens_per_second: float = 200.0, response_tokens: int = 32, embedding_dim: int = 64,
+                 models: List[str] = None):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.embedding_dim = embedding_dim
+        self.models = models or []
+        self.request_counts = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="mock-ollama", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllamaServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, endpoint: str):
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def embedding(self, text: str) -> List[float]:
+        """Deterministic pseudo-embedding, so similar runs retrieve the same messages"""
+        values = []
+        counter = 0
+        while len(values) < self.embedding_dim:
+            digest = hashlib.sha256(f"{counter}:{text}".encode('utf-8')).digest()
+            values.extend(b / 127.5 - 1.0 for b in digest)
+            counter += 1
+        return values[:self.embedding_dim]
+
+    def reply_tokens(self, messages: List[Dict]) -> List[str]:
+        """Words of a canned reply (each counted as one token)"""
+        seed = len(messages[-1].get("content", "")) if messages else 0
+        return [f"word{(seed + i) % 97} " for i in range(self.response_tokens)]
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; without this, delayed ACKs add ~40 ms per request
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def read_json(self) -> Dict:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def send_json(self, payload: Dict, status: int = 200):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                mock.count(self.path)
+                if self.path == "/api/tags":
+                    self.send_json({"models": [{"model": name, "name": name} for name in mock.models]})
+                elif self.path in ("/", "/api/version"):
+                    self.send_json({"version": "0.0.0-mock"})
+                else:
+                    self.send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                mock.count(self.path)
+                request = self.read_json()
+                if self.path == "/api/chat":
+                    self.chat(request)
+                elif self.path == "/api/generate":
+                    self.send_json({"model": request.get("model"), "response": "", "done": True})
+                elif self.path == "/api/embed":
+                    inputs = request.get("input", "")
+                    if isinstance(inputs, str):
+                        inputs = [inputs]
+                    self.send_json({"model": request.get("model"),
+                                    "embeddings": [mock.embedding(text) for text in inputs]})
+                else:
+                    self.send_json({"error": "not found"}, 404)
+
+            def chunk(self, request: Dict, content: str, done: bool, **extra) -> Dict:
+                return dict({
+                    "model": request.get("model"),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "message": {"role": "assistant", "content": content},
+                    "done": done
+                }, **extra)
+
+            def chat(self, request: Dict):
+                messages = request.get("messages", [])
+                tokens = mock.reply_tokens(messages)
+                prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+                token_delay = 1.0 / mock.tokens_per_second if mock.tokens_per_second > 0 else 0.0
+                final = {
+                    "done_reason": "stop",
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int(mock.first_token_latency * 1e9),
+                    "eval_count": len(tokens),
+                    "eval_duration": int(len(tokens) * token_delay * 1e9)
+                }
+
+                time.sleep(mock.first_token_latency)
+                if not request.get("stream", True):
+                    time.sleep(len(tokens) * token_delay)
+                    self.send_json(self.chunk(request, "".join(tokens), True, **final))
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(token_delay)
+                    self.write_chunk(self.chunk(request, token, False))
+                self.write_chunk(self.chunk(request, "", True, **final))
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def write_chunk(self, payload: Dict):
+                line = json.dumps(payload).encode('utf-8') + b"\n"
+                self.wfile.write(f"{len(line):x}\r\n".encode('ascii') + line + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    """Run the mock server in the foreground"""
+    parser = argparse.ArgumentParser(description="Mock Ollama server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--first-token-latency", type=float, default=0.05, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--response-tokens", type=int, default=32)
+    parser.add_argument("--model", action="append", default=[], help="model reported as installed")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(args.host, args.port, args.first_token_latency, args.tokens_per_second,
+                              args.response_tokens, models=args.model)
+    print(f"Mock Ollama listening at {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
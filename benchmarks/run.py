@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+import argparse
+import copy
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from corpus import generate_corpus
+from mock_ollama import MockOllamaServer
+
+
+def measure(fn: Callable, iterations: int, setup: Callable = None) -> Dict:
+    """Time fn over several runs, then trace one more run for its peak Python memory"""
+    timings = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 3),
+        "max_ms": round(timings[-1], 3),
+        "peak_kb": round(peak / 1024, 1)
+    }
+
+
+def write_config(base_config: str, path: str, ollama_url: str) -> Dict:
+    """Copy the app configuration, pointing it at the mock server"""
+    with open(base_config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config.setdefault("ollama", {})["host"] = ollama_url
+    # Embedding a whole synthetic corpus at startup would dominate every other measurement
+    config.setdefault("retrieval", {})["sync_on_startup"] = False
+    config.setdefault("metrics", {})["enabled"] = False
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False)
+    return config
+
+
+def settle(biographer):
+    """Wait for background work triggered by the previous operation"""
+    job = biographer._question_job
+    if job is not None:
+        job.result()
+    if biographer.embedding_index is not None:
+        biographer._embedding_executor.submit(lambda: None).result()
+
+
+def run_size(module, sessions: int, args, work_dir: str, config_file: str) -> Dict:
+    """Benchmark the biographer against a synthetic corpus of the given size"""
+    data_dir = os.path.join(work_dir, f"data_{sessions}")
+    shutil.rmtree(data_dir, ignore_errors=True)
+    start = time.perf_counter()
+    counts = generate_corpus(data_dir, sessions, seed=args.seed)
+    print(f"[{sessions}] corpus generated in {time.perf_counter() - start:.1f}s: {counts}")
+
+    index_path = os.path.join(data_dir, "index.sqlite3")
+    results = {"corpus": counts}
+    instances = []
+
+    def construct():
+        instances.append(module.DigitalBiographer(data_dir=data_dir, config_file=config_file))
+
+    def remove_index():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(index_path + suffix):
+                os.remove(index_path + suffix)
+
+    # Startup with no index (first run on existing data) and with an up-to-date index
+    results["startup_cold"] = measure(construct, args.startup_iterations, setup=remove_index)
+    results["startup_warm"] = measure(construct, args.startup_iterations)
+    biographer = instances[-1]
+    for instance in instances:
+        settle(instance)
+
+    results["get_recent_biographical_context"] = measure(
+        biographer.get_recent_biographical_context, args.iterations)
+    results["get_data_info"] = measure(biographer.get_data_info, args.iterations)
+    # A common word, so ranking covers a large share of all messages
+    results["search"] = measure(lambda: biographer.search_conversations("garden"), args.iterations)
+    results["search_filtered"] = measure(
+        lambda: biographer.search_conversations("river summer", "biographical", "2021-01-01", "2022-12-31"),
+        args.iterations)
+
+    conversation = module.Conversation("biographical")
+
+    def save():
+        biographer.save_conversation("A new memory about the garden.", "Tell me more about it.",
+                                     "biographical", conversation)
+
+    results["save_conversation"] = measure(save, args.iterations)
+    settle(biographer)
+
+    # Prompt assembly of a biographical turn, as the app builds it: token budget, related memories and the
+    # message list
+    history = module.Conversation("biographical")
+    for i in range(args.history_turns):
+        history.messages.append({"role": "user", "content": f"[2024-01-01 10:{i % 60:02d}:00] Message {i} about work."})
+        history.messages.append({"role": "assistant", "content": f"Reply {i} with a follow-up question?"})
+    message = "What did I say about the summer by the sea?"
+
+    def assemble():
+        current_time = datetime.now()
+        system_prompt, context_messages = biographer.build_prompt(message, copy.deepcopy(history), "biographical",
+                                                                  current_time)
+        return biographer.compose_messages(message, system_prompt, context_messages, current_time)
+
+    results["prompt_assembly"] = measure(assemble, args.iterations)
+
+    # Whole chat turn against the mock server, including its simulated latency
+    def chat_turn():
+        for _ in biographer.stream_conversation(message, copy.deepcopy(history), "biographical", "bench"):
+            pass
+
+    results["chat_turn"] = measure(chat_turn, args.chat_iterations)
+    settle(biographer)
+
+    for instance in instances:
+        instance.close_session(conversation)
+        instance.close()
+    if not args.keep_data:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def check_thresholds(results: Dict, thresholds: Dict) -> List[str]:
+    """List every measurement above its threshold"""
+    failures = []
+    for size, operations in thresholds.items():
+        if size not in results:
+            continue
+        for operation, limits in operations.items():
+            measured = results[size].get(operation)
+            if measured is None:
+                continue
+            for metric, limit in limits.items():
+                if measured.get(metric, 0) > limit:
+                    failures.append(f"{size} sessions, {operation}: {metric} {measured[metric]} > {limit}")
+    return failures
+
+
+def print_results(results: Dict):
+    for size, operations in results.items():
+        print(f"\n{size} sessions")
+        print(f"  {'operation':34} {'mean ms':>10} {'p95 ms':>10} {'max ms':>10} {'peak KiB':>10}")
+        for operation, measured in operations.items():
+            if operation in ("corpus", "import") or not isinstance(measured, dict):
+                continue
+            print(f"  {operation:34} {measured['mean_ms']:>10.2f} {measured['p95_ms']:>10.2f} "
+                  f"{measured['max_ms']:>10.2f} {measured['peak_kb']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Digital Biographer on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000],
+                        help="corpus sizes in sessions, e.g. 100 10000 100000")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--startup-iterations", type=int, default=3)
+    parser.add_argument("--chat-iterations", type=int, default=5)
+    parser.add_argument("--history-turns", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--config", default=os.path.join(REPO_DIR, "config_en.json"))
+    parser.add_argument("--first-token-latency", type=float, default=0.05, help="mock server latency in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="mock server token rate")
+    parser.add_argument("--response-tokens", type=int, default=32)
+    parser.add_argument("--work-dir", help="directory for generated corpora (default: a temporary directory)")
+    parser.add_argument("--keep-data", action="store_true", help="keep generated corpora")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--thresholds", default=os.path.join(BENCHMARK_DIR, "thresholds.json"))
+    parser.add_argument("--check", action="store_true", help="exit with an error if a threshold is exceeded")
+    args = parser.parse_args()
+
+    thresholds = {}
+    if args.check:
+        with open(args.thresholds, 'r', encoding='utf-8') as f:
+            thresholds = json.load(f)
+        # Checked before the run: a size without thresholds would pass without checking anything
+        unchecked = [str(size) for size in args.sizes if str(size) not in thresholds]
+        if unchecked:
+            parser.error(f"no thresholds for {', '.join(unchecked)} sessions in {args.thresholds}")
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="biographer-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        model_config = json.load(f)["model"]
+    server = MockOllamaServer(
+        first_token_latency=args.first_token_latency,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        models=[model_config["name"], model_config.get("fallback_name") or model_config["name"]]
+    ).start()
+
+    try:
+        config_file = os.path.join(work_dir, "config.json")
+        write_config(args.config, config_file, server.url)
+
+        start = time.perf_counter()
+        import gradio_biographer
+        import_ms = (time.perf_counter() - start) * 1000
+
+        results = {}
+        for sessions in args.sizes:
+            results[str(sessions)] = run_size(gradio_biographer, sessions, args, work_dir, config_file)
+        results["import"] = {"import_ms": round(import_ms, 1)}
+    finally:
+        server.stop()
+        if not args.work_dir and not args.keep_data:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results({size: ops for size, ops in results.items() if size != "import"})
+    print(f"\nimport gradio_biographer: {import_ms:.0f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.check:
+        failures = check_thresholds(results, thresholds)
+        if failures:
+            print("\nThresholds exceeded:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print("\nAll thresholds met")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+# Only light modules are imported here; each command imports what it needs, so `stats`
+# and `reindex` start without loading Gradio, the model client or NumPy
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LANGUAGES = ("en", "ru")
+
+
+class StartupTimer:
+    """Wall-clock timings of the startup phases, printed to stderr with --timing"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.phases = []
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+        if self.enabled:
+            print(f"[startup] {phase}: {(now - self.start) * 1000:.0f} ms total, "
+                  f"+{self.phases[-1][1] * 1000:.0f} ms", file=sys.stderr)
+
+    def record(self, metrics):
+        """Report the phases as startup_seconds{phase} on the metrics endpoint"""
+        for phase, seconds in self.phases:
+            metrics.observe("startup_seconds", seconds, phase=phase)
+
+
+def config_path(args) -> str:
+    """Configuration file from --config, or the bundled config for the selected language"""
+    if args.config:
+        return args.config
+    return os.path.join(APP_DIR, f"config_{args.lang}.json")
+
+
+def load_config(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def create_biographer(args, timer: StartupTimer, headless: bool):
+    """Construct the conversation engine, printing the usual hints if Ollama is unreachable"""
+    from gradio_biographer import DigitalBiographer
+    timer.mark("import")
+    try:
+        biographer = DigitalBiographer(data_dir=args.data_dir, config_file=config_path(args), headless=headless)
+    except ConnectionError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        print("\nMake sure Ollama is running and the model is available:", file=sys.stderr)
+        print("1. Start Ollama: ollama serve", file=sys.stderr)
+        print("2. Pull model: ollama pull qwen2.5:7b", file=sys.stderr)
+        sys.exit(1)
+    timer.mark("init")
+    return biographer
+
+
+def serve(args, timer: StartupTimer):
+    """Run the web interface"""
+    config = load_config(config_path(args))
+    print(config["console_messages"]["initializing"])
+    biographer = create_biographer(args, timer, headless=False)
+    print(biographer.config["console_messages"]["connected"].format(model=biographer.model_name))
+
+    # Local Prometheus endpoint for latency and throughput metrics
+    biographer.start_metrics_server()
+
+    from gradio_biographer import create_gradio_interface
+    interface = create_gradio_interface(biographer)
+    timer.mark("interface")
+    timer.record(biographer.metrics)
+
+    print(biographer.config["console_messages"]["launching"])
+    print(biographer.config["console_messages"]["access_url"].format(host=args.host, port=args.port))
+    print(biographer.config["console_messages"]["stop_instruction"])
+
+    interface.launch(
+        server_name=args.host,
+        server_port=args.port,
+        share=args.share,
+        inbrowser=args.inbrowser
+    )
+
+
+def stats(args, timer: StartupTimer):
+    """Print conversation statistics from the session index"""
+    from index import SessionIndex
+    from insights import TextAnalyzer
+
+    config = load_config(config_path(args))
+    os.makedirs(args.data_dir, exist_ok=True)
+    index = SessionIndex(args.data_dir, tokenizer=config.get("search", {}).get("tokenizer"),
+                         workers=config.get("search", {}).get("index_workers", 2),
+                         analyzer=TextAnalyzer(config.get("insights")))
+    try:
+        index.reconcile()
+        timer.mark("index")
+        counts = index.stats()
+    finally:
+        index.close()
+
+    if not counts["total_files"]:
+        print(config["messages"]["no_conversations"])
+        return
+    print(config["messages"]["data_stats"].format(
+        total_files=counts["total_files"],
+        bio_sessions=counts["bio_sessions"],
+        gen_sessions=counts["gen_sessions"],
+        total_messages=counts["total_messages"],
+        data_path=os.path.abspath(args.data_dir)
+    ))
+
+
+def ask(args, timer: StartupTimer):
+    """Answer one message, or every line of stdin as turns of one session, without the web interface"""
+    from context import Conversation
+
+    biographer = create_biographer(args, timer, headless=True)
+    messages = [args.message] if args.message else (line.strip() for line in sys.stdin)
+    if args.session:
+        # Continue a saved session; only its last turns are loaded, and turns between them and the
+        # session's summary are left out of the prompts rather than summarized in the background
+        conversation = biographer.load_conversation(args.session)
+    else:
+        conversation = Conversation(args.session_type)
+    try:
+        for message in messages:
+            if not message:
+                continue
+            for chunk in biographer.ask(message, conversation, conversation.session_type, client_id="cli"):
+                sys.stdout.write(chunk)
+                sys.stdout.flush()
+            sys.stdout.write("\n")
+            if args.stats:
+                print(biographer.format_generation_stats(conversation.generation_stats), file=sys.stderr)
+    finally:
+        # Compact the session log, as clearing the chat does in the web interface
+        biographer.close_session(conversation)
+
+
+def reindex(args, timer: StartupTimer):
+    """Rebuild the session index from the session files, and optionally the embedding index"""
+    from index import SessionIndex, lock_exclusive
+    from insights import TextAnalyzer
+
+    config = load_config(config_path(args))
+    index_path = os.path.join(args.data_dir, "index.sqlite3")
+    lock = lock_exclusive(index_path)
+    if lock is None:
+        print("Error: the index is open in another process; stop the biographer before reindexing", file=sys.stderr)
+        sys.exit(1)
+
+    # Built next to the current index, which is replaced once the new one is complete
+    rebuild_path = index_path + ".rebuild"
+    updated = None
+    try:
+        for suffix in ("", "-wal", "-shm", ".lock"):
+            if os.path.exists(rebuild_path + suffix):
+                os.remove(rebuild_path + suffix)
+        index = SessionIndex(args.data_dir, db_path=rebuild_path,
+                             tokenizer=config.get("search", {}).get("tokenizer"),
+                             workers=config.get("search", {}).get("index_workers", 2),
+                             analyzer=TextAnalyzer(config.get("insights")))
+        try:
+            updated = index.reconcile()
+            timer.mark("index")
+            print(f"Indexed {updated} session files")
+
+            if args.embeddings:
+                from backends import create_backend
+                from retrieval import EmbeddingIndex, create_embedder
+
+                retrieval_config = config.get("retrieval", {})
+                model = retrieval_config.get("embedding_model", "nomic-embed-text")
+                client = create_backend(config)
+                embedding_index = EmbeddingIndex(
+                    args.data_dir,
+                    create_embedder(client, model),
+                    model,
+                    batch_size=retrieval_config.get("batch_size", 32),
+                    max_chars=retrieval_config.get("max_chars", 2000)
+                )
+                added = embedding_index.rebuild(index.iter_messages("bio"))
+                timer.mark("embeddings")
+                print(f"Embedded {added} biographical messages")
+        finally:
+            index.close()
+            if updated is not None:
+                os.remove(rebuild_path + ".lock")
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists(index_path + suffix):
+                        os.remove(index_path + suffix)
+                os.replace(rebuild_path, index_path)
+    finally:
+        lock.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Digital Biographer")
+    parser.add_argument("--config", default=os.environ.get("BIOGRAPHER_CONFIG"),
+                        help="configuration file (env BIOGRAPHER_CONFIG; overrides --lang)")
+    parser.add_argument("--lang", choices=LANGUAGES, default=os.environ.get("BIOGRAPHER_LANG", "ru"),
+                        help="language of the bundled configuration (env BIOGRAPHER_LANG)")
+    parser.add_argument("--data-dir", default=os.environ.get("BIOGRAPHER_DATA_DIR", "data"),
+                        help="data directory (env BIOGRAPHER_DATA_DIR)")
+    parser.add_argument("--timing", action="store_true", help="print startup timings to stderr")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="run the web interface")
+    serve_parser.add_argument("--host", default=os.environ.get("BIOGRAPHER_HOST", "127.0.0.1"),
+                              help="address to listen on (env BIOGRAPHER_HOST)")
+    serve_parser.add_argument("--port", type=int, default=int(os.environ.get("BIOGRAPHER_PORT", 7860)),
+                              help="port to listen on (env BIOGRAPHER_PORT)")
+    serve_parser.add_argument("--share", action="store_true", help="create a public Gradio link")
+    serve_parser.add_argument("--inbrowser", action="store_true", help="open the interface in a browser")
+
+    subparsers.add_parser("stats", help="print conversation statistics")
+
+    ask_parser = subparsers.add_parser("ask", help="answer a message without the web interface")
+    ask_parser.add_argument("message", nargs="?", help="message to answer (default: one message per stdin line)")
+    ask_parser.add_argument("--session-type", choices=("biographical", "general"), default="general")
+    ask_parser.add_argument("--session", help="session file to continue instead of starting a new session")
+    ask_parser.add_argument("--stats", action="store_true", help="print generation statistics to stderr")
+
+    reindex_parser = subparsers.add_parser("reindex", help="rebuild the session index from the session files")
+    reindex_parser.add_argument("--embeddings", action="store_true", help="also re-embed all bio messages")
+    return parser
+
+
+COMMANDS = {"serve": serve, "stats": stats, "ask": ask, "reindex": reindex}
+
+
+def main(argv: List[str] = None):
+    """Run a Digital Biographer command"""
+    timer = StartupTimer(enabled=False)
+    args = build_parser().parse_args(argv)
+    timer.enabled = args.timing
+    COMMANDS[args.command](args, timer)
+
+
+if __name__ == "__main__":
+    main()
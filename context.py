@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+import math
+from typing import Callable, Dict, List, Optional
+
+
+# Role/formatting overhead the chat template adds to every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class Conversation:
+    """Per-client state of one chat session: its file, messages and a rolling summary of older turns"""
+
+    def __init__(self, session_type: str = "general"):
+        self.session_type = session_type
+        self.session_file = None
+        self.generation_stats = {}
+        self.messages = []
+        self.summary = ""
+        # Number of leading messages already folded into the summary
+        self.summary_covered = 0
+        # Turns between the summary and `messages` of a resumed session are still being summarized
+        self.summary_pending = False
+        # Turns of a resumed session before `messages` that were left on disk
+        self.turn_offset = 0
+        # First turn shown in the history view, and the greeting shown above the first turn
+        self.view_start = 0
+        self.greeting = ""
+        # Compressed voice recordings (data, extension) to be saved with the next message
+        self.pending_audio = []
+
+    @property
+    def turn_count(self) -> int:
+        """Number of turns in the session, including those not loaded"""
+        return self.turn_offset + len(self.messages) // 2
+
+
+class ContextManager:
+    """Keep the prompt sent to the model inside a token budget by summarizing older turns"""
+
+    def __init__(self, context_config: Optional[Dict] = None,
+                 summarize: Callable[[str, List[Dict]], str] = None,
+                 summary_header: str = "Summary of the earlier part of this conversation:"):
+        context_config = context_config or {}
+        self.max_tokens = context_config.get("max_tokens", 8192)
+        self.response_reserve_tokens = context_config.get("response_reserve_tokens", 1024)
+        self.min_recent_turns = context_config.get("min_recent_turns", 4)
+        self.chars_per_token = context_config.get("chars_per_token", 3.5)
+        # After summarizing, recent turns are trimmed to this share of the budget so that
+        # the prompt prefix stays unchanged for several turns instead of shifting every turn
+        self.target_ratio = context_config.get("target_ratio", 0.6)
+        self.summarize = summarize
+        self.summary_header = summary_header
+
+    @property
+    def budget(self) -> int:
+        """Tokens available for the prompt once room for the response is reserved"""
+        return self.max_tokens - self.response_reserve_tokens
+
+    def count_tokens(self, text: str) -> int:
+        """Estimate the token count of a text without loading a tokenizer"""
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def count_message_tokens(self, messages: List[Dict]) -> int:
+        """Estimate the token count of a list of chat messages"""
+        return sum(self.count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+    def summary_message(self, conversation: Conversation) -> List[Dict]:
+        """Get the summary as a system message, or nothing if there is no summary yet"""
+        if not conversation.summary:
+            return []
+        return [{"role": "system", "content": f"{self.summary_header}\n{conversation.summary}"}]
+
+    def prepare(self, conversation: Conversation, system_prompt: str, message: str,
+                summarize: Callable[[str, List[Dict]], str] = None, reserved_tokens: int = 0) -> List[Dict]:
+        """Get the history to send with the next message, summarizing older turns if over budget.
+
+        reserved_tokens are taken by messages the caller adds to the prompt besides the history."""
+        summarize = summarize or self.summarize
+        fixed_tokens = (self.count_tokens(system_prompt or "") + self.count_tokens(message)
+                        + 2 * MESSAGE_OVERHEAD_TOKENS + reserved_tokens)
+        recent = conversation.messages[conversation.summary_covered:]
+
+        total = fixed_tokens + self.count_message_tokens(self.summary_message(conversation) + recent)
+        if total > self.budget and conversation.summary_pending:
+            # Earlier turns are not in the summary yet, so these cannot follow them: the oldest are left out
+            # of this prompt and folded once that summary is in
+            recent = recent[self.messages_to_fold(recent, fixed_tokens, conversation):]
+        elif total > self.budget and summarize is not None:
+            fold_count = self.messages_to_fold(recent, fixed_tokens, conversation)
+            # Folded in requests that each fit the budget
+            folded = 0
+            while folded < fold_count:
+                chunk = self.chunk_size(recent[folded:fold_count], conversation.summary)
+                try:
+                    conversation.summary = summarize(conversation.summary, recent[folded:folded + chunk])
+                except Exception as e:
+                    print(f"Error summarizing conversation: {e}")
+                    break
+                conversation.summary_covered += chunk
+                folded += chunk
+            recent = recent[folded:]
+
+        return self.summary_message(conversation) + recent
+
+    def available_tokens(self, conversation: Conversation, system_prompt: str, message: str) -> int:
+        """Tokens left in the budget next to the prompt, the summary and the recent turns that are never folded"""
+        kept = conversation.messages[conversation.summary_covered:][-self.min_recent_turns * 2:]
+        used = (self.count_tokens(system_prompt or "") + self.count_tokens(message) + 2 * MESSAGE_OVERHEAD_TOKENS
+                + self.count_message_tokens(self.summary_message(conversation) + kept))
+        return max(0, self.budget - used)
+
+    def messages_to_fold(self, recent: List[Dict], fixed_tokens: int, conversation: Conversation) -> int:
+        """Count the oldest messages to move into the summary, in whole user/assistant turns"""
+        # Leave room for the summary itself to grow
+        target = self.budget * self.target_ratio - fixed_tokens - self.count_tokens(conversation.summary)
+        keep_minimum = self.min_recent_turns * 2
+
+        fold_count = 0
+        remaining = self.count_message_tokens(recent)
+        while len(recent) - fold_count > keep_minimum and remaining > target:
+            remaining -= self.count_message_tokens(recent[fold_count:fold_count + 2])
+            fold_count += 2
+        return fold_count
+
+    def chunk_size(self, messages: List[Dict], summary: str) -> int:
+        """Count the leading messages summarized in one request, in whole turns that fit the budget"""
+        limit = self.budget * self.target_ratio - self.count_tokens(summary)
+        count = min(2, len(messages))
+        tokens = self.count_message_tokens(messages[:count])
+        while count < len(messages):
+            turn_tokens = self.count_message_tokens(messages[count:count + 2])
+            if tokens + turn_tokens > limit:
+                break
+            tokens += turn_tokens
+            count += 2
+        return min(count, len(messages))
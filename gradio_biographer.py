@@ -1,42 +1,231 @@
 #!/usr/bin/env python3
+import atexit
 import json
 import os
 import random
-from datetime import datetime
-from typing import Dict, List, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple
 
-import ollama
-import gradio as gr
+from backends import MicroBatcher, backend_config, create_backend
+from context import ContextManager, Conversation
+from index import SessionIndex
+from insights import CHART_NAMES, InsightsDashboard, TextAnalyzer
+from metrics import Metrics, MetricsServer, peak_rss_bytes
+from response_cache import ResponseCache, request_key
+from scheduler import InferenceScheduler, QueueFullError, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from storage import create_session_store
+from synthesis import BiographySynthesizer
+
+if TYPE_CHECKING:
+    # Imported by create_gradio_interface, so headless use and the CLI do not pay for it
+    import gradio as gr
 
 
 class DigitalBiographer:
-    def __init__(self, model_name: str = None, data_dir: str = "data", config_file: str = "config_en.json"):
+    def __init__(self, model_name: str = None, data_dir: str = "data", config_file: str = "config_en.json",
+                 headless: bool = False):
         # Load configuration
         self.config = self.load_config(config_file)
         
+        # Headless instances (CLI, automation) answer messages only: no welcome questions, model
+        # warm-up, embedding catch-up or resumed synthesis in the background
+        self.headless = headless
+        
         # Use model from config if not provided
         if model_name is None:
             model_name = self.config["model"]["name"]
         
-        self.model_name = model_name
         self.data_dir = data_dir
         
-        # Session tracking
-        self.current_bio_session_file = None
-        self.current_gen_session_file = None
+        # Session tracking lives in each client's Conversation; these serve callers without one
+        self.default_conversations = {
+            "biographical": Conversation("biographical"),
+            "general": Conversation("general")
+        }
+        
+        # Latency and throughput of model calls, storage and scans, exported at /metrics
+        self.metrics_config = self.config.get("metrics", {})
+        self.metrics = Metrics(window=self.metrics_config.get("window", 500))
+        
+        # Bounded, fair queue in front of the model backend shared by all users
+        scheduler_config = self.config.get("scheduler", {})
+        self.scheduler = InferenceScheduler(
+            max_concurrency=scheduler_config.get("max_concurrency", 1),
+            max_queue=scheduler_config.get("max_queue", 16),
+            metrics=self.metrics
+        )
+        self.metrics.register_gauge("scheduler_running", lambda: self.scheduler.stats()["running"])
+        self.metrics.register_gauge("scheduler_waiting", lambda: self.scheduler.stats()["waiting"])
+        self.metrics.register_gauge("process_peak_rss_bytes", lambda: peak_rss_bytes() or 0)
+        
+        # Token budget for the prompt, with older turns folded into a rolling summary
+        self.context_manager = ContextManager(
+            self.config.get("context"),
+            summarize=self.summarize_turns,
+            summary_header=self.config["messages"]["summary_header"]
+        )
+        
+        # Paging of the chat history view and the turns loaded when a session is resumed
+        self.history_config = self.config.get("history", {})
+        
+        # Welcome question precomputed in the background, keyed by the bio data version
+        self._bio_version = 0
+        self._welcome_question = None
+        self._question_lock = threading.Lock()
+        self._question_job = None
+        self._question_rerun = False
+        self._question_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="welcome-question")
+        # Summaries of the turns resumed sessions did not load
+        self._summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary-backfill")
         
         # Ensure data directories exist
         os.makedirs(data_dir, exist_ok=True)
         os.makedirs(os.path.join(data_dir, "bio"), exist_ok=True)
         os.makedirs(os.path.join(data_dir, "general"), exist_ok=True)
         
-        # Initialize Ollama client
+        # Responses of deterministic requests (welcome questions, summaries), kept across restarts
+        self.cache_config = self.config.get("response_cache", {})
+        self.response_cache = None
+        if self.cache_config.get("enabled", True):
+            os.makedirs(os.path.join(data_dir, "cache"), exist_ok=True)
+            self.response_cache = ResponseCache(
+                os.path.join(data_dir, "cache", "responses.json"),
+                max_entries=self.cache_config.get("max_entries", 512),
+                ttl=self.cache_config.get("ttl_seconds", 86400)
+            )
+            self.metrics.register_gauge("response_cache_entries", lambda: len(self.response_cache))
+        
+        # Session storage backend (append-only JSONL by default)
+        self.store = create_session_store(data_dir, self.config.get("storage"))
+        atexit.register(self.store.close_all)
+        
+        # Metadata and full-text index of all sessions, reconciled against files changed since the last run
+        self.search_config = self.config.get("search", {})
+        self.insights_config = self.config.get("insights", {})
+        self.index = SessionIndex(data_dir, tokenizer=self.search_config.get("tokenizer"),
+                                  workers=self.search_config.get("index_workers", 2),
+                                  analyzer=TextAnalyzer(self.insights_config))
+        with self.metrics.timed("index_seconds", operation="reconcile"):
+            self.index.reconcile()
+        
+        # Weekly trends for the Data tab, aggregated from rollups the index keeps current on every save
+        self.insights = InsightsDashboard(
+            self.index,
+            render=self.render_chart,
+            weeks=self.insights_config.get("weeks", 26),
+            labels={
+                "bio": self.config["ui_text"]["biographical_tab"]["title"],
+                "general": self.config["ui_text"]["general_tab"]["title"]
+            }
+        )
+        
+        # Model server selected by model.backend (Ollama or an OpenAI-compatible server), configured by its
+        # own section: pooled connections, retries and model fallback
+        backend_settings = backend_config(self.config)
         try:
-            self.client = ollama.Client()
-            # Test connection
-            self.client.list()
+            # The context window matches the prompt budget, so Ollama never truncates (and shifts) a prompt
+            self.backend = create_backend(self.config, model_name,
+                                          options={"num_ctx": self.context_manager.max_tokens})
+            # Test connection and switch to the fallback model if the main one is not installed
+            self.backend.resolve_model()
         except Exception as e:
             raise ConnectionError(self.config["error_messages"]["ollama_connection"].format(error=e))
+        
+        # Background completions (summaries, questions, synthesis) sent together, so a batching server
+        # processes them in one pass while holding a single scheduler slot
+        self.batcher = MicroBatcher(
+            self.complete_text,
+            max_size=backend_settings.get("batch_size", 1),
+            window=backend_settings.get("batch_window_seconds", 0.05),
+            slot=lambda: self.scheduler.slot("background", PRIORITY_BACKGROUND),
+            metrics=self.metrics
+        )
+        
+        # Embedding index over all bio messages for retrieval beyond the most recent turns
+        self.retrieval_config = self.config.get("retrieval", {})
+        self._embedding_index = None
+        self._embedding_lock = threading.Lock()
+        if self.retrieval_config.get("enabled", False):
+            self._embedding_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embeddings")
+            if self.retrieval_config.get("sync_on_startup", True) and not headless:
+                # Catch up on messages saved while the index was not being updated
+                self._embedding_executor.submit(self.sync_embeddings)
+        
+        # Biography synthesized in the background from all bio sessions, cached per period
+        self.synthesis_config = self.config.get("synthesis", {})
+        self.synthesizer = None
+        if self.synthesis_config.get("enabled", False):
+            self.synthesizer = BiographySynthesizer(
+                data_dir,
+                self.complete_synthesis,
+                self.context_manager.count_tokens,
+                self.synthesis_config,
+                requests=self.config["messages"]["synthesis_requests"],
+                model=self.model_name
+            )
+            if (self.synthesis_config.get("resume_on_startup", True) and not headless
+                    and self.synthesizer.interrupted()):
+                # Finished steps are cached, so the run continues where it stopped
+                self.start_biography_synthesis()
+        
+        # Local speech-to-text for the biographical tab; the model is loaded on the first recording
+        self.voice_config = self.config.get("voice", {})
+        self.transcriber = None
+        if self.voice_config.get("enabled", False) and not headless:
+            import voice
+            if voice.is_available():
+                self.transcriber = voice.Transcriber(self.voice_config, self.metrics)
+            else:
+                print(self.config["console_messages"]["voice_unavailable"])
+        
+        # Load the models in the background so the first message does not pay the load time
+        if backend_settings.get("warm_up", True) and not headless:
+            threading.Thread(target=self.warm_up, name="model-warm-up", daemon=True).start()
+        
+        # Have a contextual question ready before the first page load
+        self.schedule_welcome_question()
+    
+    @property
+    def model_name(self) -> str:
+        """Chat model in use (the fallback model once the main one turned out to be unavailable)"""
+        return self.backend.model
+    
+    def close(self):
+        """Release the instance's files: compact open session logs, save the response cache and close the index"""
+        atexit.unregister(self.store.close_all)
+        self.store.close_all()
+        if self.response_cache is not None:
+            self.response_cache.close()
+        self.index.close()
+    
+    @property
+    def embedding_index(self):
+        """Embedding index, or None when retrieval is disabled; opened on first use, so a headless
+        instance that never retrieves does not load it"""
+        if self._embedding_index is None and self.retrieval_config.get("enabled", False):
+            with self._embedding_lock:
+                if self._embedding_index is None:
+                    # Imported here: NumPy is only needed when retrieval is used
+                    from retrieval import EmbeddingIndex
+                    self._embedding_index = EmbeddingIndex(
+                        self.data_dir,
+                        self.embed_texts,
+                        self.retrieval_config.get("embedding_model", "nomic-embed-text"),
+                        batch_size=self.retrieval_config.get("batch_size", 32),
+                        max_chars=self.retrieval_config.get("max_chars", 2000)
+                    )
+        return self._embedding_index
+    
+    def warm_up(self):
+        """Load the chat and embedding models into the server's memory"""
+        extra_models = []
+        if self.retrieval_config.get("enabled", False):
+            extra_models.append(self.retrieval_config.get("embedding_model", "nomic-embed-text"))
+        with self.scheduler.slot("warm-up", PRIORITY_BACKGROUND):
+            self.backend.warm_up(extra_models)
     
     def load_config(self, config_file: str) -> Dict:
         """Load configuration from JSON file"""
@@ -48,10 +237,11 @@ class DigitalBiographer:
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in configuration file: {e}")
     
-    def generate_biographical_question(self) -> str:
+    def generate_biographical_question(self, recent_context: str = None) -> str:
         """Generate a contextual biographical prompt based on recent conversations"""
         # Try to get recent biographical conversations for context
-        recent_context = self.get_recent_biographical_context()
+        if recent_context is None:
+            recent_context = self.get_recent_biographical_context()
         
         if not recent_context:
             # Fall back to base prompts if no recent conversations
@@ -61,13 +251,23 @@ class DigitalBiographer:
         try:
             system_prompt = self.config["system_prompts"]["question_generator"]
             
+            # Older moments related to the recent conversations, if the embedding index is available
+            related_context = self.retrieve_related_context(recent_context)
+            if related_context:
+                recent_context += f"\n\n{self.config['messages']['related_memories_header']}\n\n{related_context}"
+            
             context_message = f"""{self.config["messages"]["recent_conversations_header"]}
 
 {recent_context}
 
 Generate a thoughtful follow-up question for the next conversation."""
             
-            question = self.chat_with_ai(context_message, system_prompt)
+            # Dated by day rather than second, so the same context gives the same (cacheable) request
+            question_messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"[{datetime.now().strftime('%Y-%m-%d')}] {context_message}"}
+            ]
+            question = self.cached_completion(question_messages, purpose="question")
             
             # Clean up the response (remove quotes, extra formatting)
             question = question.strip().strip('"').strip("'")
@@ -82,67 +282,53 @@ Generate a thoughtful follow-up question for the next conversation."""
             print(f"Error generating contextual question: {e}")
             return self.get_fallback_question()
     
-    def get_recent_biographical_context(self, max_messages: int = 10) -> str:
-        """Get recent biographical conversation context"""
-        bio_dir = os.path.join(self.data_dir, "bio")
-        if not os.path.exists(bio_dir):
-            return ""
-        
-        # Get all biographical session files from bio subdirectory
-        bio_files = []
-        for filename in os.listdir(bio_dir):
-            if filename.endswith('.json'):
-                filepath = os.path.join(bio_dir, filename)
-                try:
-                    mtime = os.path.getmtime(filepath)
-                    bio_files.append((filepath, mtime))
-                except:
-                    continue
-        
-        if not bio_files:
-            return ""
-        
-        # Sort by modification time (most recent first)
-        bio_files.sort(key=lambda x: x[1], reverse=True)
-        
-        # Collect recent messages
-        recent_messages = []
-        messages_collected = 0
-        
-        for filepath, _ in bio_files:
-            if messages_collected >= max_messages:
-                break
-                
+    def schedule_welcome_question(self):
+        """Precompute the welcome question in the background worker"""
+        if self.headless:
+            return
+        with self._question_lock:
+            if self._question_job is not None and not self._question_job.done():
+                # New data arrived while generating - run once more when the current job finishes
+                self._question_rerun = True
+                return
+            self._question_job = self._question_executor.submit(self._precompute_welcome_question)
+    
+    def _precompute_welcome_question(self):
+        """Generate and cache a contextual question for the current bio data version"""
+        while True:
+            with self._question_lock:
+                version = self._bio_version
+                self._question_rerun = False
+            
             try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                if 'messages' in data:
-                    # New session format - get messages from most recent to oldest
-                    session_messages = data['messages'][-max_messages:]  # Get last messages from session
-                    for msg in reversed(session_messages):  # Reverse to get most recent first
-                        if messages_collected >= max_messages:
-                            break
-                        recent_messages.append({
-                            'timestamp': msg['timestamp'],
-                            'user': msg['user'],
-                            'assistant': msg['assistant']
-                        })
-                        messages_collected += 1
-                        
+                with self.metrics.timed("welcome_question_seconds"):
+                    # Scan recent context once and reuse it for the question prompt
+                    recent_context = self.get_recent_biographical_context()
+                    question = self.generate_biographical_question(recent_context) if recent_context else None
             except Exception as e:
-                print(f"Error reading {filepath}: {e}")
-                continue
+                print(f"Error precomputing welcome question: {e}")
+                question = None
+            
+            with self._question_lock:
+                self._welcome_question = (version, question)
+                if not self._question_rerun:
+                    return
+    
+    def get_recent_biographical_context(self, max_messages: int = 10) -> str:
+        """Get recent biographical conversation context"""
+        # The index knows where the most recent bio messages are, so only those records are read
+        with self.metrics.timed("index_seconds", operation="recent_messages"):
+            recent_messages = self.index.recent_messages("bio", max_messages)
         
         if not recent_messages:
             return ""
         
-        # Sort by timestamp (most recent first) 
-        recent_messages.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        # Format for context
+        return self.format_message_context(recent_messages)
+    
+    def format_message_context(self, messages: List[Dict]) -> str:
+        """Format saved message pairs as dated context for the model"""
         context_parts = []
-        for i, msg in enumerate(recent_messages):
+        for msg in messages:
             # Parse timestamp for readable format
             try:
                 dt = datetime.fromisoformat(msg['timestamp'].replace('Z', '+00:00'))
@@ -157,6 +343,75 @@ Generate a thoughtful follow-up question for the next conversation."""
         
         return '\n'.join(context_parts)
     
+    def embed_texts(self, texts: List[str], ticket=None) -> List[List[float]]:
+        """Embed texts with the configured embedding model"""
+        if ticket is None:
+            with self.scheduler.slot("background", PRIORITY_BACKGROUND):
+                return self._embed_texts(texts)
+        return self._embed_texts(texts)
+    
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts while holding a scheduler slot"""
+        model = self.retrieval_config.get("embedding_model", "nomic-embed-text")
+        with self.metrics.timed("embedding_seconds"):
+            embeddings = self.backend.embed(model=model, input=texts)['embeddings']
+        self.metrics.inc("embedded_texts_total", len(texts))
+        return embeddings
+    
+    def sync_embeddings(self) -> int:
+        """Embed all bio messages that are missing from the embedding index"""
+        try:
+            return self.embedding_index.sync(self.index.iter_messages("bio"))
+        except Exception as e:
+            print(f"Error updating embedding index: {e}")
+            return 0
+    
+    def index_embedding(self, session_file: str, seq: int, message_entry: Dict):
+        """Embed a newly saved bio message"""
+        try:
+            self.embedding_index.add([(session_file, seq, message_entry)])
+        except Exception as e:
+            print(f"Error embedding message {seq} of {session_file}: {e}")
+    
+    def retrieve_related_context(self, query: str, exclude_session: str = None, ticket=None,
+                                 max_tokens: int = None) -> str:
+        """Find earlier bio messages semantically related to the query and format them as context.
+
+        With max_tokens, the most related messages that fit in that many tokens are kept."""
+        if self.embedding_index is None or not query.strip():
+            return ""
+        
+        try:
+            with self.metrics.timed("retrieval_seconds"):
+                results = self.embedding_index.search(
+                    query,
+                    top_k=self.retrieval_config.get("top_k", 4),
+                    min_score=self.retrieval_config.get("min_score", 0.35),
+                    exclude_session=exclude_session,
+                    embed=lambda texts: self.embed_texts(texts, ticket)
+                )
+        except Exception as e:
+            print(f"Error searching embedding index: {e}")
+            return ""
+        
+        related_messages = []
+        used_tokens = 0
+        for result in results:
+            session_file = self.embedding_index.session_path(result["session"])
+            if session_file:
+                message_entry = self.index.read_message(session_file, result["seq"])
+                if message_entry:
+                    # Results come most related first, so the least related are left out
+                    tokens = self.context_manager.count_tokens(self.format_message_context([message_entry])) + 1
+                    if max_tokens is not None and used_tokens + tokens > max_tokens:
+                        continue
+                    used_tokens += tokens
+                    related_messages.append(message_entry)
+        
+        # Present related moments in chronological order
+        related_messages.sort(key=lambda x: x['timestamp'])
+        return self.format_message_context(related_messages)
+    
     def get_fallback_question(self) -> str:
         """Get a fallback question when no recent context is available"""
         # Get current time context
@@ -180,265 +435,830 @@ Generate a thoughtful follow-up question for the next conversation."""
         
         return random.choice(base_prompts)
     
-    def chat_with_ai(self, message: str, system_prompt: str = None, conversation_history: str = "") -> str:
-        """Send message to Ollama and get response"""
+    def chat_with_ai(self, message: str, system_prompt: str = None, conversation_history: List[Dict] = None,
+                     current_time: datetime = None, stats: Dict = None, ticket=None,
+                     purpose: str = "chat") -> Iterator[str]:
+        """Send message to the model and yield the response chunks as they are generated"""
         try:
-            messages = []
-            
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            
-            # Parse conversation history to build context
-            if conversation_history:
-                # Extract previous exchanges from the history
-                lines = conversation_history.split('\n')
-                current_user_msg = None
-                current_ai_msg = None
-                
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith('**You:**'):
-                        if current_user_msg and current_ai_msg:
-                            messages.append({"role": "user", "content": current_user_msg})
-                            messages.append({"role": "assistant", "content": current_ai_msg})
-                        current_user_msg = line.replace('**You:**', '').strip()
-                        current_ai_msg = None
-                    elif line.startswith('**AI:**') or line.startswith('**AI Biographer:**'):
-                        current_ai_msg = line.replace('**AI:**', '').replace('**AI Biographer:**', '').strip()
-                
-                # Add the last pair if complete
-                if current_user_msg and current_ai_msg:
-                    messages.append({"role": "user", "content": current_user_msg})
-                    messages.append({"role": "assistant", "content": current_ai_msg})
-            
-            # Add datetime prefix to current message for AI context
-            current_time = datetime.now()
-            datetime_prefix = f"[{current_time.strftime('%Y-%m-%d %H:%M:%S')}] "
-            message_with_datetime = datetime_prefix + message
-            
-            # Add current message with datetime prefix
-            messages.append({"role": "user", "content": message_with_datetime})
-            
-            response = self.client.chat(
-                model=self.model_name,
-                messages=messages,
-                stream=False
-            )
-            
-            return response['message']['content']
+            messages = self.compose_messages(message, system_prompt, conversation_history, current_time)
+            yield from self.stream_completion(messages, stats, ticket, purpose)
             
         except Exception as e:
-            return self.config["error_messages"]["ai_communication"].format(error=e)
+            yield self.config["error_messages"]["ai_communication"].format(error=e)
     
-    def start_new_session(self, session_type: str) -> str:
-        """Start a new session and create a new session file"""
-        timestamp = datetime.now()
+    def compose_messages(self, message: str, system_prompt: str = None, conversation_history: List[Dict] = None,
+                         current_time: datetime = None) -> List[Dict]:
+        """Get the chat messages of a request: system prompt, previous context and the new message"""
+        messages = []
         
-        # Use subdirectories and new datetime format
-        if session_type == "biographical":
-            subdir = "bio"
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        
+        # Previous exchanges are kept as structured messages, passed straight to the client
+        if conversation_history:
+            messages.extend(conversation_history)
+        
+        # Add datetime prefix to current message for AI context
+        messages.append({"role": "user", "content": self.add_datetime_prefix(message, current_time)})
+        return messages
+    
+    def stream_completion(self, messages: List[Dict], stats: Dict = None, ticket=None,
+                          purpose: str = "chat", options: Dict = None) -> Iterator[str]:
+        """Stream a completion of prepared chat messages from the model backend, raising on errors"""
+        if ticket is None:
+            # Callers without a granted scheduler ticket (background jobs) wait for a slot here
+            with self.scheduler.slot("background", PRIORITY_BACKGROUND):
+                yield from self._stream_completion(messages, stats, purpose, options)
         else:
-            subdir = "general"
-            
-        session_dir = os.path.join(self.data_dir, subdir)
-        filename = os.path.join(session_dir, f"{timestamp.strftime('%Y-%m-%d_%H-%M-%S')}.json")
+            yield from self._stream_completion(messages, stats, purpose, options)
+    
+    def complete_text(self, messages: List[Dict], purpose: str, options: Dict = None) -> str:
+        """Complete prepared chat messages in full, in a slot the caller already holds"""
+        return "".join(self._stream_completion(messages, purpose=purpose, options=options))
+    
+    def background_completion(self, messages: List[Dict], purpose: str, ticket=None, options: Dict = None) -> str:
+        """Complete a request for a background job, batched with other background requests"""
+        if ticket is not None:
+            # Part of an interactive turn that already holds a slot
+            return self.complete_text(messages, purpose, options)
+        return self.batcher.submit(messages, purpose, options).result()
+    
+    def cached_completion(self, messages: List[Dict], purpose: str, ticket=None) -> str:
+        """Complete a deterministic request, answering repeats of the same request from the response cache"""
+        if self.response_cache is None:
+            return self.background_completion(messages, purpose, ticket)
         
-        # Initialize session file
-        session_data = {
-            "session_type": session_type,
-            "start_time": timestamp.isoformat(),
-            "messages": []
-        }
+        # Sampling is pinned so that a cached answer is one the model would give again
+        options = self.cache_config.get("options", {"temperature": 0, "seed": 0})
+        key = request_key(self.model_name, messages, options)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            self.metrics.inc("response_cache_hits_total", purpose=purpose)
+            return cached
+        
+        self.metrics.inc("response_cache_misses_total", purpose=purpose)
+        text = self.background_completion(messages, purpose, ticket, options)
+        if text.strip():
+            self.response_cache.put(key, text)
+        return text
+    
+    def _stream_completion(self, messages: List[Dict], stats: Dict = None, purpose: str = "chat",
+                           options: Dict = None) -> Iterator[str]:
+        """Stream a completion from the model backend while holding a scheduler slot"""
+        # Compared with the tokens Ollama actually evaluates, shows how much of the prompt its prefix cache served
+        self.metrics.inc("llm_prompt_tokens_estimated_total", self.context_manager.count_message_tokens(messages),
+                         purpose=purpose)
+        start_time = time.perf_counter()
+        first_token_time = None
+        chunk_count = 0
+        final_chunk = {}
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(session_data, f, indent=2, ensure_ascii=False)
+        try:
+            for chunk in self.backend.chat(
+                messages=messages,
+                stream=True,
+                options=options
+            ):
+                content = chunk['message']['content']
+                if content:
+                    if first_token_time is None:
+                        first_token_time = time.perf_counter()
+                    chunk_count += 1
+                    yield content
+                if chunk.get('done'):
+                    final_chunk = chunk
+        except Exception:
+            self.metrics.inc("llm_errors_total", purpose=purpose)
+            raise
         
-        # Track current session file
-        if session_type == "biographical":
-            self.current_bio_session_file = filename
-        else:
-            self.current_gen_session_file = filename
+        generation = self.measure_generation(start_time, first_token_time, chunk_count, final_chunk)
+        self.record_generation(purpose, generation)
+        if stats is not None:
+            stats.update(generation)
+    
+    def summarize_turns(self, previous_summary: str, messages: List[Dict], ticket=None) -> str:
+        """Fold older conversation turns into the rolling summary of the session"""
+        turns = []
+        for msg in messages:
+            speaker = "Human" if msg["role"] == "user" else "AI"
+            turns.append(f"{speaker}: {msg['content']}")
+        
+        request = self.config["messages"]["summary_update_request"].format(
+            summary=previous_summary or "-",
+            turns="\n\n".join(turns)
+        )
+        summary_messages = [
+            {"role": "system", "content": self.config["system_prompts"]["summarizer"]},
+            {"role": "user", "content": request}
+        ]
+        summary = self.cached_completion(summary_messages, ticket=ticket, purpose="summary").strip()
+        if not summary:
+            raise ValueError("Empty summary")
+        return summary
+    
+    def complete_synthesis(self, request: str, level: str) -> str:
+        """Generate one step of the biography synthesis in a background scheduler slot"""
+        synthesis_messages = [
+            {"role": "system", "content": self.config["system_prompts"]["synthesizer"]},
+            {"role": "user", "content": request}
+        ]
+        return self.background_completion(synthesis_messages, f"synthesis_{level}")
+    
+    def add_datetime_prefix(self, message: str, current_time: datetime = None) -> str:
+        """Prefix a user message with its datetime for history display and AI context"""
+        current_time = current_time or datetime.now()
+        return f"[{current_time.strftime('%Y-%m-%d %H:%M:%S')}] " + message
+    
+    def measure_generation(self, start_time: float, first_token_time: float, chunk_count: int, final_chunk: Dict) -> Dict:
+        """Compute time-to-first-token and generation speed of a streamed response"""
+        end_time = time.perf_counter()
+        time_to_first_token = (first_token_time or end_time) - start_time
+        
+        # Prefer Ollama's own token accounting; fall back to counting streamed chunks
+        eval_count = final_chunk.get('eval_count') or chunk_count
+        eval_duration = (final_chunk.get('eval_duration') or 0) / 1e9
+        if not eval_duration:
+            eval_duration = end_time - (first_token_time or end_time)
+        tokens_per_second = eval_count / eval_duration if eval_duration > 0 else 0.0
+        
+        return {
+            "time_to_first_token": time_to_first_token,
+            "tokens_per_second": tokens_per_second,
+            "eval_count": eval_count,
+            "eval_duration": eval_duration,
+            "prompt_eval_count": final_chunk.get('prompt_eval_count') or 0,
+            "prompt_eval_duration": (final_chunk.get('prompt_eval_duration') or 0) / 1e9,
+            "total_time": end_time - start_time
+        }
+    
+    def record_generation(self, purpose: str, generation: Dict):
+        """Add a finished generation to the latency and throughput metrics"""
+        self.metrics.inc("llm_requests_total", purpose=purpose)
+        self.metrics.inc("llm_generated_tokens_total", generation["eval_count"], purpose=purpose)
+        self.metrics.inc("llm_prompt_tokens_total", generation["prompt_eval_count"], purpose=purpose)
+        self.metrics.observe("llm_time_to_first_token_seconds", generation["time_to_first_token"], purpose=purpose)
+        self.metrics.observe("llm_generation_seconds", generation["eval_duration"], purpose=purpose)
+        self.metrics.observe("llm_request_seconds", generation["total_time"], purpose=purpose)
+        if generation["prompt_eval_duration"]:
+            # Prompt processing time shows how much a stable, cached prompt prefix saves
+            self.metrics.observe("llm_prompt_eval_seconds", generation["prompt_eval_duration"], purpose=purpose)
+    
+    def format_generation_stats(self, stats: Dict) -> str:
+        """Format the timing of a generation for display"""
+        if "time_to_first_token" not in stats:
+            return ""
+        return self.config["messages"]["generation_stats"].format(
+            ttft=stats["time_to_first_token"],
+            tps=stats["tokens_per_second"],
+            tokens=stats["eval_count"]
+        )
+    
+    def start_new_session(self, session_type: str) -> str:
+        """Start a new session and create a new session file"""
+        timestamp = datetime.now()
+        
+        # Initialize session file in the bio/general subdirectory
+        filename = self.store.create_session(session_type, timestamp)
         
         return filename
     
-    def save_conversation(self, user_message: str, ai_response: str, session_type: str = "general"):
-        """Add conversation to current session file"""
-        # Determine which session file to use
-        if session_type == "biographical":
-            session_file = self.current_bio_session_file
-        else:
-            session_file = self.current_gen_session_file
+    def save_conversation(self, user_message: str, ai_response: str, session_type: str = "general",
+                          conversation: Conversation = None):
+        """Add conversation to the client's current session file"""
+        if conversation is None:
+            conversation = self.default_conversations[session_type]
+        session_file = conversation.session_file
         
         # Create new session if none exists
         if not session_file or not os.path.exists(session_file):
             session_file = self.start_new_session(session_type)
         
-        # Load existing session data
-        try:
-            with open(session_file, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
-        except:
-            # If file is corrupted, start a new session
-            session_file = self.start_new_session(session_type)
-            with open(session_file, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
-        
-        # Add new message pair
+        # Add new message pair - constant cost per turn regardless of session size
+        timestamp = datetime.now()
         message_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp.isoformat(),
             "user": user_message,
             "assistant": ai_response
         }
+        if conversation.generation_stats.get("total_time") is not None:
+            # Kept with the message so the latency trend survives a rebuild of the index
+            message_entry["response_seconds"] = round(conversation.generation_stats["total_time"], 3)
+        if conversation.pending_audio:
+            message_entry["audio"] = self.save_audio(session_file, conversation.pending_audio, timestamp)
+            conversation.pending_audio = []
+        
+        previous_file = session_file
+        reopened = False
+        try:
+            with self.metrics.timed("storage_seconds", operation="append"):
+                session_file, offset, length = self.store.append_message(session_file, message_entry)
+            # A compacted session is reopened as a log of the same name; a fallback session is a different one
+            reopened = session_file != previous_file and session_file == os.path.splitext(previous_file)[0] + '.jsonl'
+        except Exception as e:
+            # If the session cannot be written, start a new session rather than losing the message
+            print(f"Error writing session {session_file}: {e}")
+            session_file = self.start_new_session(session_type)
+            session_file, offset, length = self.store.append_message(session_file, message_entry)
+        
+        try:
+            with self.metrics.timed("index_seconds", operation="record_message"):
+                if reopened:
+                    self.index.remove_file(previous_file)
+                seq = self.index.record_message(session_file, message_entry, offset, length)
+        except Exception as e:
+            print(f"Error updating index for {session_file}: {e}")
+            seq = None
         
-        session_data["messages"].append(message_entry)
-        session_data["last_updated"] = datetime.now().isoformat()
+        if session_type == "biographical" and self.embedding_index is not None and seq is not None:
+            self._embedding_executor.submit(self.index_embedding, session_file, seq, message_entry)
         
-        # Save updated session
-        with open(session_file, 'w', encoding='utf-8') as f:
-            json.dump(session_data, f, indent=2, ensure_ascii=False)
+        if session_type == "biographical":
+            # New bio data invalidates the cached welcome question
+            with self._question_lock:
+                self._bio_version += 1
+            self.schedule_welcome_question()
+        
+        conversation.session_file = session_file
     
-    def biographical_conversation(self, message: str, history: str) -> Tuple[str, str]:
-        """Handle biographical conversation with AI"""
-        if not message.strip():
-            return history, ""
-            
-        system_prompt = self.config["system_prompts"]["biographical"]
+    def save_audio(self, session_file: str, recordings: List[Tuple[bytes, str]], timestamp: datetime) -> List[str]:
+        """Write the recordings of a message next to its session, returning their paths relative to the session"""
+        # The directory is named after the session, which keeps its name when compacted
+        audio_dir = os.path.splitext(session_file)[0] + ".audio"
+        paths = []
+        try:
+            os.makedirs(audio_dir, exist_ok=True)
+            for number, (data, extension) in enumerate(recordings):
+                filename = f"{timestamp.strftime('%H-%M-%S')}-{number}{extension}"
+                with open(os.path.join(audio_dir, filename), 'wb') as f:
+                    f.write(data)
+                paths.append(os.path.join(os.path.basename(audio_dir), filename))
+        except OSError as e:
+            print(f"Error saving audio for {session_file}: {e}")
+        return paths
+    
+    def save_summary(self, conversation: Conversation):
+        """Store the conversation's rolling summary alongside its session"""
+        session_file = conversation.session_file
+        if not session_file:
+            return
+        
+        summary_record = {
+            "timestamp": datetime.now().isoformat(),
+            "text": conversation.summary,
+            # Counted from the start of the session, including turns a resumed conversation left on disk
+            "covered_messages": 2 * conversation.turn_offset + conversation.summary_covered
+        }
+        try:
+            with self.metrics.timed("storage_seconds", operation="summary"):
+                new_file = self.store.save_summary(session_file, summary_record)
+            if new_file != session_file:
+                self.index.replace_file(session_file, new_file)
+                conversation.session_file = new_file
+            else:
+                self.index.record_summary(session_file, summary_record)
+        except Exception as e:
+            print(f"Error saving summary for {session_file}: {e}")
+    
+    def close_session(self, conversation: Conversation):
+        """Close the conversation's session so its log is compacted into the JSON format"""
+        if conversation is None:
+            return
+        session_file, conversation.session_file = conversation.session_file, None
         
-        response = self.chat_with_ai(message, system_prompt, history)
+        if session_file:
+            try:
+                with self.metrics.timed("storage_seconds", operation="close"):
+                    final_file = self.store.close_session(session_file)
+                if final_file != session_file:
+                    self.index.replace_file(session_file, final_file)
+            except Exception as e:
+                print(f"Error closing session {session_file}: {e}")
+    
+    def stream_conversation(self, message: str, conversation: Conversation, session_type: str,
+                            client_id: str = "local") -> Iterator[Tuple[List[Dict], str, str, Conversation]]:
+        """Stream an AI reply into the history view and persist the exchange once it is complete"""
+        # The chat view is rendered from the structured conversation, never sent back by the browser.
+        # Successive yields of one event only differ in the growing reply, so Gradio sends just that delta
+        if conversation is None:
+            conversation = Conversation(session_type)
         
-        # Save conversation (original message without datetime prefix)
-        self.save_conversation(message, response, "biographical")
+        if not message.strip():
+            stats = self.format_generation_stats(conversation.generation_stats)
+            yield self.history_view(conversation), "", stats, conversation
+            return
         
         # Add datetime prefix for history display and future AI context
         current_time = datetime.now()
-        datetime_prefix = f"[{current_time.strftime('%Y-%m-%d %H:%M:%S')}] "
-        message_with_datetime = datetime_prefix + message
+        message_with_datetime = self.add_datetime_prefix(message, current_time)
+        
+        # Wait for a slot on the shared model, showing the queue position meanwhile
+        try:
+            ticket = self.scheduler.enqueue(client_id)
+        except QueueFullError:
+            # Backpressure: keep the message in the input so it can be sent again
+            yield self.history_view(conversation), message, self.config["error_messages"]["server_busy"], conversation
+            return
+        
+        # Keep the view to the latest page of turns, so each turn costs the same however long the session is
+        page_size = self.history_config.get("page_size", 20)
+        conversation.view_start = max(conversation.view_start, conversation.turn_count + 1 - page_size)
+        view = self.history_view(conversation) + [{"role": "user", "content": message_with_datetime}]
+        
+        summary_covered = conversation.summary_covered
+        try:
+            while True:
+                position = self.scheduler.wait(ticket, timeout=0.5)
+                if position is None:
+                    break
+                queue_status = self.config["messages"]["queue_position"].format(position=position)
+                yield view, "", queue_status, conversation
+            
+            # Progressively update the last message with the partial response
+            response = ""
+            stats = {"queue_wait": ticket.wait_time}
+            for chunk in self.generate_reply(message, conversation, session_type, current_time, stats, ticket):
+                response += chunk
+                yield view + [{"role": "assistant", "content": response}], "", "", conversation
+        finally:
+            self.scheduler.release(ticket)
+        
+        self.finish_turn(message, response, conversation, session_type, current_time, stats, summary_covered)
         
-        # Update history with datetime prefix
-        new_history = history + f"\n\n**You:** {message_with_datetime}\n\n**AI Biographer:** {response}\n\n---"
+        yield view + [{"role": "assistant", "content": response}], "", self.format_generation_stats(stats), conversation
+    
+    def ask(self, message: str, conversation: Conversation, session_type: str = "general",
+            client_id: str = "headless") -> Iterator[str]:
+        """Answer a message without the web UI, yielding the response chunks and saving the exchange"""
+        current_time = datetime.now()
+        summary_covered = conversation.summary_covered
+        response = ""
+        # Blocks until the scheduler grants a slot; raises QueueFullError when the queue is full
+        with self.scheduler.slot(client_id, PRIORITY_INTERACTIVE) as ticket:
+            stats = {"queue_wait": ticket.wait_time}
+            for chunk in self.generate_reply(message, conversation, session_type, current_time, stats, ticket):
+                response += chunk
+                yield chunk
         
-        return new_history, ""
+        self.finish_turn(message, response, conversation, session_type, current_time, stats, summary_covered)
     
-    def general_conversation(self, message: str, history: str) -> Tuple[str, str]:
+    def generate_reply(self, message: str, conversation: Conversation, session_type: str, current_time: datetime,
+                       stats: Dict, ticket) -> Iterator[str]:
+        """Build the prompt for a message within the token budget and stream the reply, holding a scheduler slot"""
+        system_prompt, context_messages = self.build_prompt(message, conversation, session_type, current_time, ticket)
+        yield from self.chat_with_ai(message, system_prompt, context_messages, current_time, stats, ticket)
+    
+    def build_prompt(self, message: str, conversation: Conversation, session_type: str, current_time: datetime,
+                     ticket=None) -> Tuple[str, List[Dict]]:
+        """Get the system prompt and the context messages (summary, recent turns, related memories) of a message"""
+        if session_type == "biographical":
+            system_prompt = self.config["system_prompts"]["biographical"]
+        else:
+            system_prompt = self.config["system_prompts"]["general"]
+        
+        prompt_message = self.add_datetime_prefix(message, current_time)
+        related_messages = []
+        if session_type == "biographical":
+            related_header = self.config['messages']['related_memories_header']
+            # Ground the reply in related moments from the whole biography, in a share of the budget that the
+            # recent turns leave free; placed after the history so the system prompt and earlier turns remain
+            # a stable prompt prefix
+            header_tokens = self.context_manager.count_message_tokens([{"content": f"{related_header}\n\n"}])
+            max_tokens = min(int(self.context_manager.budget * self.retrieval_config.get("context_share", 0.25)),
+                             self.context_manager.available_tokens(conversation, system_prompt, prompt_message)
+                             - header_tokens)
+            related_context = ""
+            if max_tokens > 0:
+                related_context = self.retrieve_related_context(message, conversation.session_file, ticket,
+                                                                max_tokens)
+            if related_context:
+                related_messages = [{
+                    "role": "system",
+                    "content": f"{related_header}\n\n{related_context}"
+                }]
+        
+        # Keep the prompt inside the token budget, summarizing older turns when needed
+        context_messages = self.context_manager.prepare(
+            conversation, system_prompt, prompt_message,
+            summarize=lambda summary, turns: self.summarize_turns(summary, turns, ticket),
+            reserved_tokens=self.context_manager.count_message_tokens(related_messages)
+        ) + related_messages
+        return system_prompt, context_messages
+    
+    def finish_turn(self, message: str, response: str, conversation: Conversation, session_type: str,
+                    current_time: datetime, stats: Dict, summary_covered: int):
+        """Add a completed exchange to the conversation and persist it"""
+        conversation.generation_stats = stats
+        conversation.messages.append({"role": "user", "content": self.add_datetime_prefix(message, current_time)})
+        conversation.messages.append({"role": "assistant", "content": response})
+        
+        # Save conversation once, at the end (original message without datetime prefix)
+        self.save_conversation(message, response, session_type, conversation)
+        if conversation.summary_covered != summary_covered:
+            self.save_summary(conversation)
+    
+    def biographical_conversation(self, message: str, conversation: Conversation = None,
+                                  request: "gr.Request" = None) -> Iterator[Tuple[List[Dict], str, str, Conversation]]:
+        """Handle biographical conversation with AI"""
+        client_id = request.session_hash if request else "local"
+        yield from self.stream_conversation(message, conversation, "biographical", client_id)
+    
+    def general_conversation(self, message: str, conversation: Conversation = None,
+                             request: "gr.Request" = None) -> Iterator[Tuple[List[Dict], str, str, Conversation]]:
         """Handle general conversation with AI"""
-        if not message.strip():
-            return history, ""
-            
-        system_prompt = self.config["system_prompts"]["general"]
+        client_id = request.session_hash if request else "local"
+        yield from self.stream_conversation(message, conversation, "general", client_id)
+    
+    def stream_voice(self, chunk: Tuple, recording, current_input: str):
+        """Add a chunk of microphone audio, transcribing complete segments while the user speaks"""
+        from voice import VoiceRecording
+        if recording is None:
+            recording = VoiceRecording(prefix=current_input or "")
+        if chunk is not None:
+            sample_rate, samples = chunk
+            self.transcriber.feed(recording, sample_rate, samples)
+        return recording.input_text(), recording
+    
+    def finish_voice(self, recording, current_input: str,
+                     conversation: Conversation) -> Tuple[str, None, Conversation]:
+        """Transcribe the rest of a recording into the message input and keep its audio for the message"""
+        if recording is None:
+            return current_input, None, conversation
+        text = self.transcriber.finish(recording)
+        try:
+            conversation.pending_audio.append(self.transcriber.encode(recording.audio()))
+        except Exception as e:
+            print(f"Error encoding audio: {e}")
+        return text, None, conversation
+    
+    def transcribe_recording(self, filepath: str, current_input: str,
+                             conversation: Conversation) -> Tuple[str, Conversation]:
+        """Transcribe an uploaded recording into the message input, its segments in parallel"""
+        if not filepath:
+            return current_input, conversation
+        try:
+            text, audio = self.transcriber.transcribe_file(filepath)
+            conversation.pending_audio.append(self.transcriber.encode(audio))
+        except Exception as e:
+            print(f"Error transcribing {filepath}: {e}")
+            return current_input, conversation
+        return " ".join(part for part in ((current_input or "").strip(), text) if part), conversation
+    
+    def turn_messages(self, message_entry: Dict) -> List[Dict]:
+        """Convert a saved message pair into chat messages, as they were shown when it was sent"""
+        try:
+            sent_time = datetime.fromisoformat(message_entry["timestamp"])
+        except (KeyError, ValueError):
+            sent_time = None
+        return [
+            {"role": "user", "content": self.add_datetime_prefix(message_entry["user"], sent_time)},
+            {"role": "assistant", "content": message_entry["assistant"]}
+        ]
+    
+    def history_view(self, conversation: Conversation) -> List[Dict]:
+        """Chat messages shown for a conversation: its turns from the view start, below the greeting"""
+        view = []
+        if conversation.view_start == 0 and conversation.greeting:
+            view.append({"role": "assistant", "content": conversation.greeting})
         
-        response = self.chat_with_ai(message, system_prompt, history)
+        if conversation.view_start < conversation.turn_offset and conversation.session_file:
+            # Older turns of a resumed session are paged in from the session file
+            try:
+                for message_entry in self.index.session_messages(conversation.session_file, conversation.view_start,
+                                                                 conversation.turn_offset):
+                    view.extend(self.turn_messages(message_entry))
+            except Exception as e:
+                print(f"Error reading history of {conversation.session_file}: {e}")
         
-        # Save conversation (original message without datetime prefix)
-        self.save_conversation(message, response, "general")
+        view.extend(conversation.messages[2 * max(0, conversation.view_start - conversation.turn_offset):])
+        return view
+    
+    def load_earlier_turns(self, conversation: Conversation) -> Tuple[List[Dict], Conversation]:
+        """Extend the history view by one page of older turns"""
+        page_size = self.history_config.get("page_size", 20)
+        conversation.view_start = max(0, conversation.view_start - page_size)
+        return self.history_view(conversation), conversation
+    
+    def load_conversation(self, session_file: str, session_type: str = None) -> Conversation:
+        """Resume a saved session from the index: its rolling summary and the last turns that fit the token budget"""
+        session_type = session_type or ("biographical" if self.index.location_of(session_file) == "bio" else "general")
+        conversation = Conversation(session_type)
+        conversation.session_file = session_file
         
-        # Add datetime prefix for history display and future AI context
-        current_time = datetime.now()
-        datetime_prefix = f"[{current_time.strftime('%Y-%m-%d %H:%M:%S')}] "
-        message_with_datetime = datetime_prefix + message
+        summary = self.index.session_summary(session_file)
+        covered_turns = 0
+        if summary:
+            conversation.summary = summary["text"]
+            covered_turns = summary["covered_messages"] // 2
+        
+        # Only the last turns are loaded, as many as fit the share of the budget left after summarizing
+        total = self.index.message_count(session_file)
+        covered_turns = min(covered_turns, total)
+        start = max(covered_turns, total - self.history_config.get("resume_turns", 20))
+        messages = []
+        for message_entry in self.index.session_messages(session_file, start):
+            messages.extend(self.turn_messages(message_entry))
+        
+        budget = (self.context_manager.budget * self.context_manager.target_ratio
+                  - self.context_manager.count_tokens(conversation.summary))
+        keep_minimum = self.context_manager.min_recent_turns * 2
+        while len(messages) > keep_minimum and self.context_manager.count_message_tokens(messages) > budget:
+            messages = messages[2:]
+        
+        conversation.messages = messages
+        conversation.turn_offset = total - len(messages) // 2
+        conversation.view_start = max(0, total - self.history_config.get("page_size", 20))
+        if conversation.turn_offset > covered_turns:
+            # The turns between the summary and the loaded ones are summarized in the background, outside
+            # the interactive turns; headless runs leave them out of the prompts instead
+            conversation.summary_pending = True
+            if not self.headless:
+                self._summary_executor.submit(self.backfill_summary, conversation, covered_turns)
+        return conversation
+    
+    def backfill_summary(self, conversation: Conversation, start: int):
+        """Fold the turns a resumed session did not load into its summary, reading them page by page"""
+        stop = conversation.turn_offset
+        summary = conversation.summary
+        page_size = self.history_config.get("page_size", 20)
+        pending = []
+        try:
+            for page_start in range(start, stop, page_size):
+                # Read by the current name: the session is renamed when it is reopened as a log
+                for message_entry in self.index.session_messages(conversation.session_file, page_start,
+                                                                 min(stop, page_start + page_size)):
+                    pending.extend(self.turn_messages(message_entry))
+                last_page = page_start + page_size >= stop
+                while pending:
+                    count = self.context_manager.chunk_size(pending, summary)
+                    if count == len(pending) and not last_page:
+                        # Fill the request with the next page
+                        break
+                    if conversation.session_file is None:
+                        # Closed meanwhile; its stored summary still covers what it did
+                        return
+                    summary = self.summarize_turns(summary, pending[:count])
+                    pending = pending[count:]
+        except Exception as e:
+            print(f"Error summarizing earlier turns of {conversation.session_file}: {e}")
+            return
+        
+        conversation.summary = summary
+        conversation.summary_pending = False
+        self.save_summary(conversation)
+    
+    def session_choices(self, session_type: str, pages: int = 1) -> List[Tuple[str, str]]:
+        """List past sessions as (label, file) pairs for the session browser, newest first"""
+        location = "bio" if session_type == "biographical" else "general"
+        page_size = self.history_config.get("sessions_page_size", 20)
+        choices = []
+        for session in self.index.list_sessions(location, limit=page_size * max(1, pages)):
+            try:
+                updated = datetime.fromisoformat(session["last_updated"]).strftime('%Y-%m-%d %H:%M')
+            except (TypeError, ValueError):
+                updated = session["last_updated"] or ""
+            preview = " ".join(session["preview"].split())
+            if len(preview) > 60:
+                preview = preview[:60] + "…"
+            label = self.config["messages"]["session_choice"].format(
+                date=updated, count=session["message_count"], preview=preview
+            )
+            choices.append((label, session["path"]))
+        return choices
+    
+    def continue_session(self, session_file: str, conversation: Conversation) -> Tuple[List[Dict], str, Conversation]:
+        """Switch the chat to a past session; new messages are appended to it"""
+        if not session_file:
+            return self.history_view(conversation), "", conversation
+        if not os.path.exists(session_file):
+            # Compacted or reopened since the list was loaded
+            return self.history_view(conversation), self.config["messages"]["session_missing"], conversation
         
-        # Update history with datetime prefix
-        new_history = history + f"\n\n**You:** {message_with_datetime}\n\n**AI:** {response}\n\n---"
+        if conversation.session_file != session_file:
+            self.close_session(conversation)
         
-        return new_history, ""
+        with self.metrics.timed("index_seconds", operation="load_conversation"):
+            resumed = self.load_conversation(session_file, conversation.session_type)
+        return self.history_view(resumed), "", resumed
     
     def get_biographical_welcome_message(self) -> str:
         """Get biographical welcome message without creating session file"""
-        # Get recent context to determine if we're generating contextual or fallback questions
-        recent_context = self.get_recent_biographical_context()
+        # Serve the precomputed question if it matches the current bio data, never blocking on the LLM
+        with self._question_lock:
+            cached = self._welcome_question
+            fresh = cached is not None and cached[0] == self._bio_version
         
-        if recent_context:
-            # Generate contextual question
-            question = self.generate_biographical_question()
-            welcome_msg = self.config["messages"]["biographical_welcome"].format(question=question)
+        if fresh and cached[1]:
+            # Contextual question generated in the background
+            welcome_msg = self.config["messages"]["biographical_welcome"].format(question=cached[1])
             return welcome_msg + "\n\n*✨ This question was generated based on your recent conversations.*"
-        else:
-            # Use fallback question
-            question = self.generate_biographical_question()  # Will use fallback
-            return self.config["messages"]["biographical_welcome"].format(question=question)
+        
+        if not fresh:
+            self.schedule_welcome_question()
+        
+        # Use fallback question until a contextual one is ready
+        question = self.get_fallback_question()
+        return self.config["messages"]["biographical_welcome"].format(question=question)
     
     def get_general_welcome_message(self) -> str:
         """Get general welcome message without creating session file"""
         return self.config["messages"]["general_welcome"]
 
-    def start_biographical_session(self) -> str:
+    def start_biographical_session(self, conversation: Conversation = None) -> Tuple[List[Dict], Conversation]:
         """Start a new biographical session"""
-        # Reset session tracking - new session will be created on first message
-        self.current_bio_session_file = None
+        # Close the previous session - new session will be created on first message
+        self.close_session(conversation or self.default_conversations["biographical"])
         
-        return self.get_biographical_welcome_message()
+        conversation = Conversation("biographical")
+        conversation.greeting = self.get_biographical_welcome_message()
+        return self.history_view(conversation), conversation
     
-    def start_general_session(self) -> str:
+    def start_general_session(self, conversation: Conversation = None) -> Tuple[List[Dict], Conversation]:
         """Start a new general chat session"""
-        # Reset session tracking - new session will be created on first message
-        self.current_gen_session_file = None
+        # Close the previous session - new session will be created on first message
+        self.close_session(conversation or self.default_conversations["general"])
         
-        return self.get_general_welcome_message()
+        conversation = Conversation("general")
+        conversation.greeting = self.get_general_welcome_message()
+        return self.history_view(conversation), conversation
     
     def get_data_info(self) -> str:
         """Get information about saved conversations"""
-        if not os.path.exists(self.data_dir):
-            return self.config["messages"]["no_conversations"]
-        
-        # Check both subdirectories
-        bio_dir = os.path.join(self.data_dir, "bio")
-        general_dir = os.path.join(self.data_dir, "general")
+        # Counts come from the session index instead of parsing every file
+        with self.metrics.timed("index_seconds", operation="stats"):
+            stats = self.index.stats()
         
-        files = []
-        
-        # Get files from bio directory
-        if os.path.exists(bio_dir):
-            bio_files = [os.path.join(bio_dir, f) for f in os.listdir(bio_dir) if f.endswith('.json')]
-            files.extend(bio_files)
+        if not stats["total_files"]:
+            info = self.config["messages"]["no_conversations"]
+        else:
+            info = self.config["messages"]["data_stats"].format(
+                total_files=stats["total_files"],
+                bio_sessions=stats["bio_sessions"],
+                gen_sessions=stats["gen_sessions"],
+                total_messages=stats["total_messages"],
+                data_path=os.path.abspath(self.data_dir)
+            )
         
-        # Get files from general directory  
-        if os.path.exists(general_dir):
-            general_files = [os.path.join(general_dir, f) for f in os.listdir(general_dir) if f.endswith('.json')]
-            files.extend(general_files)
+        # High-water mark of the process, for sizing the container's memory limit
+        peak = peak_rss_bytes()
+        if peak is not None:
+            info += "\n\n" + self.config["messages"]["data_memory"].format(peak_mb=peak / 2 ** 20)
+        return info
+    
+    def render_chart(self, columns: Dict[str, list]):
+        """Chart value for a Gradio plot"""
+        # pandas comes with Gradio; only the web interface renders charts
+        import pandas as pd
+        return pd.DataFrame(columns, columns=["week", "value", "series"])
+    
+    def get_insights(self) -> Tuple:
+        """Weekly insight charts for the Data tab, in the order of CHART_NAMES"""
+        with self.metrics.timed("insights_seconds"):
+            charts = self.insights.charts()
+        return tuple(charts[name] for name in CHART_NAMES)
+    
+    def parse_search_date(self, value: str, end: bool = False) -> str:
+        """Convert a YYYY-MM-DD filter date to an ISO bound (the end date is inclusive)"""
+        value = (value or "").strip()
+        if not value:
+            return None
+        day = datetime.strptime(value, "%Y-%m-%d")
+        if end:
+            day += timedelta(days=1)
+        return day.isoformat()
+    
+    def search_conversations(self, query: str, session_type: str = "all", date_from: str = "",
+                             date_to: str = "") -> str:
+        """Search all saved conversations and format ranked snippets as Markdown"""
+        if not query or not query.strip():
+            return ""
         
-        # Also check for any legacy files in the main data directory
-        legacy_files = []
-        for f in os.listdir(self.data_dir):
-            if f.endswith('.json'):
-                legacy_files.append(os.path.join(self.data_dir, f))
-        files.extend(legacy_files)
+        try:
+            start = self.parse_search_date(date_from)
+            end = self.parse_search_date(date_to, end=True)
+        except ValueError:
+            return self.config["messages"]["search_invalid_date"]
         
-        if not files:
-            return self.config["messages"]["no_conversations"]
+        search_start = time.perf_counter()
+        try:
+            with self.metrics.timed("index_seconds", operation="search"):
+                results = self.index.search(
+                    query,
+                    session_type=None if session_type == "all" else session_type,
+                    start=start,
+                    end=end,
+                    limit=self.search_config.get("max_results", 50),
+                    snippet_tokens=self.search_config.get("snippet_tokens", 16),
+                    prefix=self.search_config.get("prefix_match", True)
+                )
+        except Exception as e:
+            print(f"Error searching conversations: {e}")
+            return self.config["messages"]["search_no_results"]
+        elapsed_ms = (time.perf_counter() - search_start) * 1000
         
-        biographical_sessions = 0
-        general_sessions = 0
-        total_messages = 0
+        if not results:
+            return self.config["messages"]["search_no_results"]
         
-        for filepath in files:
+        search_text = self.config["ui_text"]["search_tab"]
+        type_labels = {"biographical": search_text["type_biographical"], "general": search_text["type_general"]}
+        parts = [self.config["messages"]["search_results"].format(count=len(results), ms=elapsed_ms)]
+        for result in results:
             try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if 'messages' in data:  # New session format
-                        total_messages += len(data['messages'])
-                        if data.get('session_type') == 'biographical' or 'bio' in filepath:
-                            biographical_sessions += 1
-                        else:
-                            general_sessions += 1
-                    else:  # Old individual message format
-                        total_messages += 1
-                        if data.get('session_type') == 'biographical' or 'bio' in filepath:
-                            biographical_sessions += 1
-                        else:
-                            general_sessions += 1
-            except:
-                continue
-        
-        return self.config["messages"]["data_stats"].format(
-            total_files=len(files),
-            bio_sessions=biographical_sessions,
-            gen_sessions=general_sessions,
-            total_messages=total_messages,
-            data_path=os.path.abspath(self.data_dir)
+                dt = datetime.fromisoformat(result["timestamp"].replace('Z', '+00:00'))
+                time_str = dt.strftime('%Y-%m-%d %H:%M')
+            except Exception:
+                time_str = result["timestamp"] or ""
+            session_label = type_labels.get(result["session_type"], result["session_type"])
+            parts.append(
+                f"**{time_str}** · {session_label} · `{os.path.basename(result['path'])}`\n\n"
+                f"**You:** {result['user']}\n\n"
+                f"**AI:** {result['assistant']}"
+            )
+        return "\n\n---\n\n".join(parts)
+    
+    def start_biography_synthesis(self) -> str:
+        """Start updating the biography in the background"""
+        if self.synthesizer is None:
+            return self.config["messages"]["synthesis_disabled"]
+        if not self.synthesizer.start(lambda: self.index.iter_messages("bio")):
+            return self.config["messages"]["synthesis_already_running"]
+        return self.config["messages"]["synthesis_started"]
+    
+    def get_biography_status(self) -> str:
+        """Get the progress of the current or last biography synthesis"""
+        if self.synthesizer is None:
+            return self.config["messages"]["synthesis_disabled"]
+        progress = self.synthesizer.progress()
+        state = progress.get("state", "idle")
+        if state == "running" and not self.synthesizer.running:
+            state = "interrupted"
+        return self.config["messages"][f"synthesis_status_{state}"].format(
+            stage=progress.get("stage") or "",
+            completed=progress.get("completed", 0),
+            total=progress.get("total", 0),
+            reused=progress.get("reused", 0),
+            failed=progress.get("failed", 0),
+            finished=(progress.get("finished") or "")[:16].replace("T", " "),
+            error=progress.get("error") or ""
         )
+    
+    def get_biography(self) -> str:
+        """Get the last synthesized biography"""
+        document = self.synthesizer.read_document() if self.synthesizer is not None else ""
+        return document or self.config["messages"]["biography_empty"]
+    
+    def get_performance_info(self) -> str:
+        """Get rolling latency percentiles and token throughput as a Markdown table"""
+        rows = self.metrics.summary_rows()
+        if not rows:
+            return self.config["messages"]["metrics_empty"]
+        
+        lines = [self.config["messages"]["metrics_table_header"], "|---|---|---:|---:|---:|---:|"]
+        for name, labels, count, mean, p50, p95 in rows:
+            lines.append(f"| {name} | {labels} | {count} | {mean * 1000:.1f} | {p50 * 1000:.1f} | {p95 * 1000:.1f} |")
+        
+        generated_tokens = self.metrics.counter_value("llm_generated_tokens_total")
+        prompt_tokens = self.metrics.counter_value("llm_prompt_tokens_total")
+        lines.append("")
+        lines.append(self.config["messages"]["metrics_tokens"].format(
+            generated=int(generated_tokens),
+            prompt=int(prompt_tokens),
+            errors=int(self.metrics.counter_value("llm_errors_total"))
+        ))
+        
+        hits = self.metrics.counter_value("response_cache_hits_total")
+        misses = self.metrics.counter_value("response_cache_misses_total")
+        estimated_prompt = self.metrics.counter_value("llm_prompt_tokens_estimated_total")
+        lines.append("")
+        lines.append(self.config["messages"]["metrics_cache"].format(
+            hits=int(hits),
+            misses=int(misses),
+            hit_rate=hits / (hits + misses) if hits + misses else 0.0,
+            prompt_reuse=max(0.0, 1 - prompt_tokens / estimated_prompt) if estimated_prompt else 0.0
+        ))
+        return "\n".join(lines)
+    
+    def start_metrics_server(self):
+        """Serve metrics for Prometheus on the configured local port, if enabled"""
+        if not self.metrics_config.get("enabled", True):
+            return None
+        host = self.metrics_config.get("host", "127.0.0.1")
+        port = self.metrics_config.get("port", 9464)
+        try:
+            server = MetricsServer(self.metrics, host, port)
+        except OSError as e:
+            print(f"Error starting metrics endpoint on {host}:{port}: {e}")
+            return None
+        server.start()
+        print(self.config["console_messages"]["metrics_url"].format(host=host, port=port))
+        return server
 
 
 def create_gradio_interface(biographer: DigitalBiographer):
     """Create Gradio web interface"""
+    # Bound at module level: Gradio resolves the "gr.Request" annotations of the handlers against this module
+    global gr
+    import gradio as gr
+    
     config = biographer.config
     ui_text = config["ui_text"]
     
@@ -449,12 +1269,11 @@ def create_gradio_interface(biographer: DigitalBiographer):
         with gr.Tab(ui_text["biographical_tab"]["title"]):
             gr.Markdown(ui_text["biographical_tab"]["description"])
             
-            bio_history = gr.Textbox(
-                label=ui_text["biographical_tab"]["history_label"],
-                lines=15,
-                interactive=False,
-                value=biographer.get_biographical_welcome_message()
-            )
+            bio_earlier = gr.Button(ui_text["biographical_tab"]["load_earlier_button"], size="sm")
+            bio_history = gr.Chatbot(label=ui_text["biographical_tab"]["history_label"], type="messages")
+            bio_stats = gr.Markdown()
+            # Closing or reloading the tab closes the session, so its log is compacted and its handle released
+            bio_messages = gr.State(Conversation("biographical"), delete_callback=biographer.close_session)
             bio_input = gr.Textbox(
                 label=ui_text["biographical_tab"]["input_label"],
                 placeholder=ui_text["biographical_tab"]["input_placeholder"],
@@ -463,33 +1282,99 @@ def create_gradio_interface(biographer: DigitalBiographer):
             bio_submit = gr.Button(ui_text["biographical_tab"]["submit_button"], variant="primary")
             bio_clear = gr.Button(ui_text["biographical_tab"]["clear_button"], variant="secondary")
             
+            if biographer.transcriber is not None:
+                # Speech is transcribed into the input while recording; uploads are transcribed in parallel segments
+                with gr.Row():
+                    bio_microphone = gr.Audio(
+                        sources=["microphone"],
+                        type="numpy",
+                        streaming=True,
+                        label=ui_text["biographical_tab"]["microphone_label"]
+                    )
+                    bio_upload = gr.Audio(
+                        sources=["upload"],
+                        type="filepath",
+                        label=ui_text["biographical_tab"]["upload_label"]
+                    )
+                bio_recording = gr.State(None)
+                
+                bio_microphone.stream(
+                    biographer.stream_voice,
+                    inputs=[bio_microphone, bio_recording, bio_input],
+                    outputs=[bio_input, bio_recording],
+                    stream_every=biographer.voice_config.get("stream_every_seconds", 1.0),
+                    time_limit=None
+                )
+                
+                bio_microphone.stop_recording(
+                    biographer.finish_voice,
+                    inputs=[bio_recording, bio_input, bio_messages],
+                    outputs=[bio_input, bio_recording, bio_messages]
+                )
+                
+                bio_upload.upload(
+                    biographer.transcribe_recording,
+                    inputs=[bio_upload, bio_input, bio_messages],
+                    outputs=[bio_input, bio_messages]
+                )
+            
             # Handle both button click and Shift+Enter
             bio_submit.click(
                 biographer.biographical_conversation,
-                inputs=[bio_input, bio_history],
-                outputs=[bio_history, bio_input]
+                inputs=[bio_input, bio_messages],
+                outputs=[bio_history, bio_input, bio_stats, bio_messages]
             )
             
             bio_input.submit(
                 biographer.biographical_conversation,
-                inputs=[bio_input, bio_history],
-                outputs=[bio_history, bio_input]
+                inputs=[bio_input, bio_messages],
+                outputs=[bio_history, bio_input, bio_stats, bio_messages]
             )
             
             bio_clear.click(
                 biographer.start_biographical_session,
-                outputs=[bio_history]
+                inputs=[bio_messages],
+                outputs=[bio_history, bio_messages]
+            )
+            
+            bio_earlier.click(
+                biographer.load_earlier_turns,
+                inputs=[bio_messages],
+                outputs=[bio_history, bio_messages]
+            )
+            
+            # Past sessions are listed from the index when the panel is opened, one page at a time
+            with gr.Accordion(ui_text["biographical_tab"]["sessions_heading"], open=False) as bio_sessions_panel:
+                bio_session_pages = gr.State(1)
+                bio_session_list = gr.Dropdown(label=ui_text["biographical_tab"]["sessions_label"], choices=[])
+                with gr.Row():
+                    bio_sessions_more = gr.Button(ui_text["biographical_tab"]["sessions_more_button"], size="sm")
+                    bio_continue = gr.Button(ui_text["biographical_tab"]["continue_button"], variant="secondary")
+            
+            bio_sessions_panel.expand(
+                lambda: (gr.Dropdown(choices=biographer.session_choices("biographical")), 1),
+                outputs=[bio_session_list, bio_session_pages]
+            )
+            
+            bio_sessions_more.click(
+                lambda pages: (gr.Dropdown(choices=biographer.session_choices("biographical", pages + 1)), pages + 1),
+                inputs=[bio_session_pages],
+                outputs=[bio_session_list, bio_session_pages]
+            )
+            
+            bio_continue.click(
+                biographer.continue_session,
+                inputs=[bio_session_list, bio_messages],
+                outputs=[bio_history, bio_stats, bio_messages]
             )
         
         with gr.Tab(ui_text["general_tab"]["title"]):
             gr.Markdown(ui_text["general_tab"]["description"])
             
-            gen_history = gr.Textbox(
-                label=ui_text["general_tab"]["history_label"],
-                lines=15,
-                interactive=False,
-                value=biographer.get_general_welcome_message()
-            )
+            gen_earlier = gr.Button(ui_text["general_tab"]["load_earlier_button"], size="sm")
+            gen_history = gr.Chatbot(label=ui_text["general_tab"]["history_label"], type="messages")
+            gen_stats = gr.Markdown()
+            gen_messages = gr.State(Conversation("general"), delete_callback=biographer.close_session)
             gen_input = gr.Textbox(
                 label=ui_text["general_tab"]["input_label"],
                 placeholder=ui_text["general_tab"]["input_placeholder"],
@@ -501,19 +1386,121 @@ def create_gradio_interface(biographer: DigitalBiographer):
             # Handle both button click and Shift+Enter
             gen_submit.click(
                 biographer.general_conversation,
-                inputs=[gen_input, gen_history],
-                outputs=[gen_history, gen_input]
+                inputs=[gen_input, gen_messages],
+                outputs=[gen_history, gen_input, gen_stats, gen_messages]
             )
             
             gen_input.submit(
                 biographer.general_conversation,
-                inputs=[gen_input, gen_history],
-                outputs=[gen_history, gen_input]
+                inputs=[gen_input, gen_messages],
+                outputs=[gen_history, gen_input, gen_stats, gen_messages]
             )
             
             gen_clear.click(
                 biographer.start_general_session,
-                outputs=[gen_history]
+                inputs=[gen_messages],
+                outputs=[gen_history, gen_messages]
+            )
+            
+            gen_earlier.click(
+                biographer.load_earlier_turns,
+                inputs=[gen_messages],
+                outputs=[gen_history, gen_messages]
+            )
+            
+            # Past sessions are listed from the index when the panel is opened, one page at a time
+            with gr.Accordion(ui_text["general_tab"]["sessions_heading"], open=False) as gen_sessions_panel:
+                gen_session_pages = gr.State(1)
+                gen_session_list = gr.Dropdown(label=ui_text["general_tab"]["sessions_label"], choices=[])
+                with gr.Row():
+                    gen_sessions_more = gr.Button(ui_text["general_tab"]["sessions_more_button"], size="sm")
+                    gen_continue = gr.Button(ui_text["general_tab"]["continue_button"], variant="secondary")
+            
+            gen_sessions_panel.expand(
+                lambda: (gr.Dropdown(choices=biographer.session_choices("general")), 1),
+                outputs=[gen_session_list, gen_session_pages]
+            )
+            
+            gen_sessions_more.click(
+                lambda pages: (gr.Dropdown(choices=biographer.session_choices("general", pages + 1)), pages + 1),
+                inputs=[gen_session_pages],
+                outputs=[gen_session_list, gen_session_pages]
+            )
+            
+            gen_continue.click(
+                biographer.continue_session,
+                inputs=[gen_session_list, gen_messages],
+                outputs=[gen_history, gen_stats, gen_messages]
+            )
+        
+        with gr.Tab(ui_text["search_tab"]["title"]):
+            gr.Markdown(ui_text["search_tab"]["description"])
+            
+            with gr.Row():
+                search_query = gr.Textbox(
+                    label=ui_text["search_tab"]["query_label"],
+                    placeholder=ui_text["search_tab"]["query_placeholder"],
+                    scale=3
+                )
+                search_type = gr.Dropdown(
+                    label=ui_text["search_tab"]["type_label"],
+                    choices=[
+                        (ui_text["search_tab"]["type_all"], "all"),
+                        (ui_text["search_tab"]["type_biographical"], "biographical"),
+                        (ui_text["search_tab"]["type_general"], "general")
+                    ],
+                    value="all",
+                    scale=1
+                )
+            with gr.Row():
+                search_from = gr.Textbox(
+                    label=ui_text["search_tab"]["date_from_label"],
+                    placeholder=ui_text["search_tab"]["date_placeholder"]
+                )
+                search_to = gr.Textbox(
+                    label=ui_text["search_tab"]["date_to_label"],
+                    placeholder=ui_text["search_tab"]["date_placeholder"]
+                )
+            search_btn = gr.Button(ui_text["search_tab"]["search_button"], variant="primary")
+            search_results = gr.Markdown()
+            
+            # Handle both button click and Enter in the query box
+            search_btn.click(
+                biographer.search_conversations,
+                inputs=[search_query, search_type, search_from, search_to],
+                outputs=[search_results]
+            )
+            
+            search_query.submit(
+                biographer.search_conversations,
+                inputs=[search_query, search_type, search_from, search_to],
+                outputs=[search_results]
+            )
+        
+        with gr.Tab(ui_text["biography_tab"]["title"]):
+            gr.Markdown(ui_text["biography_tab"]["description"])
+            
+            synthesis_status = gr.Markdown(value=biographer.get_biography_status)
+            with gr.Row():
+                synthesis_btn = gr.Button(ui_text["biography_tab"]["update_button"], variant="primary")
+                biography_refresh = gr.Button(ui_text["biography_tab"]["refresh_button"], variant="secondary")
+            biography_text = gr.Markdown(value=biographer.get_biography)
+            
+            synthesis_btn.click(
+                biographer.start_biography_synthesis,
+                outputs=[synthesis_status]
+            )
+            
+            biography_refresh.click(
+                biographer.get_biography,
+                outputs=[biography_text]
+            )
+            
+            # Follow the background run without blocking the chat tabs
+            synthesis_timer = gr.Timer(biographer.synthesis_config.get("refresh_interval", 5))
+            synthesis_timer.tick(
+                biographer.get_biography_status,
+                outputs=[synthesis_status]
             )
         
         with gr.Tab(ui_text["data_tab"]["title"]):
@@ -527,47 +1514,63 @@ def create_gradio_interface(biographer: DigitalBiographer):
             )
             
             refresh_btn = gr.Button(ui_text["data_tab"]["refresh_button"])
+            
+            # Weekly trends from the index rollups; the rendered charts are reused until new messages are saved
+            gr.Markdown(f"### {ui_text['data_tab']['insights_heading']}")
+            insight_plots = []
+            for row_names in (("sessions", "words"), ("topics", "mood"), ("latency",)):
+                with gr.Row():
+                    for name in row_names:
+                        chart_text = ui_text["data_tab"]["insights_charts"][name]
+                        insight_plots.append(gr.LinePlot(
+                            x="week",
+                            y="value",
+                            color="series" if name in ("sessions", "topics") else None,
+                            title=chart_text["title"],
+                            x_title=ui_text["data_tab"]["insights_week"],
+                            y_title=chart_text["axis"],
+                            color_title="",
+                            height=260
+                        ))
+            
             refresh_btn.click(
                 biographer.get_data_info,
                 outputs=[data_info]
             )
+            refresh_btn.click(
+                biographer.get_insights,
+                outputs=insight_plots
+            )
+            
+            # Rolling latency and throughput of recent requests, refreshed periodically
+            gr.Markdown(f"### {ui_text['data_tab']['metrics_heading']}")
+            performance_info = gr.Markdown(value=biographer.get_performance_info)
+            performance_timer = gr.Timer(biographer.metrics_config.get("refresh_interval", 5))
+            performance_timer.tick(
+                biographer.get_performance_info,
+                outputs=[performance_info]
+            )
             
             gr.Markdown(config["messages"]["privacy_info"])
+        
+        # Every page load starts with a greeting; the welcome question comes from the precomputed cache
+        interface.load(biographer.start_biographical_session, inputs=[bio_messages],
+                       outputs=[bio_history, bio_messages])
+        interface.load(biographer.start_general_session, inputs=[gen_messages], outputs=[gen_history, gen_messages])
+        interface.load(biographer.get_insights, outputs=insight_plots)
+    
+    # Let requests through to the inference scheduler, which enforces the real limit and reports queue positions
+    interface.queue(default_concurrency_limit=biographer.scheduler.max_concurrency + biographer.scheduler.max_queue)
     
     return interface
 
 
 def main():
     """Main function to run the Digital Biographer"""
-    print("Initializing Digital Biographer...")
-    
-    try:
-        # Initialize biographer - will load config automatically
-        biographer = DigitalBiographer(config_file="config_ru.json")
-        print(biographer.config["console_messages"]["connected"].format(model=biographer.model_name))
-        
-        # Create and launch interface
-        interface = create_gradio_interface(biographer)
-        
-        print(biographer.config["console_messages"]["launching"])
-        print(biographer.config["console_messages"]["access_url"])
-        print(biographer.config["console_messages"]["stop_instruction"])
-        
-        interface.launch(
-            server_name="127.0.0.1",
-            server_port=7860,
-            share=False,
-            inbrowser=True
-        )
-        
-    except ConnectionError as e:
-        print(f"Error: {e}")
-        print("\nMake sure Ollama is running and the model is available:")
-        print("1. Start Ollama: ollama serve")
-        print("2. Pull model: ollama pull qwen2.5:7b")
-    except Exception as e:
-        print(f"Unexpected error: {e}")
+    # Same as `python cli.py serve`; config, language and address come from flags or environment variables
+    from cli import main as cli_main
+    cli_main(["serve", "--inbrowser"])
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
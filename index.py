@@ -0,0 +1,681 @@
+#!/usr/bin/env python3
+import json
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no advisory locks
+    fcntl = None
+
+
+from insights import TextAnalyzer
+from storage import iter_session, list_data_files, read_message_at, tail_messages
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    path TEXT PRIMARY KEY,
+    location TEXT NOT NULL,
+    session_type TEXT NOT NULL,
+    start_time TEXT,
+    last_updated TEXT,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    path TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    timestamp TEXT,
+    offset INTEGER,
+    length INTEGER,
+    PRIMARY KEY (path, seq)
+);
+CREATE INDEX IF NOT EXISTS messages_by_time ON messages (location, timestamp);
+CREATE INDEX IF NOT EXISTS sessions_by_time ON sessions (location, last_updated);
+CREATE TABLE IF NOT EXISTS summaries (
+    path TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    covered_messages INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Per-message figures for the insights dashboard, and rollups of them kept current by triggers:
+# every message inserted or deleted (on save, rescan or removal) adds or subtracts its share
+INSIGHTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS message_stats (
+    path TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    day TEXT NOT NULL,
+    user_words INTEGER NOT NULL,
+    assistant_words INTEGER NOT NULL,
+    positive INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    response_seconds REAL,
+    PRIMARY KEY (path, seq)
+);
+CREATE TABLE IF NOT EXISTS message_topics (
+    path TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    PRIMARY KEY (path, seq, topic)
+);
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    day TEXT NOT NULL,
+    location TEXT NOT NULL,
+    messages INTEGER NOT NULL,
+    user_words INTEGER NOT NULL,
+    assistant_words INTEGER NOT NULL,
+    positive INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    latency_sum REAL NOT NULL,
+    latency_count INTEGER NOT NULL,
+    PRIMARY KEY (day, location)
+);
+CREATE TABLE IF NOT EXISTS session_rollup (
+    path TEXT PRIMARY KEY,
+    location TEXT NOT NULL,
+    day TEXT NOT NULL,
+    messages INTEGER NOT NULL,
+    user_words INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS topic_rollup (
+    day TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    messages INTEGER NOT NULL,
+    PRIMARY KEY (day, topic)
+);
+CREATE TRIGGER IF NOT EXISTS message_stats_added AFTER INSERT ON message_stats BEGIN
+    INSERT INTO daily_rollup VALUES (
+        NEW.day, NEW.location, 1, NEW.user_words, NEW.assistant_words, NEW.positive, NEW.negative,
+        COALESCE(NEW.response_seconds, 0), NEW.response_seconds IS NOT NULL
+    ) ON CONFLICT (day, location) DO UPDATE SET
+        messages = messages + 1,
+        user_words = user_words + excluded.user_words,
+        assistant_words = assistant_words + excluded.assistant_words,
+        positive = positive + excluded.positive,
+        negative = negative + excluded.negative,
+        latency_sum = latency_sum + excluded.latency_sum,
+        latency_count = latency_count + excluded.latency_count;
+    -- A session is dated by its first message
+    INSERT INTO session_rollup VALUES (NEW.path, NEW.location, NEW.day, 1, NEW.user_words)
+    ON CONFLICT (path) DO UPDATE SET messages = messages + 1, user_words = user_words + excluded.user_words;
+END;
+CREATE TRIGGER IF NOT EXISTS message_stats_removed AFTER DELETE ON message_stats BEGIN
+    UPDATE daily_rollup SET
+        messages = messages - 1,
+        user_words = user_words - OLD.user_words,
+        assistant_words = assistant_words - OLD.assistant_words,
+        positive = positive - OLD.positive,
+        negative = negative - OLD.negative,
+        latency_sum = latency_sum - COALESCE(OLD.response_seconds, 0),
+        latency_count = latency_count - (OLD.response_seconds IS NOT NULL)
+    WHERE day = OLD.day AND location = OLD.location;
+    UPDATE session_rollup SET messages = messages - 1, user_words = user_words - OLD.user_words
+    WHERE path = OLD.path;
+    DELETE FROM session_rollup WHERE path = OLD.path AND messages <= 0;
+END;
+CREATE TRIGGER IF NOT EXISTS message_topics_added AFTER INSERT ON message_topics BEGIN
+    INSERT INTO topic_rollup VALUES (NEW.day, NEW.topic, 1)
+    ON CONFLICT (day, topic) DO UPDATE SET messages = messages + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS message_topics_removed AFTER DELETE ON message_topics BEGIN
+    UPDATE topic_rollup SET messages = messages - 1 WHERE day = OLD.day AND topic = OLD.topic;
+END;
+"""
+
+DAY_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+# Full-text index of message texts; each row's rowid is the rowid of its row in messages.
+# Filter columns are kept alongside the text so searching needs no joins over all matches
+FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE message_text USING fts5("
+    "user, assistant, session_type UNINDEXED, timestamp UNINDEXED, tokenize = '{tokenizer}')"
+)
+
+# unicode61 folds case and diacritics for Cyrillic as well as Latin text
+DEFAULT_TOKENIZER = "unicode61 remove_diacritics 2"
+
+TERM_PATTERN = re.compile(r'"([^"]+)"|(\w+)')
+
+# Shorter words are matched exactly - a one- or two-letter prefix expands to a large share of the vocabulary
+MIN_PREFIX_LENGTH = 3
+
+
+def build_match_query(query: str, prefix: bool = True) -> str:
+    """Turn free text into an FTS5 query: every word must match (as a prefix), quoted text as a phrase"""
+    terms = []
+    for phrase, word in TERM_PATTERN.findall(query):
+        if phrase:
+            words = re.findall(r'\w+', phrase)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+        elif prefix and len(word) >= MIN_PREFIX_LENGTH:
+            # Prefixes also catch inflected forms, which matters for Russian
+            terms.append(f'"{word}"*')
+        else:
+            terms.append(f'"{word}"')
+    return " ".join(terms)
+
+
+def make_snippet(text: str, query: str, prefix: bool = True, max_tokens: int = 16) -> str:
+    """Cut a window of words around the first query match and highlight the matching words"""
+    query_words = [w.casefold() for w in re.findall(r'\w+', query)]
+    words = list(re.finditer(r'\w+', text))
+    if not words:
+        return text
+
+    def matches(word: str) -> bool:
+        word = word.casefold()
+        return any(word.startswith(q) if prefix and len(q) >= MIN_PREFIX_LENGTH else word == q
+                   for q in query_words)
+
+    first = next((i for i, w in enumerate(words) if matches(w.group())), 0)
+    start = max(0, min(first - max_tokens // 4, len(words) - max_tokens))
+    end = min(len(words), start + max_tokens)
+
+    parts = ["…"] if start > 0 else []
+    pos = words[start].start()
+    for w in words[start:end]:
+        parts.append(text[pos:w.start()])
+        parts.append(f"**{w.group()}**" if matches(w.group()) else w.group())
+        pos = w.end()
+    if end < len(words):
+        parts.append("…")
+    else:
+        parts.append(text[pos:])
+    return "".join(parts)
+
+
+def lock_exclusive(db_path: str):
+    """Lock an index database for a rebuild; returns the open lock file, or None if another process has it open"""
+    lock_file = open(db_path + ".lock", 'a')
+    if fcntl is None:
+        return lock_file
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def read_positions(filepath: str, seqs: set) -> Iterator[Tuple[int, Dict]]:
+    """Stream (seq, message) for the given positions of a session, stopping after the last one"""
+    if not seqs:
+        return
+    last = max(seqs)
+    for seq, (_, _, _, message_entry) in enumerate(iter_session(filepath)):
+        if seq in seqs:
+            yield seq, message_entry
+        if seq >= last:
+            break
+
+
+class SessionIndex:
+    """Incrementally maintained SQLite index of the session files in the data directory"""
+
+    def __init__(self, data_dir: str, db_path: str = None, tokenizer: str = None, workers: int = 2,
+                 analyzer: Optional[TextAnalyzer] = None):
+        self.data_dir = data_dir
+        self.db_path = db_path or os.path.join(data_dir, "index.sqlite3")
+        # None keeps the tokenizer the full-text index was built with
+        self.tokenizer = tokenizer
+        # None analyzes messages with the lexicon stored by the last index opened with an analyzer
+        self.analyzer = analyzer
+        # Threads reading changed session files during reconcile
+        self.workers = max(1, workers)
+        self._lock = threading.RLock()
+        # Held shared while the index is open, so a rebuild (which takes it exclusively) cannot replace
+        # the database under a running process
+        self._file_lock = open(self.db_path + ".lock", 'a')
+        if fcntl is not None:
+            fcntl.flock(self._file_lock.fileno(), fcntl.LOCK_SH)
+        try:
+            self._conn = self._connect()
+        except sqlite3.DatabaseError as e:
+            # The index only caches what is on disk, so a damaged one is simply rebuilt
+            print(f"Rebuilding damaged index {self.db_path}: {e}")
+            os.remove(self.db_path)
+            self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.executescript(SCHEMA)
+        conn.executescript(INSIGHTS_SCHEMA)
+        if "sessions" in tables and ("summaries" not in tables or "message_stats" not in tables):
+            # Index built before summaries or insights were tracked - rescan the sessions on the next
+            # reconcile, which backfills the new tables once
+            with conn:
+                conn.execute("UPDATE sessions SET mtime = 0")
+        self._prepare_full_text(conn)
+        self._prepare_insights(conn)
+        return conn
+
+    def _prepare_insights(self, conn: sqlite3.Connection):
+        """Recompute the insights figures when the topic or mood lexicon changes"""
+        row = conn.execute("SELECT value FROM meta WHERE key = 'insights_lexicon'").fetchone()
+        if self.analyzer is None:
+            # Without an analyzer (CLI tools), rescanned and new messages are analyzed with the stored
+            # lexicon, so the rollups stay as the biographer computed them
+            terms = conn.execute("SELECT value FROM meta WHERE key = 'insights_terms'").fetchone()
+            if terms:
+                self.analyzer = TextAnalyzer(json.loads(terms[0]))
+                return
+            self.analyzer = TextAnalyzer()
+            if row and row[0] != self.analyzer.signature:
+                # The lexicon is not known here: forget it, so the next start with one recomputes the figures
+                with conn:
+                    conn.execute("DELETE FROM meta WHERE key = 'insights_lexicon'")
+            return
+        if row and row[0] == self.analyzer.signature:
+            if not conn.execute("SELECT 1 FROM meta WHERE key = 'insights_terms'").fetchone():
+                with conn:
+                    conn.execute("INSERT INTO meta VALUES ('insights_terms', ?)",
+                                 (json.dumps(self.analyzer.lexicon, ensure_ascii=False),))
+            return
+
+        with conn:
+            # Rescanning a session replaces its figures; clearing first keeps removed topics out
+            for table in ("message_stats", "message_topics", "daily_rollup", "session_rollup", "topic_rollup"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute("UPDATE sessions SET mtime = 0")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('insights_lexicon', ?)", (self.analyzer.signature,))
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('insights_terms', ?)",
+                         (json.dumps(self.analyzer.lexicon, ensure_ascii=False),))
+
+    def _prepare_full_text(self, conn: sqlite3.Connection):
+        """Create the full-text table, recreating it when the tokenizer changes"""
+        row = conn.execute("SELECT value FROM meta WHERE key = 'fts_tokenizer'").fetchone()
+        current = row[0] if row else None
+        if self.tokenizer is None:
+            self.tokenizer = current or DEFAULT_TOKENIZER
+        if current == self.tokenizer:
+            return
+
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS message_text")
+            conn.execute(FTS_SCHEMA.format(tokenizer=self.tokenizer.replace("'", "''")))
+            # Sessions indexed without (or with differently tokenized) text are rescanned by the next reconcile
+            conn.execute("UPDATE sessions SET mtime = 0")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('fts_tokenizer', ?)", (self.tokenizer,))
+
+    def location_of(self, filepath: str) -> str:
+        """Get the data directory location (bio, general or legacy root) of a session file"""
+        parent = os.path.basename(os.path.dirname(os.path.abspath(filepath)))
+        if parent in ("bio", "general"):
+            return parent
+        return "legacy"
+
+    def list_files(self) -> List[str]:
+        """List every session file on disk, including legacy files in the data root"""
+        return list_data_files(self.data_dir)
+
+    def reconcile(self) -> int:
+        """Bring the index in line with the files on disk, rescanning only files whose mtime or size changed"""
+        with self._lock:
+            known = {
+                path: (mtime, size)
+                for path, mtime, size in self._conn.execute("SELECT path, mtime, size FROM sessions")
+            }
+
+        on_disk = set()
+        changed = []
+        for filepath in self.list_files():
+            on_disk.add(filepath)
+            try:
+                stat = os.stat(filepath)
+            except OSError:
+                continue
+            if known.get(filepath) != (stat.st_mtime, stat.st_size):
+                changed.append((filepath, stat))
+
+        def index_changed(item) -> bool:
+            filepath, stat = item
+            try:
+                self.index_file(filepath, stat)
+                return True
+            except Exception as e:
+                print(f"Error indexing {filepath}: {e}")
+                return False
+
+        if len(changed) > 1 and self.workers > 1:
+            # Cold start: files are read and parsed in parallel and written to the index one at a time,
+            # so at most `workers` sessions are held in memory
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="reindex") as pool:
+                updated = sum(pool.map(index_changed, changed))
+        else:
+            updated = sum(map(index_changed, changed))
+
+        for filepath in set(known) - on_disk:
+            self.remove_file(filepath)
+            updated += 1
+        return updated
+
+    def index_file(self, filepath: str, stat: Optional[os.stat_result] = None):
+        """(Re)index a whole session file"""
+        stat = stat or os.stat(filepath)
+        # Streamed outside the lock: only the parsed messages are held, never the file text
+        session_data = {}
+        records = list(iter_session(filepath, session_data))
+        location = self.location_of(filepath)
+        session_type = session_data.get('session_type')
+        if not session_type:
+            session_type = 'biographical' if location == 'bio' else 'general'
+
+        with self._lock, self._conn:
+            self._delete_messages(filepath)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (filepath, location, session_type, session_data.get('start_time'),
+                 session_data.get('last_updated', session_data.get('start_time')),
+                 len(records), stat.st_size, stat.st_mtime)
+            )
+            for seq, (timestamp, offset, length, message_entry) in enumerate(records):
+                self._insert_message(filepath, seq, location, session_type, timestamp, offset, length, message_entry)
+            self._conn.execute("DELETE FROM summaries WHERE path = ?", (filepath,))
+            summary = session_data.get('summary')
+            if summary and summary.get('text'):
+                self._conn.execute("INSERT INTO summaries VALUES (?, ?, ?)",
+                                   (filepath, summary['text'], summary.get('covered_messages', 0)))
+
+    def _insert_message(self, filepath: str, seq: int, location: str, session_type: str, timestamp: str,
+                        offset: Optional[int], length: Optional[int], message_entry: Dict):
+        """Insert a message and its full-text row (lock and transaction must be held)"""
+        cursor = self._conn.execute(
+            "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)",
+            (filepath, seq, location, timestamp, offset, length)
+        )
+        self._conn.execute(
+            "INSERT INTO message_text (rowid, user, assistant, session_type, timestamp) VALUES (?, ?, ?, ?, ?)",
+            (cursor.lastrowid, message_entry.get('user', ''), message_entry.get('assistant', ''),
+             session_type, timestamp)
+        )
+
+        day = (timestamp or "")[:10]
+        if not DAY_PATTERN.match(day):
+            return
+        figures = self.analyzer.analyze(message_entry)
+        self._conn.execute(
+            "INSERT INTO message_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (filepath, seq, location, day, figures["user_words"], figures["assistant_words"],
+             figures["positive"], figures["negative"], message_entry.get('response_seconds'))
+        )
+        self._conn.executemany(
+            "INSERT INTO message_topics VALUES (?, ?, ?, ?)",
+            [(filepath, seq, day, topic) for topic in figures["topics"]]
+        )
+
+    def _delete_messages(self, filepath: str, seq: Optional[int] = None):
+        """Delete the messages of a session, or one of them, with their full-text rows (lock must be held)"""
+        condition, params = "path = ?", (filepath,)
+        if seq is not None:
+            condition, params = "path = ? AND seq = ?", (filepath, seq)
+        self._conn.execute(
+            f"DELETE FROM message_text WHERE rowid IN (SELECT rowid FROM messages WHERE {condition})", params
+        )
+        self._conn.execute(f"DELETE FROM messages WHERE {condition}", params)
+        # The rollups are updated by the delete triggers
+        self._conn.execute(f"DELETE FROM message_stats WHERE {condition}", params)
+        self._conn.execute(f"DELETE FROM message_topics WHERE {condition}", params)
+
+    def remove_file(self, filepath: str):
+        """Forget a session file"""
+        with self._lock, self._conn:
+            self._delete_messages(filepath)
+            self._conn.execute("DELETE FROM summaries WHERE path = ?", (filepath,))
+            self._conn.execute("DELETE FROM sessions WHERE path = ?", (filepath,))
+
+    def replace_file(self, old_path: str, new_path: str):
+        """Move the index entries of a session that was rewritten under a new name (e.g. compacted)"""
+        self.remove_file(old_path)
+        if new_path and os.path.exists(new_path):
+            self.index_file(new_path)
+
+    def record_message(self, filepath: str, message_entry: Dict, offset: Optional[int], length: Optional[int]) -> int:
+        """Record a message just appended to a session file and return its position in the session"""
+        stat = os.stat(filepath)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT message_count, location, session_type FROM sessions WHERE path = ?", (filepath,)
+            ).fetchone()
+            if row is None:
+                # First message of a new session - the file is still tiny, so just scan it
+                self.index_file(filepath, stat)
+                return self._conn.execute(
+                    "SELECT message_count FROM sessions WHERE path = ?", (filepath,)
+                ).fetchone()[0] - 1
+
+            message_count, location, session_type = row
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE sessions SET last_updated = ?, message_count = ?, size = ?, mtime = ? WHERE path = ?",
+                    (message_entry['timestamp'], message_count + 1, stat.st_size, stat.st_mtime, filepath)
+                )
+                self._delete_messages(filepath, message_count)
+                self._insert_message(filepath, message_count, location, session_type, message_entry['timestamp'],
+                                     offset, length, message_entry)
+            return message_count
+
+    def record_summary(self, filepath: str, summary_record: Dict):
+        """Record the rolling summary just saved alongside a session"""
+        stat = os.stat(filepath)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)",
+                               (filepath, summary_record['text'], summary_record.get('covered_messages', 0)))
+            self._conn.execute("UPDATE sessions SET size = ?, mtime = ? WHERE path = ?",
+                               (stat.st_size, stat.st_mtime, filepath))
+
+    def session_summary(self, filepath: str) -> Optional[Dict]:
+        """Get the last rolling summary saved for a session"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, covered_messages FROM summaries WHERE path = ?", (filepath,)
+            ).fetchone()
+        return {"text": row[0], "covered_messages": row[1]} if row else None
+
+    def list_sessions(self, location: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+        """List the sessions of a location, most recently updated first, with the opening message as a preview"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.path, s.session_type, s.start_time, s.last_updated, s.message_count, t.user "
+                "FROM sessions s "
+                "LEFT JOIN messages m ON m.path = s.path AND m.seq = 0 "
+                "LEFT JOIN message_text t ON t.rowid = m.rowid "
+                "WHERE s.location = ? AND s.message_count > 0 "
+                "ORDER BY s.last_updated DESC LIMIT ? OFFSET ?",
+                (location, limit, offset)
+            ).fetchall()
+        return [
+            {"path": path, "session_type": session_type, "start_time": start_time, "last_updated": last_updated,
+             "message_count": message_count, "preview": preview or ""}
+            for path, session_type, start_time, last_updated, message_count, preview in rows
+        ]
+
+    def stats(self) -> Dict:
+        """Get aggregate counts over all indexed sessions"""
+        with self._lock:
+            total_files, bio_sessions, total_messages = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(session_type = 'biographical' OR location = 'bio'), 0), "
+                "COALESCE(SUM(message_count), 0) FROM sessions"
+            ).fetchone()
+        return {
+            "total_files": total_files,
+            "bio_sessions": bio_sessions,
+            "gen_sessions": total_files - bio_sessions,
+            "total_messages": total_messages
+        }
+
+    def changes(self) -> int:
+        """Number of rows changed through this index so far, which tells cached renders of it apart"""
+        with self._lock:
+            return self._conn.total_changes
+
+    def rollups(self) -> Dict[str, List[Tuple]]:
+        """Rows of the insights rollups: daily figures, sessions by first day and topic mentions by day"""
+        with self._lock:
+            return {
+                "daily": self._conn.execute(
+                    "SELECT day, location, messages, user_words, assistant_words, positive, negative, "
+                    "latency_sum, latency_count FROM daily_rollup WHERE messages > 0 ORDER BY day"
+                ).fetchall(),
+                "sessions": self._conn.execute(
+                    "SELECT day, location, messages, user_words FROM session_rollup ORDER BY day"
+                ).fetchall(),
+                "topics": self._conn.execute(
+                    "SELECT day, topic, messages FROM topic_rollup WHERE messages > 0 ORDER BY day"
+                ).fetchall()
+            }
+
+    def search(self, query: str, session_type: str = None, start: str = None, end: str = None,
+               limit: int = 50, snippet_tokens: int = 16, prefix: bool = True) -> List[Dict]:
+        """Full-text search of message texts, best matches first, with highlighted snippets"""
+        match = build_match_query(query, prefix)
+        if not match:
+            return []
+
+        conditions = ["message_text MATCH ?"]
+        params = [match]
+        if session_type:
+            conditions.append("session_type = ?")
+            params.append(session_type)
+        if start:
+            # ISO timestamps compare correctly as strings; start is inclusive, end exclusive
+            conditions.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            conditions.append("timestamp < ?")
+            params.append(end)
+
+        with self._lock:
+            # The person's own words weigh more than the AI's replies
+            ranked = self._conn.execute(
+                "SELECT rowid, session_type, timestamp, bm25(message_text, 1.0, 0.5) AS score FROM message_text "
+                f"WHERE {' AND '.join(conditions)} ORDER BY score LIMIT ?",
+                params + [limit]
+            ).fetchall()
+
+            results = []
+            for rowid, row_type, timestamp, score in ranked:
+                # Texts of the top rows only, looked up by rowid; FTS5's snippet() would walk the
+                # whole match list again for every row
+                text_row = self._conn.execute(
+                    "SELECT user, assistant FROM message_text WHERE rowid = ?", (rowid,)
+                ).fetchone()
+                location = self._conn.execute(
+                    "SELECT path, seq FROM messages WHERE rowid = ?", (rowid,)
+                ).fetchone()
+                if text_row is None or location is None:
+                    continue
+                results.append({
+                    "path": location[0], "seq": location[1], "timestamp": timestamp, "session_type": row_type,
+                    "score": -score,
+                    "user": make_snippet(text_row[0], query, prefix, snippet_tokens),
+                    "assistant": make_snippet(text_row[1], query, prefix, snippet_tokens)
+                })
+        return results
+
+    def recent_messages(self, location: str = "bio", limit: int = 10) -> List[Dict]:
+        """Get the most recent messages of a location, newest first, reading only those records"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, seq, offset, length FROM messages WHERE location = ? "
+                "ORDER BY timestamp DESC LIMIT ?",
+                (location, limit)
+            ).fetchall()
+
+        # Messages without offsets are streamed from their sessions, one pass per session
+        unaddressed = {}
+        for path, seq, offset, length in rows:
+            if offset is None:
+                unaddressed.setdefault(path, set()).add(seq)
+        streamed = {}
+        for path, seqs in unaddressed.items():
+            try:
+                streamed.update(((path, seq), message_entry) for seq, message_entry in read_positions(path, seqs))
+            except Exception as e:
+                print(f"Error reading {path}: {e}")
+
+        messages = []
+        for path, seq, offset, length in rows:
+            try:
+                if offset is not None:
+                    messages.append(read_message_at(path, offset, length))
+                elif (path, seq) in streamed:
+                    messages.append(streamed[(path, seq)])
+            except Exception as e:
+                print(f"Error reading message {seq} of {path}: {e}")
+        return messages
+
+    def read_message(self, filepath: str, seq: int) -> Optional[Dict]:
+        """Read one message of a session by its position, using the recorded byte offsets"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT offset, length FROM messages WHERE path = ? AND seq = ?", (filepath, seq)
+            ).fetchone()
+        if row is None:
+            return None
+        offset, length = row
+        if offset is not None:
+            return read_message_at(filepath, offset, length)
+        for _, message_entry in read_positions(filepath, {seq}):
+            return message_entry
+        return None
+
+    def message_count(self, filepath: str) -> int:
+        """Get the number of messages recorded for a session"""
+        with self._lock:
+            row = self._conn.execute("SELECT message_count FROM sessions WHERE path = ?", (filepath,)).fetchone()
+        return row[0] if row else 0
+
+    def session_messages(self, filepath: str, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+        """Read a range of a session's messages by position, reading only those records when offsets are known"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, offset, length FROM messages WHERE path = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (filepath, start, stop if stop is not None else 1 << 62)
+            ).fetchall()
+        if any(offset is None for _, offset, _ in rows):
+            # Sessions without offsets (legacy files, the JSON backend) are streamed rather than loaded
+            if stop is None:
+                return tail_messages(filepath, len(rows))
+            return [message_entry for _, message_entry in read_positions(filepath, {seq for seq, _, _ in rows})]
+        return [read_message_at(filepath, offset, length) for _, offset, length in rows]
+
+    def iter_messages(self, location: str = "bio") -> Iterator[Tuple[str, int, Dict]]:
+        """Yield (path, seq, message) for every message of a location, reading each session once"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, message_count FROM sessions WHERE location = ? ORDER BY start_time", (location,)
+            ).fetchall()
+        for path, message_count in rows:
+            try:
+                # Streamed, so only one message of the session is in memory at a time
+                for seq, (_, _, _, message_entry) in enumerate(iter_session(path)):
+                    if seq >= message_count:
+                        break
+                    yield path, seq, message_entry
+            except Exception as e:
+                print(f"Error reading {path}: {e}")
+
+    def close(self):
+        """Close the index database"""
+        with self._lock:
+            self._conn.close()
+            self._file_lock.close()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# NumPy is imported by the aggregation only: the index analyzes every saved message, also from
+# CLI commands that do not load NumPy
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Monday before the Unix epoch, so week numbers count whole Monday-to-Sunday weeks
+WEEK_ORIGIN = "1969-12-29"
+
+CHART_NAMES = ("sessions", "words", "topics", "mood", "latency")
+
+
+class TextAnalyzer:
+    """Word counts, topic mentions and a lexicon mood score of messages, stored in the index rollups"""
+
+    def __init__(self, insights_config: Optional[Dict] = None):
+        insights_config = insights_config or {}
+        topics = insights_config.get("topics", {})
+        mood = insights_config.get("mood", {})
+        self.topics = {topic: self.compile(stems) for topic, stems in topics.items() if stems}
+        self.positive = self.compile(mood.get("positive", []))
+        self.negative = self.compile(mood.get("negative", []))
+        # Kept in the index, so tools run without the configuration analyze messages the same way
+        self.lexicon = {"topics": topics, "mood": mood}
+        # Stored figures were computed with one lexicon; a different one means recomputing them
+        lexicon = json.dumps([topics, mood], ensure_ascii=False, sort_keys=True)
+        self.signature = hashlib.sha256(lexicon.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def compile(stems: List[str]) -> Optional[re.Pattern]:
+        """Match whole words starting with any of the stems, so one stem covers a word's inflections"""
+        if not stems:
+            return None
+        alternatives = "|".join(re.escape(stem.lower()) for stem in sorted(stems, key=len, reverse=True))
+        return re.compile(rf"\b(?:{alternatives})\w*", re.IGNORECASE)
+
+    def analyze(self, message_entry: Dict) -> Dict:
+        """Figures of one message; topics and mood come from the user's words only"""
+        user = message_entry.get('user') or ""
+        return {
+            "user_words": len(WORD_PATTERN.findall(user)),
+            "assistant_words": len(WORD_PATTERN.findall(message_entry.get('assistant') or "")),
+            "positive": len(self.positive.findall(user)) if self.positive else 0,
+            "negative": len(self.negative.findall(user)) if self.negative else 0,
+            "topics": [topic for topic, pattern in self.topics.items() if pattern.search(user)]
+        }
+
+
+def weekly_totals(days: Sequence[str], values: Dict[str, Sequence[float]], weeks: int = 26) -> Tuple:
+    """Sum per-day values into calendar weeks, over the last `weeks` weeks up to the latest day.
+
+    Returns the week start dates and, per value, an array of weekly sums (zero for empty weeks)."""
+    import numpy as np
+
+    if not len(days):
+        return np.array([], dtype='datetime64[D]'), {name: np.zeros(0) for name in values}
+    origin = np.datetime64(WEEK_ORIGIN, 'D')
+    week = (np.array(days, dtype='datetime64[D]') - origin).astype(np.int64) // 7
+    last = int(week.max())
+    first = max(int(week.min()), last - weeks + 1)
+    index = week - first
+    keep = index >= 0
+    totals = {
+        name: np.bincount(index[keep], weights=np.asarray(column, dtype=np.float64)[keep], minlength=last - first + 1)
+        for name, column in values.items()
+    }
+    starts = origin + (np.arange(first, last + 1) * 7).astype('timedelta64[D]')
+    return starts, totals
+
+
+class InsightsDashboard:
+    """Weekly charts over the index rollups, recomputed only when the index has changed since the last render"""
+
+    def __init__(self, index, render: Callable[[Dict[str, list]], object] = None, weeks: int = 26,
+                 labels: Optional[Dict[str, str]] = None):
+        self.index = index
+        # Turns the columns of a chart into what the interface displays (a DataFrame for Gradio plots)
+        self.render = render or (lambda columns: columns)
+        self.weeks = weeks
+        self.labels = labels or {}
+        self._lock = threading.Lock()
+        self._cache = None
+
+    def charts(self) -> Dict[str, object]:
+        """Rendered charts by name, from the cache while the index is unchanged"""
+        with self._lock:
+            version = self.index.changes()
+            if self._cache is not None and self._cache[0] == version:
+                return self._cache[1]
+            rollups = self.index.rollups()
+            charts = {name: self.render(columns) for name, columns in self.compute(rollups).items()}
+            self._cache = (version, charts)
+            return charts
+
+    def compute(self, rollups: Dict[str, List[Tuple]]) -> Dict[str, Dict[str, list]]:
+        """Columns of each chart from the daily, per-session and per-topic rollups"""
+        import numpy as np
+
+        # The charts share one time axis, ending at the latest day with data
+        all_days = [row[0] for table in rollups.values() for row in table]
+        if not all_days:
+            return {name: {"week": [], "value": [], "series": []} for name in CHART_NAMES}
+        latest = max(all_days)
+
+        def weekly(days, values):
+            # The latest day is added with zero weight, so every chart ends on the same week
+            starts, totals = weekly_totals(list(days) + [latest],
+                                           {name: list(column) + [0] for name, column in values.items()},
+                                           self.weeks)
+            return starts, totals
+
+        def columns(starts, values, series: str, keep=None) -> Dict[str, list]:
+            keep = np.ones(len(starts), dtype=bool) if keep is None else keep
+            return {
+                "week": starts[keep].astype('datetime64[ms]').tolist(),
+                "value": np.round(values[keep], 3).tolist(),
+                "series": [self.labels.get(series, series)] * int(keep.sum())
+            }
+
+        def merge(parts: List[Dict[str, list]]) -> Dict[str, list]:
+            return {key: [item for part in parts for item in part[key]] for key in ("week", "value", "series")}
+
+        charts = {}
+
+        # Sessions started per week, per location, and the words the user wrote per session
+        sessions = rollups["sessions"]
+        session_parts = []
+        for location in ("bio", "general"):
+            rows = [row for row in sessions if row[1] == location]
+            starts, totals = weekly((row[0] for row in rows), {"sessions": [1] * len(rows)})
+            session_parts.append(columns(starts, totals["sessions"], location))
+        charts["sessions"] = merge(session_parts)
+
+        starts, totals = weekly((row[0] for row in sessions),
+                                {"sessions": [1] * len(sessions), "words": [row[3] for row in sessions]})
+        with np.errstate(invalid='ignore', divide='ignore'):
+            words = totals["words"] / totals["sessions"]
+        charts["words"] = columns(starts, words, "words", totals["sessions"] > 0)
+
+        # Messages mentioning each topic per week
+        topic_rows = rollups["topics"]
+        charts["topics"] = merge([
+            columns(*self._topic_weeks(weekly, topic_rows, topic), topic)
+            for topic in sorted({row[1] for row in topic_rows})
+        ])
+
+        # Mood index from -1 (only negative words) to 1 (only positive), and mean response time
+        daily = rollups["daily"]
+        starts, totals = weekly((row[0] for row in daily), {
+            "positive": [row[5] for row in daily],
+            "negative": [row[6] for row in daily],
+            "latency_sum": [row[7] for row in daily],
+            "latency_count": [row[8] for row in daily]
+        })
+        mood_words = totals["positive"] + totals["negative"]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mood = (totals["positive"] - totals["negative"]) / mood_words
+            latency = totals["latency_sum"] / totals["latency_count"]
+        charts["mood"] = columns(starts, mood, "mood", mood_words > 0)
+        charts["latency"] = columns(starts, latency, "latency", totals["latency_count"] > 0)
+        return charts
+
+    @staticmethod
+    def _topic_weeks(weekly, topic_rows: List[Tuple], topic: str):
+        rows = [row for row in topic_rows if row[1] == topic]
+        starts, totals = weekly((row[0] for row in rows), {"messages": [row[2] for row in rows]})
+        return starts, totals["messages"]
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Latency buckets in seconds, from file I/O up to long CPU generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def label_key(labels: Dict) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+def format_labels(key: Tuple, extra: Dict = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in items) + "}"
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident memory of this process, or None where the platform does not report it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Histogram:
+    """Cumulative Prometheus buckets plus a rolling window of recent samples for percentiles"""
+
+    def __init__(self, buckets: Tuple, window: int):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+
+    def percentile(self, q: float) -> float:
+        """Get a percentile of the rolling window"""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and latency histograms"""
+
+    def __init__(self, window: int = 500, buckets: Tuple = DEFAULT_BUCKETS):
+        self.window = window
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increase a counter"""
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a sample (usually seconds) in a histogram"""
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = label_key(labels)
+            if key not in series:
+                series[key] = Histogram(self.buckets, self.window)
+            series[key].observe(value)
+
+    def register_gauge(self, name: str, read: Callable[[], float]):
+        """Register a gauge whose value is read when metrics are exported"""
+        with self._lock:
+            self._gauges[name] = read
+
+    @contextmanager
+    def timed(self, name: str, **labels):
+        """Measure the duration of a block into a histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render_prometheus(self) -> str:
+        """Export all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in series.items():
+                    for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                        lines.append(f"{name}_bucket{format_labels(key, {'le': bound})} {count}")
+                    lines.append(f"{name}_bucket{format_labels(key, {'le': '+Inf'})} {histogram.count}")
+                    lines.append(f"{name}_sum{format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{format_labels(key)} {histogram.count}")
+            gauges = list(self._gauges.items())
+
+        for name, read in sorted(gauges):
+            try:
+                value = read()
+            except Exception:
+                continue
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary_rows(self) -> List[Tuple[str, str, int, float, float, float]]:
+        """Get (name, labels, count, mean, p50, p95) of every histogram over the rolling window"""
+        rows = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                for key, histogram in sorted(series.items()):
+                    recent = histogram.recent
+                    mean = sum(recent) / len(recent) if recent else 0.0
+                    labels = ", ".join(f"{k}={v}" for k, v in key)
+                    rows.append((name, labels, histogram.count, mean,
+                                 histogram.percentile(0.5), histogram.percentile(0.95)))
+        return rows
+
+    def counter_value(self, name: str) -> float:
+        """Get the total of a counter over all its labels"""
+        with self._lock:
+            return sum(self._counters.get(name, {}).values())
+
+
+class MetricsServer:
+    """Local HTTP endpoint serving metrics for Prometheus at /metrics"""
+
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: int = 9464):
+        metrics_ref = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('/metrics', ''):
+                    self.send_error(404)
+                    return
+                body = metrics_ref.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes every few seconds would flood the console
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+
+    def start(self):
+        """Serve metrics in a background thread"""
+        self.thread.start()
+
+    def stop(self):
+        """Stop serving metrics"""
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+from typing import Dict, List, Optional
+
+import httpx
+import ollama
+
+from backends import LLMBackend
+
+
+class OllamaConnection(LLMBackend):
+    """Ollama client with pooled keep-alive connections, timeouts, retries, warm-up and model fallback"""
+
+    def __init__(self, model_name: str, fallback_name: str = None, client_config: Optional[Dict] = None,
+                 options: Optional[Dict] = None):
+        client_config = client_config or {}
+        # Model options sent with every request; Ollama reloads a model whose num_ctx changes,
+        # and truncating an over-long prompt shifts it, so both keep them fixed
+        super().__init__(model_name, fallback_name, client_config.get("retries", 2),
+                         client_config.get("retry_backoff", 0.5), options)
+        self.keep_alive = client_config.get("keep_alive", "30m")
+
+        # One pooled HTTP client shared by all requests, so connections are reused between turns
+        self.client = ollama.Client(
+            host=client_config.get("host"),
+            timeout=httpx.Timeout(
+                client_config.get("read_timeout", 300.0),
+                connect=client_config.get("connect_timeout", 5.0)
+            ),
+            limits=httpx.Limits(
+                max_connections=client_config.get("max_connections", 8),
+                max_keepalive_connections=client_config.get("max_keepalive_connections", 4)
+            )
+        )
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Check whether a failed request is worth retrying"""
+        if isinstance(error, ollama.ResponseError):
+            # Ollama answers 503 while it is busy loading or overloaded
+            return error.status_code >= 500 or error.status_code == 429
+        return isinstance(error, (ConnectionError, httpx.TransportError))
+
+    def is_missing_model(self, error: Exception) -> bool:
+        return isinstance(error, ollama.ResponseError) and error.status_code == 404
+
+    def list(self):
+        """List the models available on the server"""
+        return self._with_retries(lambda _: self.client.list(), fallback=False)
+
+    def model_names(self) -> List[str]:
+        return [entry['model'] for entry in self.list()['models']]
+
+    def chat(self, model: str = None, messages: List[Dict] = None, stream: bool = False, **kwargs):
+        """Chat with the current model; a stream is retried until its first chunk arrives"""
+        kwargs.setdefault("keep_alive", self.keep_alive)
+        kwargs["options"] = dict(self.options, **(kwargs.get("options") or {}))
+
+        def request(current_model):
+            return self.client.chat(model=current_model, messages=messages, stream=stream, **kwargs)
+
+        if not stream:
+            return self._with_retries(request, model)
+        return self._stream_with_retries(request, model)
+
+    def embed(self, model: str, input, **kwargs):
+        """Embed texts with an embedding model"""
+        kwargs.setdefault("keep_alive", self.keep_alive)
+        return self._with_retries(lambda m: self.client.embed(model=m, input=input, **kwargs), model=model)
+
+    def warm_up(self, extra_models: List[str] = None):
+        """Load the models into memory so the first real request does not pay the load time"""
+        try:
+            # An empty prompt only loads the model
+            self._with_retries(lambda m: self.client.generate(model=m, prompt="", keep_alive=self.keep_alive,
+                                                               options=self.options))
+            print(f"Model '{self.model}' is loaded")
+        except Exception as e:
+            print(f"Error warming up model '{self.model}': {e}")
+
+        for model in extra_models or []:
+            try:
+                self.embed(model, "")
+            except Exception as e:
+                print(f"Error warming up model '{model}': {e}")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import atexit
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from storage import write_json_atomic
+
+
+def request_key(model: str, messages: List[Dict], options: Optional[Dict] = None) -> str:
+    """Content hash of a completion request: the same model, messages and options give the same key"""
+    payload = json.dumps([model, messages, options or {}], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """LRU cache of completed responses with a time-to-live, persisted to a JSON file"""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 512, ttl: float = 86400.0,
+                 save_interval: float = 5.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        # key -> (created, text), least recently used first
+        self._entries = OrderedDict()
+        self._dirty = False
+        self._last_save = 0.0
+        if path:
+            self.load()
+            # Entries added since the last periodic save are written on exit, unless closed before
+            atexit.register(self.save)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self):
+        """Read the persisted entries, skipping expired ones"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        with self._lock:
+            for key, created, text in entries[-self.max_entries:]:
+                if now - created < self.ttl:
+                    self._entries[key] = (created, text)
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] >= self.ttl:
+                del self._entries[key]
+                self._dirty = True
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, text: str):
+        """Cache a response, evicting the least recently used entries beyond the limit"""
+        with self._lock:
+            self._entries[key] = (time.time(), text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            due = time.monotonic() - self._last_save >= self.save_interval
+        if due:
+            self.save()
+
+    def save(self):
+        """Write the entries to disk if they changed since the last save"""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                entries = [[key, created, text] for key, (created, text) in self._entries.items()]
+                self._dirty = False
+                self._last_save = time.monotonic()
+            try:
+                write_json_atomic(self.path, entries)
+            except OSError as e:
+                print(f"Error saving response cache {self.path}: {e}")
+
+    def close(self):
+        """Save the entries and stop saving them on exit"""
+        if self.path:
+            atexit.unregister(self.save)
+        self.save()
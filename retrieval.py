@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from storage import SESSION_EXTENSIONS
+
+
+class EmbeddingIndex:
+    """Local embedding index over saved bio messages with top-k cosine retrieval"""
+    # Vectors are L2-normalized float32 rows appended to a raw, memory-mapped file;
+    # a JSONL side file maps each row to its session and message position
+
+    def __init__(self, data_dir: str, embed: Callable[[List[str]], List[List[float]]],
+                 model: str, batch_size: int = 32, max_chars: int = 2000):
+        self.data_dir = data_dir
+        self.index_dir = os.path.join(data_dir, "embeddings")
+        self.vectors_path = os.path.join(self.index_dir, "vectors.f32")
+        self.entries_path = os.path.join(self.index_dir, "entries.jsonl")
+        self.meta_path = os.path.join(self.index_dir, "meta.json")
+        self.embed = embed
+        self.model = model
+        self.batch_size = batch_size
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._dim = None
+        self._vectors = None
+        self._entries = []
+        self._keys = set()
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def session_key(self, filepath: str) -> str:
+        """Identify a session independently of its storage format (the file is renamed on compaction)"""
+        relative = os.path.relpath(filepath, self.data_dir)
+        for ext in SESSION_EXTENSIONS:
+            if relative.endswith(ext):
+                return relative[:-len(ext)]
+        return relative
+
+    def session_path(self, session_key: str) -> Optional[str]:
+        """Find the current file of a session"""
+        for ext in SESSION_EXTENSIONS:
+            filepath = os.path.join(self.data_dir, session_key + ext)
+            if os.path.exists(filepath):
+                return filepath
+        return None
+
+    def load(self):
+        """Load the index from disk, discarding it if it was built with another embedding model"""
+        with self._lock:
+            self._dim = None
+            self._vectors = None
+            self._entries = []
+            self._keys = set()
+
+            if not os.path.exists(self.meta_path):
+                return
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("model") != self.model:
+                print(f"Embedding index was built with '{meta.get('model')}', rebuild it for '{self.model}'")
+                self._reset_files()
+                return
+
+            with open(self.entries_path, 'r', encoding='utf-8') as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+            self._dim = meta["dim"]
+            # Rows written after the last entry (interrupted append) are ignored
+            count = min(len(entries), os.path.getsize(self.vectors_path) // (4 * self._dim))
+            self._entries = entries[:count]
+            self._keys = {(e["session"], e["seq"]) for e in self._entries}
+            self._map_vectors(count)
+
+    def _map_vectors(self, count: int):
+        """Memory-map the first count rows of the vector file (lock must be held)"""
+        if count:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(count, self._dim))
+        else:
+            self._vectors = None
+
+    def _reset_files(self):
+        """Remove the on-disk index (lock must be held)"""
+        for path in (self.vectors_path, self.entries_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._dim = None
+        self._vectors = None
+        self._entries = []
+        self._keys = set()
+
+    def message_text(self, message_entry: Dict) -> str:
+        """Text embedded for a message pair"""
+        return f"Human: {message_entry['user']}\nAI: {message_entry['assistant']}"[:self.max_chars]
+
+    def has(self, filepath: str, seq: int) -> bool:
+        """Check whether a message is already indexed"""
+        return (self.session_key(filepath), seq) in self._keys
+
+    def add(self, items: List[Tuple[str, int, Dict]]) -> int:
+        """Embed and append (path, seq, message) items that are not indexed yet"""
+        items = [item for item in items if not self.has(item[0], item[1])]
+        added = 0
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            vectors = np.asarray(self.embed([self.message_text(m) for _, _, m in batch]), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1, norms)
+
+            with self._lock:
+                if self._dim is None:
+                    self._dim = vectors.shape[1]
+                    with open(self.meta_path, 'w', encoding='utf-8') as f:
+                        json.dump({"model": self.model, "dim": self._dim}, f)
+                # Vectors first, then entries: a crash in between leaves rows that load() ignores
+                with open(self.vectors_path, 'ab') as f:
+                    f.write(vectors.tobytes())
+                new_entries = [
+                    {"session": self.session_key(path), "seq": seq, "timestamp": m.get("timestamp", "")}
+                    for path, seq, m in batch
+                ]
+                with open(self.entries_path, 'a', encoding='utf-8') as f:
+                    for entry in new_entries:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                self._entries.extend(new_entries)
+                self._keys.update((e["session"], e["seq"]) for e in new_entries)
+                self._map_vectors(len(self._entries))
+            added += len(batch)
+        return added
+
+    def search(self, query: str, top_k: int = 4, min_score: float = 0.0, exclude_session: str = None,
+               embed: Callable[[List[str]], List[List[float]]] = None) -> List[Dict]:
+        """Get the top-k indexed messages most similar to the query, best first"""
+        embed = embed or self.embed
+        with self._lock:
+            vectors = self._vectors
+            entries = self._entries[:len(vectors)] if vectors is not None else []
+        if not entries:
+            return []
+
+        query_vector = np.asarray(embed([query[:self.max_chars]])[0], dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm == 0:
+            return []
+        scores = vectors @ (query_vector / norm)
+
+        if exclude_session:
+            exclude_key = self.session_key(exclude_session)
+            mask = np.fromiter((e["session"] == exclude_key for e in entries), dtype=bool, count=len(entries))
+            scores = np.where(mask, -1.0, scores)
+
+        k = min(top_k, len(entries))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        results = []
+        for row in candidates[np.argsort(-scores[candidates])]:
+            if scores[row] < min_score:
+                break
+            results.append(dict(entries[row], score=float(scores[row])))
+        return results
+
+    def sync(self, messages: Iterable[Tuple[str, int, Dict]]) -> int:
+        """Embed every message not yet in the index"""
+        added = 0
+        batch = []
+        for path, seq, message_entry in messages:
+            if self.has(path, seq):
+                continue
+            batch.append((path, seq, message_entry))
+            if len(batch) >= self.batch_size:
+                added += self.add(batch)
+                batch = []
+        if batch:
+            added += self.add(batch)
+        return added
+
+    def rebuild(self, messages: Iterable[Tuple[str, int, Dict]]) -> int:
+        """Discard the index and embed all given messages again"""
+        with self._lock:
+            self._reset_files()
+        return self.sync(messages)
+
+
+def create_embedder(client, model: str) -> Callable[[List[str]], List[List[float]]]:
+    """Wrap the embedding endpoint of a backend (or Ollama client) as a batch embedding function"""
+    def embed(texts: List[str]) -> List[List[float]]:
+        return client.embed(model=model, input=texts)['embeddings']
+    return embed
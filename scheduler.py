@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+# Interactive chat turns are served before background jobs such as question generation
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+
+class QueueFullError(Exception):
+    """Raised when the inference queue is full and a request has to be turned away"""
+
+
+class Ticket:
+    """A request's place in the inference queue"""
+
+    def __init__(self, client_id: str, priority: int, seq: int):
+        self.client_id = client_id
+        self.priority = priority
+        self.seq = seq
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+        self.granted_at = None
+
+    @property
+    def wait_time(self) -> float:
+        """Seconds spent waiting in the queue"""
+        return (self.granted_at or time.monotonic()) - self.enqueued_at
+
+
+class InferenceScheduler:
+    """Bounded, fair queue in front of the inference server"""
+
+    def __init__(self, max_concurrency: int = 1, max_queue: int = 16, metrics=None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self.metrics = metrics
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._running = 0
+        self._active = {}
+        self._seq = itertools.count()
+
+    def _order_key(self, ticket: Ticket):
+        # Clients with fewer requests in flight go first, so one busy tab cannot starve the others
+        return (ticket.priority, self._active.get(ticket.client_id, 0), ticket.seq)
+
+    def _dispatch(self):
+        """Grant free slots to the next waiting tickets (lock must be held)"""
+        while self._running < self.max_concurrency and self._waiting:
+            ticket = min(self._waiting, key=self._order_key)
+            self._waiting.remove(ticket)
+            ticket.granted = True
+            ticket.granted_at = time.monotonic()
+            self._running += 1
+            self._active[ticket.client_id] = self._active.get(ticket.client_id, 0) + 1
+            if self.metrics is not None:
+                self.metrics.observe("scheduler_queue_wait_seconds", ticket.wait_time,
+                                     priority=PRIORITY_NAMES.get(ticket.priority, ticket.priority))
+        self._cond.notify_all()
+
+    def enqueue(self, client_id: str, priority: int = PRIORITY_INTERACTIVE) -> Ticket:
+        """Join the queue, or raise QueueFullError if too many requests are already waiting"""
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                if self.metrics is not None:
+                    self.metrics.inc("scheduler_rejected_total")
+                raise QueueFullError(f"{len(self._waiting)} requests already waiting")
+            ticket = Ticket(client_id, priority, next(self._seq))
+            self._waiting.append(ticket)
+            self._dispatch()
+            return ticket
+
+    def _position(self, ticket: Ticket) -> int:
+        """Get the 1-based position of a waiting ticket (lock must be held)"""
+        return sorted(self._waiting, key=self._order_key).index(ticket) + 1
+
+    def position(self, ticket: Ticket) -> int:
+        """Get the 1-based position of a waiting ticket, or 0 once it has been granted"""
+        with self._cond:
+            if ticket.granted:
+                return 0
+            return self._position(ticket)
+
+    def wait(self, ticket: Ticket, timeout: float = None) -> Optional[int]:
+        """Wait up to timeout for a slot; return None when granted, else the current queue position"""
+        with self._cond:
+            if not ticket.granted:
+                self._cond.wait_for(lambda: ticket.granted, timeout)
+            if ticket.granted:
+                return None
+            return self._position(ticket)
+
+    def release(self, ticket: Ticket):
+        """Give back a slot, or leave the queue if the ticket was never granted"""
+        with self._cond:
+            if ticket.granted:
+                ticket.granted = False
+                self._running -= 1
+                self._active[ticket.client_id] -= 1
+                if not self._active[ticket.client_id]:
+                    del self._active[ticket.client_id]
+            elif ticket in self._waiting:
+                self._waiting.remove(ticket)
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, client_id: str, priority: int = PRIORITY_BACKGROUND):
+        """Block until a slot is free and hold it for the duration of the block"""
+        ticket = self.enqueue(client_id, priority)
+        try:
+            self.wait(ticket)
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> Dict:
+        """Get the current load of the scheduler"""
+        with self._cond:
+            return {
+                "running": self._running,
+                "waiting": len(self._waiting),
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue
+            }
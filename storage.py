@@ -0,0 +1,610 @@
+#!/usr/bin/env python3
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no advisory locks, logs are only guarded within the process
+    fcntl = None
+
+# Session files may exist either as compacted JSON documents or as append-only JSONL logs
+SESSION_EXTENSIONS = ('.json', '.jsonl')
+
+
+def is_session_file(filename: str) -> bool:
+    """Check whether a file name looks like a session file of any supported format"""
+    return filename.endswith(SESSION_EXTENSIONS)
+
+
+def list_data_files(data_dir: str) -> List[str]:
+    """List every session file of a data directory, including legacy files in the data root"""
+    files = []
+    for subdir in ("bio", "general"):
+        session_dir = os.path.join(data_dir, subdir)
+        if os.path.exists(session_dir):
+            files.extend(os.path.join(session_dir, f) for f in os.listdir(session_dir) if is_session_file(f))
+    if os.path.exists(data_dir):
+        files.extend(os.path.join(data_dir, f) for f in os.listdir(data_dir) if f.endswith('.json'))
+    return files
+
+
+def normalize_session(data: Dict, filepath: str = "") -> Dict:
+    """Bring a session document of any known format to the current session layout"""
+    if 'messages' in data:
+        return data
+
+    # Old individual message format - one file per exchange in the data root
+    if data.get('session_type'):
+        session_type = data['session_type']
+    else:
+        session_type = 'biographical' if 'bio' in filepath else 'general'
+    timestamp = data.get('timestamp', '')
+    return {
+        "session_type": session_type,
+        "start_time": timestamp,
+        "last_updated": timestamp,
+        "legacy": True,
+        "messages": [{
+            "timestamp": timestamp,
+            "user": data.get('user', data.get('user_message', '')),
+            "assistant": data.get('assistant', data.get('ai_response', ''))
+        }]
+    }
+
+
+# Characters read at a time by the streaming session readers
+READ_CHUNK_SIZE = 1 << 16
+
+
+class JsonStream:
+    """Incremental reader of a JSON document that decodes one value at a time from a bounded buffer"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        # Byte offset in the file of buffer[pos]
+        self.byte_pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Drop the consumed text and read more; reads grow with the buffer so long values parse in few passes"""
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        chunk = self.f.read(max(READ_CHUNK_SIZE, len(self.buffer)))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or '' at the end of the file"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+                self.byte_pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos] if self.pos < len(self.buffer) else ''
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' at byte {self.byte_pos}, found '{found}'")
+        self.pos += 1
+        self.byte_pos += len(char.encode('utf-8'))
+
+    def value(self) -> Tuple[object, int, int]:
+        """Decode the next value, returning it with its byte offset and byte length"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    offset = self.byte_pos
+                    length = len(self.buffer[self.pos:end].encode('utf-8'))
+                    self.pos = end
+                    self.byte_pos += length
+                    return value, offset, length
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def iter_json_document(filepath: str, session_data: Dict) -> Iterator[Tuple[str, Optional[int], Optional[int], Dict]]:
+    """Stream the messages of a JSON session document, filling session_data with its other fields"""
+    found_messages = False
+    # Newlines are not translated, so CRLF files keep their byte offsets
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        stream = JsonStream(f)
+        # Some Windows editors start the file with a byte order mark
+        if stream.peek() == '\ufeff':
+            stream.expect('\ufeff')
+        stream.expect('{')
+        while stream.peek() != '}':
+            if stream.peek() == ',':
+                stream.expect(',')
+                continue
+            key, _, _ = stream.value()
+            stream.expect(':')
+            if key != 'messages':
+                session_data[key], _, _ = stream.value()
+                continue
+            found_messages = True
+            stream.expect('[')
+            while stream.peek() != ']':
+                if stream.peek() == ',':
+                    stream.expect(',')
+                    continue
+                message_entry, offset, length = stream.value()
+                yield message_entry.get('timestamp', ''), offset, length, message_entry
+            stream.expect(']')
+
+    if not found_messages:
+        # Old individual message format: a small file without an addressable message array
+        normalized = normalize_session(dict(session_data), filepath)
+        session_data.clear()
+        session_data.update(normalized)
+        for message_entry in session_data.pop('messages'):
+            yield message_entry.get('timestamp', ''), None, None, message_entry
+
+
+def iter_jsonl_log(filepath: str, session_data: Dict) -> Iterator[Tuple[str, Optional[int], Optional[int], Dict]]:
+    """Stream the messages of a JSONL session log, filling session_data with its header and latest summary"""
+    header_seen = False
+    last_timestamp = None
+    with open(filepath, 'rb') as f:
+        offset = 0
+        for line_number, line in enumerate(f):
+            try:
+                record = json.loads(line) if line.strip() else None
+            except json.JSONDecodeError:
+                # A torn final write only loses the last record, never the whole session
+                print(f"Skipping unreadable record {line_number} in {filepath}")
+                record = None
+            if record is not None:
+                if not header_seen:
+                    session_data.update(record)
+                    header_seen = True
+                elif record.get('type') == 'summary':
+                    # Rolling summaries are appended as they change - the latest one wins
+                    record.pop('type')
+                    session_data['summary'] = record
+                else:
+                    last_timestamp = record.get('timestamp', '')
+                    yield last_timestamp, offset, len(line.rstrip(b'\r\n')), record
+            offset += len(line)
+
+    if not header_seen:
+        raise ValueError(f"Session log '{filepath}' has no header")
+    if last_timestamp is not None:
+        session_data["last_updated"] = last_timestamp
+
+
+def iter_session(filepath: str,
+                 session_data: Optional[Dict] = None) -> Iterator[Tuple[str, Optional[int], Optional[int], Dict]]:
+    """Stream (timestamp, byte offset, byte length, message) of a session file of any format without loading it whole.
+
+    session_data receives the other fields of the session; it is complete once the iterator is exhausted."""
+    if session_data is None:
+        session_data = {}
+    if filepath.endswith('.jsonl'):
+        return iter_jsonl_log(filepath, session_data)
+    return iter_json_document(filepath, session_data)
+
+
+def read_jsonl_session(filepath: str) -> Dict:
+    """Read an append-only JSONL session log into the session document layout"""
+    session_data = {}
+    messages = [message_entry for _, _, _, message_entry in iter_jsonl_log(filepath, session_data)]
+    session_data["messages"] = messages
+    return session_data
+
+
+def read_session(filepath: str) -> Dict:
+    """Read a session file of any supported format (JSON, JSONL or legacy single message)"""
+    if filepath.endswith('.jsonl'):
+        return read_jsonl_session(filepath)
+    with open(filepath, 'r', encoding='utf-8-sig') as f:
+        return normalize_session(json.load(f), filepath)
+
+
+def count_messages(filepath: str) -> int:
+    """Count the messages of a session file, holding one message in memory at a time"""
+    return sum(1 for _ in iter_session(filepath))
+
+
+def tail_jsonl_log(filepath: str, count: int, block_size: int = READ_CHUNK_SIZE) -> List[Dict]:
+    """Read the last messages of a session log by reading it backwards from the end"""
+    messages = []
+    with open(filepath, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        remainder = b""
+        while position > 0 and len(messages) < count:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + remainder).split(b"\n")
+            # The first piece continues a line from an earlier block, or is the header at the start of the file
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                try:
+                    record = json.loads(line) if line.strip() else None
+                except json.JSONDecodeError:
+                    record = None
+                if record is None or record.get('type') == 'summary':
+                    continue
+                messages.append(record)
+                if len(messages) == count:
+                    break
+    messages.reverse()
+    return messages
+
+
+def tail_messages(filepath: str, count: int) -> List[Dict]:
+    """Read the last `count` messages of a session file without materialising the whole session"""
+    if count <= 0:
+        return []
+    if filepath.endswith('.jsonl'):
+        return tail_jsonl_log(filepath, count)
+    # A JSON document is streamed front to back, keeping only the last messages
+    return [message_entry for _, _, _, message_entry in deque(iter_session(filepath), maxlen=count)]
+
+
+def read_message_at(filepath: str, offset: int, length: int) -> Dict:
+    """Read a single message record from a known byte range of a session file"""
+    with open(filepath, 'rb') as f:
+        f.seek(offset)
+        return json.loads(f.read(length).decode('utf-8'))
+
+
+def write_json_atomic(filepath: str, data: Dict):
+    """Write a JSON document so that readers never observe a partially written file"""
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
+
+
+def write_session_document(filepath: str, session_data: Dict, messages: Iterable[Dict]):
+    """Write a session document one message at a time, in the layout of write_json_atomic.
+
+    Fields added to session_data while the messages are consumed are written after the message array."""
+    def encode(value) -> str:
+        return json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        written = [key for key in session_data if key != 'messages']
+        f.write("{")
+        for key in written:
+            f.write(f"\n  {json.dumps(key)}: {encode(session_data[key])},")
+        f.write('\n  "messages": [')
+        empty = True
+        for message_entry in messages:
+            f.write(("\n    " if empty else ",\n    ") + encode(message_entry).replace("\n", "\n  "))
+            empty = False
+        f.write("]" if empty else "\n  ]")
+        for key, value in session_data.items():
+            if key not in written and key != 'messages':
+                f.write(f",\n  {json.dumps(key)}: {encode(value)}")
+        f.write("\n}")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
+
+
+class SessionStore:
+    """Base class for session storage backends"""
+
+    extension = '.json'
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+
+    def session_dir(self, session_type: str) -> str:
+        """Get the directory holding sessions of the given type"""
+        subdir = "bio" if session_type == "biographical" else "general"
+        return os.path.join(self.data_dir, subdir)
+
+    def list_session_files(self, session_type: str) -> List[str]:
+        """List session files of the given type regardless of their storage format"""
+        session_dir = self.session_dir(session_type)
+        if not os.path.exists(session_dir):
+            return []
+        return [os.path.join(session_dir, f) for f in os.listdir(session_dir) if is_session_file(f)]
+
+    def create_session(self, session_type: str, timestamp: datetime) -> str:
+        """Create a new empty session and return its file path"""
+        raise NotImplementedError
+
+    def append_message(self, session_file: str, message_entry: Dict) -> Tuple[str, Optional[int], Optional[int]]:
+        """Append a message pair to a session and return its file path, byte offset and length"""
+        raise NotImplementedError
+
+    def save_summary(self, session_file: str, summary_record: Dict) -> str:
+        """Store the rolling summary of a session's older turns alongside its messages"""
+        raise NotImplementedError
+
+    def read_session(self, session_file: str) -> Dict:
+        """Read a session in the session document layout"""
+        return read_session(session_file)
+
+    def close_session(self, session_file: str) -> str:
+        """Finish writing a session and return its final file path"""
+        return session_file
+
+    def close_all(self):
+        """Close every open session"""
+        pass
+
+    def new_session_path(self, session_type: str, timestamp: datetime) -> str:
+        """Build an unused file path for a new session"""
+        base = os.path.join(self.session_dir(session_type), timestamp.strftime('%Y-%m-%d_%H-%M-%S'))
+        # Several clients can start a session within the same second
+        candidate, suffix = base, 1
+        while any(os.path.exists(candidate + ext) for ext in SESSION_EXTENSIONS):
+            suffix += 1
+            candidate = f"{base}_{suffix}"
+        return candidate + self.extension
+
+
+class JsonSessionStore(SessionStore):
+    """Original storage: one pretty-printed JSON document rewritten on every message"""
+
+    def __init__(self, data_dir: str):
+        super().__init__(data_dir)
+        self._create_lock = threading.Lock()
+
+    def create_session(self, session_type: str, timestamp: datetime) -> str:
+        with self._create_lock:
+            filename = self.new_session_path(session_type, timestamp)
+            open(filename, 'x').close()
+        session_data = {
+            "session_type": session_type,
+            "start_time": timestamp.isoformat(),
+            "messages": []
+        }
+        write_json_atomic(filename, session_data)
+        return filename
+
+    def append_message(self, session_file: str, message_entry: Dict) -> Tuple[str, Optional[int], Optional[int]]:
+        session_data = read_session(session_file)
+        session_data["messages"].append(message_entry)
+        session_data["last_updated"] = message_entry["timestamp"]
+        write_json_atomic(session_file, session_data)
+        # Offsets inside a rewritten document are not tracked
+        return session_file, None, None
+
+    def save_summary(self, session_file: str, summary_record: Dict) -> str:
+        session_data = read_session(session_file)
+        session_data["summary"] = summary_record
+        write_json_atomic(session_file, session_data)
+        return session_file
+
+
+def lock_file(f) -> bool:
+    """Take an exclusive advisory lock on an open file without waiting; False if another process holds it"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+class JsonlSessionStore(SessionStore):
+    """Append-only JSONL log per session, compacted into the JSON document on close"""
+
+    extension = '.jsonl'
+
+    def __init__(self, data_dir: str, fsync_every: int = 8, fsync_interval: float = 2.0, max_open_logs: int = 64):
+        super().__init__(data_dir)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.max_open_logs = max(1, max_open_logs)
+        self._lock = threading.Lock()
+        # Least recently written first; past max_open_logs the idlest log is closed (not compacted) and
+        # reopened on its next write, so sessions left open by closed tabs cannot exhaust file descriptors
+        self._handles = OrderedDict()
+        self._pending = {}
+        self._last_sync = {}
+
+    def _handle(self, session_file: str):
+        """Get the open append handle of a session log, opening it if needed (lock must be held)"""
+        f = self._handles.get(session_file)
+        if f is not None:
+            self._handles.move_to_end(session_file)
+        else:
+            while len(self._handles) >= self.max_open_logs:
+                self._close_handle(next(iter(self._handles)))
+            f = open(session_file, 'ab')
+            # The lock marks the log as open, so other processes sharing the data directory
+            # (CLI commands while the server runs) do not compact it under this one
+            if not lock_file(f):
+                f.close()
+                raise OSError(f"Session {session_file} is open in another process")
+            self._handles[session_file] = f
+            self._pending[session_file] = 0
+            self._last_sync[session_file] = time.monotonic()
+        return f
+
+    def _writable_log(self, session_file: str) -> str:
+        """Log to append to, reopening the session if it was compacted (here or by another process)"""
+        if session_file.endswith('.jsonl') and (session_file in self._handles or os.path.exists(session_file)):
+            return session_file
+        return self.reopen_session(os.path.splitext(session_file)[0] + '.json')
+
+    def create_session(self, session_type: str, timestamp: datetime) -> str:
+        header = {
+            "session_type": session_type,
+            "start_time": timestamp.isoformat()
+        }
+        with self._lock:
+            filename = self.new_session_path(session_type, timestamp)
+            f = self._handle(filename)
+            f.write((json.dumps(header, ensure_ascii=False) + "\n").encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        return filename
+
+    def append_message(self, session_file: str, message_entry: Dict) -> Tuple[str, Optional[int], Optional[int]]:
+        session_file = self._writable_log(session_file)
+
+        with self._lock:
+            f = self._handle(session_file)
+
+            record = json.dumps(message_entry, ensure_ascii=False).encode('utf-8')
+            offset = f.tell()
+            f.write(record + b"\n")
+            # Flush every record so readers see it, but only fsync in batches
+            f.flush()
+            self._pending[session_file] += 1
+            now = time.monotonic()
+            if (self._pending[session_file] >= self.fsync_every
+                    or now - self._last_sync[session_file] >= self.fsync_interval):
+                os.fsync(f.fileno())
+                self._pending[session_file] = 0
+                self._last_sync[session_file] = now
+        return session_file, offset, len(record)
+
+    def save_summary(self, session_file: str, summary_record: Dict) -> str:
+        session_file = self._writable_log(session_file)
+
+        record = dict(summary_record, type='summary')
+        with self._lock:
+            f = self._handle(session_file)
+            f.write((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8'))
+            f.flush()
+        return session_file
+
+    def reopen_session(self, session_file: str) -> str:
+        """Turn a compacted JSON session back into an append-only log"""
+        session_data = {}
+        header = None
+        log_file = os.path.splitext(session_file)[0] + '.jsonl'
+        tmp_path = log_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # Streamed, so continuing a long session does not load it whole; the header holds
+            # the fields stored before the messages
+            for _, _, _, message_entry in iter_session(session_file, session_data):
+                if header is None:
+                    header = self._log_header(session_data)
+                    f.write(json.dumps(header, ensure_ascii=False) + "\n")
+                f.write(json.dumps(message_entry, ensure_ascii=False) + "\n")
+            if header is None:
+                header = self._log_header(session_data)
+                f.write(json.dumps(header, ensure_ascii=False) + "\n")
+            if 'summary' in session_data and 'summary' not in header:
+                # Compacted documents store the summary after the messages
+                f.write(json.dumps(dict(session_data['summary'], type='summary'), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, log_file)
+        os.remove(session_file)
+        return log_file
+
+    @staticmethod
+    def _log_header(session_data: Dict) -> Dict:
+        return {key: value for key, value in session_data.items() if key not in ('messages', 'last_updated')}
+
+    def _close_handle(self, session_file: str):
+        f = self._handles.pop(session_file, None)
+        self._pending.pop(session_file, None)
+        self._last_sync.pop(session_file, None)
+        if f is not None:
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+
+    def close_session(self, session_file: str) -> str:
+        if not session_file or not session_file.endswith('.jsonl'):
+            return session_file
+
+        with self._lock:
+            self._close_handle(session_file)
+            return self.compact_if_idle(session_file)
+
+    def compact_if_idle(self, session_file: str) -> str:
+        """Compact a log unless another process has it open; returns the file the session is in"""
+        try:
+            f = open(session_file, 'rb')
+        except FileNotFoundError:
+            return session_file
+        with f:
+            if not lock_file(f):
+                return session_file
+            # Compacted by another process between listing the log and locking it
+            if not os.path.exists(session_file):
+                return os.path.splitext(session_file)[0] + '.json'
+            return self.compact(session_file)
+
+    def compact(self, session_file: str) -> str:
+        """Rewrite a JSONL log as the JSON session document and remove the log (no other writer may hold it)"""
+        session_data = {}
+        records = iter_jsonl_log(session_file, session_data)
+        # Reading the first message also reads the header, which is written before the messages
+        first = next(records, None)
+        messages = chain([first[3]] if first else [], (message_entry for _, _, _, message_entry in records))
+        json_file = os.path.splitext(session_file)[0] + '.json'
+        write_session_document(json_file, session_data, messages)
+        os.remove(session_file)
+        return json_file
+
+    def close_all(self):
+        with self._lock:
+            open_files = list(self._handles)
+        for session_file in open_files:
+            try:
+                self.close_session(session_file)
+            except Exception as e:
+                print(f"Error closing session {session_file}: {e}")
+
+    def recover(self) -> List[str]:
+        """Compact logs left behind by a previous run that did not shut down cleanly.
+
+        Logs locked by another running process are still in use there and are left alone."""
+        recovered = []
+        for session_type in ("biographical", "general"):
+            for session_file in self.list_session_files(session_type):
+                if not session_file.endswith('.jsonl') or session_file in self._handles:
+                    continue
+                try:
+                    final_file = self.compact_if_idle(session_file)
+                    if final_file != session_file:
+                        recovered.append(final_file)
+                except Exception as e:
+                    print(f"Error recovering session {session_file}: {e}")
+        return recovered
+
+
+def create_session_store(data_dir: str, storage_config: Optional[Dict] = None) -> SessionStore:
+    """Create the session storage backend selected in the configuration"""
+    storage_config = storage_config or {}
+    backend = storage_config.get("backend", "jsonl")
+
+    if backend == "json":
+        return JsonSessionStore(data_dir)
+    if backend == "jsonl":
+        store = JsonlSessionStore(
+            data_dir,
+            fsync_every=storage_config.get("fsync_every", 8),
+            fsync_interval=storage_config.get("fsync_interval", 2.0),
+            max_open_logs=storage_config.get("max_open_logs", 64)
+        )
+        store.recover()
+        return store
+    raise ValueError(f"Unknown storage backend: {backend}")
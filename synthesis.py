@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from storage import write_json_atomic
+
+
+# Order of the map-reduce levels: each level summarizes the results of the previous one
+LEVELS = ("day", "month", "year")
+PERIOD_LENGTHS = {"day": 10, "month": 7, "year": 4}
+
+
+def content_hash(*parts) -> str:
+    """Stable hash of the inputs of a generation step"""
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def slugify(text: str) -> str:
+    slug = "".join(c if c.isalnum() else "-" for c in text.lower())
+    return "-".join(part for part in slug.split("-") if part) or "chapter"
+
+
+class BiographySynthesizer:
+    """Map-reduce bio sessions into day, month and year summaries and themed chapters, with a content-hash cache"""
+    # Every finished step is written to disk right away, so an interrupted run resumes where it stopped:
+    # a step is only regenerated when the hash of its inputs (texts, prompt and model) changed
+
+    def __init__(self, data_dir: str, complete: Callable[[str, str], str], count_tokens: Callable[[str], int],
+                 synthesis_config: Optional[Dict] = None, requests: Optional[Dict] = None, model: str = ""):
+        synthesis_config = synthesis_config or {}
+        self.output_dir = os.path.join(data_dir, "biography")
+        self.progress_path = os.path.join(self.output_dir, "progress.json")
+        self.document_path = os.path.join(self.output_dir, "biography.md")
+        self.complete = complete
+        self.count_tokens = count_tokens
+        self.requests = requests or {}
+        self.model = model
+        self.workers = synthesis_config.get("workers", 2)
+        self.max_input_tokens = synthesis_config.get("max_input_tokens", 6000)
+        self.chapters = synthesis_config.get("chapters", [])
+        self._lock = threading.Lock()
+        self._thread = None
+        self._progress = self.load_progress()
+        for level in LEVELS + ("chapter",):
+            os.makedirs(os.path.join(self.output_dir, level), exist_ok=True)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def load_progress(self) -> Dict:
+        """Read the progress of the last run"""
+        try:
+            with open(self.progress_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"state": "idle"}
+
+    def progress(self) -> Dict:
+        with self._lock:
+            return dict(self._progress)
+
+    def interrupted(self) -> bool:
+        """Check whether the last run stopped before finishing (e.g. the app was closed)"""
+        return self.progress().get("state") == "running" and not self.running
+
+    def _update_progress(self, **changes):
+        with self._lock:
+            self._progress.update(changes, updated=datetime.now().isoformat())
+            progress = dict(self._progress)
+        write_json_atomic(self.progress_path, progress)
+
+    def _advance(self, reused: bool, failed: bool = False):
+        with self._lock:
+            self._progress["completed"] += 1
+            if reused:
+                self._progress["reused"] += 1
+            if failed:
+                self._progress["failed"] += 1
+            self._progress["updated"] = datetime.now().isoformat()
+            progress = dict(self._progress)
+        write_json_atomic(self.progress_path, progress)
+
+    def start(self, messages: Callable[[], Iterable[Tuple[str, int, Dict]]]) -> bool:
+        """Run the pipeline in a background thread; return False if a run is already in progress"""
+        with self._lock:
+            if self.running:
+                return False
+            self._thread = threading.Thread(target=self.run, args=(messages,), name="biography-synthesis", daemon=True)
+            self._thread.start()
+            return True
+
+    def run(self, messages: Callable[[], Iterable[Tuple[str, int, Dict]]]):
+        """Regenerate every period whose sessions changed since the last run, then the chapters and the document"""
+        started = datetime.now().isoformat()
+        try:
+            days = self.group_by_day(messages())
+            self._update_progress(state="running", started=started, stage="day", completed=0, reused=0,
+                                  failed=0, total=self.estimate_steps(days), error=None)
+
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="synthesis") as pool:
+                # Map: one summary per day from its conversations
+                day_inputs = {day: [self.format_message(m) for m in day_messages]
+                              for day, day_messages in days.items()}
+                summaries = self.run_level(pool, "day", day_inputs)
+
+                # Reduce: days into months, months into years
+                for level in LEVELS[1:]:
+                    self._update_progress(stage=level)
+                    summaries = self.run_level(pool, level, self.group_summaries(summaries, level))
+
+                self._update_progress(stage="chapter")
+                year_summaries = [f"## {year}\n{text}" for year, text in sorted(summaries.items())]
+                chapters = self.run_level(pool, "chapter", {theme: year_summaries for theme in self.chapters})
+
+            self.write_document(chapters, summaries)
+            self._update_progress(state="done", stage=None, finished=datetime.now().isoformat())
+        except Exception as e:
+            print(f"Error synthesizing biography: {e}")
+            self._update_progress(state="failed", error=str(e))
+
+    def group_by_day(self, messages: Iterable[Tuple[str, int, Dict]]) -> Dict[str, List[Dict]]:
+        days = {}
+        for _, _, message_entry in messages:
+            day = message_entry.get("timestamp", "")[:PERIOD_LENGTHS["day"]]
+            if day:
+                days.setdefault(day, []).append(message_entry)
+        for day_messages in days.values():
+            day_messages.sort(key=lambda m: m["timestamp"])
+        return days
+
+    def group_summaries(self, summaries: Dict[str, str], level: str) -> Dict[str, List[str]]:
+        """Group the summaries of the previous level by the period of this level"""
+        groups = {}
+        for period, text in sorted(summaries.items()):
+            groups.setdefault(period[:PERIOD_LENGTHS[level]], []).append(f"[{period}]\n{text}")
+        return groups
+
+    def estimate_steps(self, days: Dict[str, List[Dict]]) -> int:
+        months = {day[:PERIOD_LENGTHS["month"]] for day in days}
+        years = {day[:PERIOD_LENGTHS["year"]] for day in days}
+        return len(days) + len(months) + len(years) + (len(self.chapters) if years else 0)
+
+    def format_message(self, message_entry: Dict) -> str:
+        return f"[{message_entry['timestamp'][11:16]}] Human: {message_entry['user']}\nAI: {message_entry['assistant']}"
+
+    def cache_path(self, level: str, key: str) -> str:
+        name = slugify(key) if level == "chapter" else key
+        return os.path.join(self.output_dir, level, f"{name}.json")
+
+    def read_cache(self, level: str, key: str) -> Optional[Dict]:
+        try:
+            with open(self.cache_path(level, key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def run_level(self, pool: ThreadPoolExecutor, level: str, inputs: Dict[str, List[str]]) -> Dict[str, str]:
+        """Generate (or reuse from the cache) one text per key of a level, in parallel"""
+        results = {}
+        jobs = {}
+        for key, texts in inputs.items():
+            input_hash = content_hash(self.model, self.requests.get(level, ""), key, texts)
+            cached = self.read_cache(level, key)
+            if cached and cached.get("hash") == input_hash:
+                results[key] = cached["text"]
+                self._advance(reused=True)
+            else:
+                jobs[key] = pool.submit(self.generate, level, key, texts, input_hash)
+
+        for key, job in jobs.items():
+            try:
+                results[key] = job.result()
+                self._advance(reused=False)
+            except Exception as e:
+                # The period is retried on the next run; the levels above are built without it
+                print(f"Error generating {level} summary for {key}: {e}")
+                self._advance(reused=False, failed=True)
+        return results
+
+    def generate(self, level: str, key: str, texts: List[str], input_hash: str) -> str:
+        """Summarize a period's texts and cache the result"""
+        text = self.reduce(level, key, texts)
+        write_json_atomic(self.cache_path(level, key), {
+            "key": key,
+            "hash": input_hash,
+            "text": text,
+            "generated_at": datetime.now().isoformat()
+        })
+        return text
+
+    def reduce(self, level: str, key: str, texts: List[str]) -> str:
+        """Summarize texts, splitting them into parts first if they exceed the input budget"""
+        groups = [[]]
+        group_tokens = 0
+        for text in texts:
+            tokens = self.count_tokens(text)
+            if groups[-1] and group_tokens + tokens > self.max_input_tokens:
+                groups.append([])
+                group_tokens = 0
+            groups[-1].append(text)
+            group_tokens += tokens
+
+        if len(groups) > 1:
+            # Too long for one request: summarize each part, then summarize the parts
+            return self.reduce(level, key, [self.summarize(level, key, group) for group in groups])
+        return self.summarize(level, key, groups[0])
+
+    def summarize(self, level: str, key: str, texts: List[str]) -> str:
+        request = self.requests[level].format(period=key, theme=key, content="\n\n".join(texts))
+        text = self.complete(request, level).strip()
+        if not text:
+            raise ValueError("Empty response")
+        return text
+
+    def write_document(self, chapters: Dict[str, str], year_summaries: Dict[str, str]):
+        """Assemble the chapters and the yearly chronicle into one Markdown document"""
+        parts = []
+        for theme in self.chapters:
+            if theme in chapters:
+                parts.append(f"## {theme}\n\n{chapters[theme]}")
+        for year, text in sorted(year_summaries.items()):
+            parts.append(f"## {year}\n\n{text}")
+
+        tmp_path = self.document_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n\n".join(parts) + "\n")
+        os.replace(tmp_path, self.document_path)
+
+    def read_document(self) -> str:
+        """Get the last assembled biography, or an empty string"""
+        try:
+            with open(self.document_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return ""
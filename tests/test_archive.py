@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import codecs
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive import export_archive, import_archive, read_manifest, verify_archive
+from storage import read_session
+
+
+def session_document(day: int) -> dict:
+    timestamp = f"2024-05-0{day}T10:00:00"
+    return {"session_type": "biographical", "start_time": timestamp,
+            "messages": [{"timestamp": timestamp, "user": f"Day {day}: привет", "assistant": f"Reply {day}"}]}
+
+
+class ArchiveRoundTripTest(unittest.TestCase):
+    """Backup bundles exported from one data directory and restored into another"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.root, "data")
+        self.backup_dir = os.path.join(self.root, "backups")
+        os.makedirs(os.path.join(self.data_dir, "bio"))
+        os.makedirs(os.path.join(self.data_dir, "general"))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write_session(self, relative: str, document: dict, bom: bool = False):
+        with open(os.path.join(self.data_dir, relative), 'wb') as f:
+            f.write((codecs.BOM_UTF8 if bom else b"") + json.dumps(document, ensure_ascii=False).encode('utf-8'))
+
+    def write_audio(self, relative: str, data: bytes):
+        filepath = os.path.join(self.data_dir, relative)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'wb') as f:
+            f.write(data)
+
+    def export(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return export_archive(self.data_dir, self.backup_dir, **kwargs)
+
+    def restore(self, bundle_path: str) -> str:
+        target = os.path.join(self.root, "restored")
+        with contextlib.redirect_stdout(io.StringIO()):
+            import_archive(bundle_path, target)
+        return target
+
+    def test_round_trip_with_bom_and_recordings(self):
+        self.write_session("bio/2024-05-01_10-00-00.json", session_document(1), bom=True)
+        self.write_session("general/2024-05-02_10-00-00.json", session_document(2))
+        self.write_audio("bio/2024-05-01_10-00-00.audio/0.ogg", b"OggS\x00voice")
+
+        bundle = self.export()
+        self.assertEqual(verify_archive(bundle), [])
+        target = self.restore(bundle)
+
+        for relative, day in (("bio/2024-05-01_10-00-00.json", 1), ("general/2024-05-02_10-00-00.json", 2)):
+            self.assertEqual(read_session(os.path.join(target, relative)), session_document(day))
+        with open(os.path.join(target, "bio", "2024-05-01_10-00-00.audio", "0.ogg"), 'rb') as f:
+            self.assertEqual(f.read(), b"OggS\x00voice")
+
+    def test_incremental_bundle_holds_only_changes(self):
+        self.write_session("bio/2024-05-01_10-00-00.json", session_document(1))
+        self.write_audio("bio/2024-05-01_10-00-00.audio/0.ogg", b"first")
+        first = self.export()
+        self.assertIsNone(self.export())
+
+        # Distinct bundle names and file mtimes
+        time.sleep(1.1)
+        self.write_session("bio/2024-05-02_10-00-00.json", session_document(2))
+        self.write_audio("bio/2024-05-02_10-00-00.audio/0.ogg", b"second")
+        second = self.export()
+
+        manifest = read_manifest(second)
+        self.assertEqual(manifest["base"], os.path.basename(first))
+        self.assertEqual(manifest["exported_sessions"], 1)
+        self.assertEqual(manifest["total_sessions"], 2)
+        self.assertEqual(manifest["exported_audio"], 1)
+        self.assertEqual(verify_archive(second), [])
+
+        # Restoring the newest bundle brings back the sessions of its base bundle as well
+        target = self.restore(second)
+        for day in (1, 2):
+            relative = f"bio/2024-05-0{day}_10-00-00.json"
+            self.assertEqual(read_session(os.path.join(target, relative)), session_document(day))
+        with open(os.path.join(target, "bio", "2024-05-01_10-00-00.audio", "0.ogg"), 'rb') as f:
+            self.assertEqual(f.read(), b"first")
+
+    def test_verify_reports_a_damaged_bundle(self):
+        self.write_session("bio/2024-05-01_10-00-00.json", session_document(1))
+        bundle = self.export()
+        with open(bundle, 'r+b') as f:
+            data = bytearray(f.read())
+            offset = data.index(b"chunks/00000.jsonl.gz") + 512 + 16
+            data[offset] ^= 0xFF
+            f.seek(0)
+            f.write(data)
+        self.assertNotEqual(verify_archive(bundle), [])
+
+    def test_unreadable_session_fails_the_backup(self):
+        self.write_session("bio/2024-05-01_10-00-00.json", session_document(1))
+        with open(os.path.join(self.data_dir, "bio", "2024-05-02_10-00-00.json"), 'w', encoding='utf-8') as f:
+            f.write('{"messages": [')
+
+        with self.assertRaises(ValueError):
+            self.export()
+        self.assertEqual(os.listdir(self.backup_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import OpenAICompatibleBackend
+
+
+MODEL = "main-model"
+FALLBACK = "fallback-model"
+PIECES = ["Привет", ", café ", "日本"]
+
+
+class FakeServer(BaseHTTPRequestHandler):
+    """OpenAI-compatible server that streams without a charset, as llama.cpp does"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path, None))
+        if self.server.failures:
+            self.send_json(self.server.failures.pop(0), {"error": "not found"})
+            return
+        self.send_json(200, {"data": [{"id": model} for model in self.server.models]})
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(("POST", self.path, payload))
+        if self.server.failures:
+            self.send_json(self.server.failures.pop(0), {"error": "unavailable"})
+            return
+        if payload["model"] not in self.server.models:
+            self.send_json(404, {"error": f"model '{payload['model']}' not found"})
+            return
+        if not payload.get("stream"):
+            self.send_json(200, {"choices": [{"message": {"content": "".join(PIECES)}}],
+                                 "usage": {"completion_tokens": 3, "prompt_tokens": 7}})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        events = [{"choices": [{"delta": {"content": piece}}]} for piece in PIECES]
+        events.append({"choices": [], "usage": {"completion_tokens": 3, "prompt_tokens": 7}})
+        for event in events:
+            self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class OpenAICompatibleBackendTest(unittest.TestCase):
+    """Streaming, retries and model fallback against a local OpenAI-compatible server"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeServer)
+        self.server.models = [MODEL, FALLBACK]
+        self.server.failures = []
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        client_config = {"base_url": f"http://127.0.0.1:{self.server.server_address[1]}/v1", "retry_backoff": 0.01}
+        self.backend = OpenAICompatibleBackend(MODEL, FALLBACK, client_config, options={"num_predict": 16})
+
+    def tearDown(self):
+        self.backend.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def chat_posts(self) -> list:
+        return [payload for method, path, payload in self.server.requests if path == "/v1/chat/completions"]
+
+    def test_stream_is_decoded_as_utf8(self):
+        chunks = list(self.backend.chat(messages=[{"role": "user", "content": "hi"}], stream=True))
+        self.assertEqual([chunk["message"]["content"] for chunk in chunks[:-1]], PIECES)
+        self.assertTrue(chunks[-1]["done"])
+        self.assertEqual((chunks[-1]["eval_count"], chunks[-1]["prompt_eval_count"]), (3, 7))
+        self.assertEqual(self.chat_posts()[0]["max_tokens"], 16)
+
+    def test_missing_model_falls_back(self):
+        self.server.models = [FALLBACK]
+        with contextlib.redirect_stdout(io.StringIO()):
+            chunks = list(self.backend.chat(messages=[{"role": "user", "content": "hi"}], stream=True))
+        self.assertEqual("".join(chunk["message"]["content"] for chunk in chunks), "".join(PIECES))
+        self.assertEqual(self.backend.model, FALLBACK)
+        self.assertEqual([payload["model"] for payload in self.chat_posts()], [MODEL, FALLBACK])
+
+    def test_server_errors_are_retried(self):
+        self.server.failures = [503, 500]
+        chunk = self.backend.chat(messages=[{"role": "user", "content": "hi"}])
+        self.assertEqual(chunk["message"]["content"], "".join(PIECES))
+        self.assertEqual(len(self.chat_posts()), 3)
+        self.assertEqual(self.backend.model, MODEL)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.failures = [400]
+        with self.assertRaises(self.backend.requests.HTTPError):
+            self.backend.chat(messages=[{"role": "user", "content": "hi"}])
+        self.assertEqual(len(self.chat_posts()), 1)
+
+    def test_explicit_model_does_not_fall_back(self):
+        with self.assertRaises(self.backend.requests.HTTPError):
+            self.backend.chat(model="other-model", messages=[{"role": "user", "content": "hi"}])
+        self.assertEqual(self.backend.model, MODEL)
+
+    def test_uninstalled_model_is_resolved_from_the_model_list(self):
+        self.server.models = [FALLBACK]
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.backend.resolve_model()
+        self.assertEqual(self.backend.model, FALLBACK)
+        self.assertEqual([method for method, _, _ in self.server.requests], ["GET"])
+
+    def test_failed_model_list_does_not_fall_back(self):
+        self.server.failures = [404]
+        with self.assertRaises(self.backend.requests.HTTPError):
+            self.backend.model_names()
+        self.assertEqual(self.backend.model, MODEL)
+
+
+if __name__ == '__main__':
+    unittest.main()
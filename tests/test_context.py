@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context import MESSAGE_OVERHEAD_TOKENS, ContextManager, Conversation
+
+
+# One character per token keeps the arithmetic readable
+CONFIG = {"max_tokens": 1200, "response_reserve_tokens": 200, "min_recent_turns": 2, "chars_per_token": 1,
+          "target_ratio": 0.6}
+
+
+def make_turns(count: int, size: int = 96) -> list:
+    messages = []
+    for turn in range(count):
+        messages.append({"role": "user", "content": f"q{turn}".ljust(size, ".")})
+        messages.append({"role": "assistant", "content": f"a{turn}".ljust(size, ".")})
+    return messages
+
+
+class FakeSummarizer:
+    """Record the turns folded into the summary and name them in it"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, summary: str, messages: list) -> str:
+        self.calls.append(messages)
+        names = [m["content"].rstrip(".") for m in messages if m["role"] == "user"]
+        return " ".join(filter(None, [summary] + names))
+
+
+class ContextManagerTest(unittest.TestCase):
+    """History kept inside the token budget by folding older turns into a rolling summary"""
+
+    def setUp(self):
+        self.manager = ContextManager(CONFIG)
+        self.summarize = FakeSummarizer()
+
+    def make_conversation(self, turns: int) -> Conversation:
+        conversation = Conversation("biographical")
+        conversation.messages = make_turns(turns)
+        return conversation
+
+    def prompt_tokens(self, history: list, system_prompt: str, message: str) -> int:
+        return (self.manager.count_tokens(system_prompt) + self.manager.count_tokens(message)
+                + 2 * MESSAGE_OVERHEAD_TOKENS + self.manager.count_message_tokens(history))
+
+    def test_history_within_budget_is_sent_as_is(self):
+        conversation = self.make_conversation(3)
+        history = self.manager.prepare(conversation, "system", "hello", self.summarize)
+        self.assertEqual(history, conversation.messages)
+        self.assertEqual(self.summarize.calls, [])
+        self.assertEqual(conversation.summary_covered, 0)
+
+    def test_older_turns_are_folded_into_the_summary(self):
+        conversation = self.make_conversation(8)
+        history = self.manager.prepare(conversation, "system", "hello", self.summarize)
+
+        self.assertLessEqual(self.prompt_tokens(history, "system", "hello"), self.manager.budget)
+        self.assertEqual(history[0]["role"], "system")
+        self.assertIn(conversation.summary, history[0]["content"])
+        # Whole turns are folded, oldest first, and the newest turns are kept verbatim
+        folded = conversation.summary_covered
+        self.assertEqual(folded % 2, 0)
+        self.assertGreater(folded, 0)
+        self.assertEqual(history[1:], conversation.messages[folded:])
+        self.assertEqual(conversation.summary, " ".join(f"q{turn}" for turn in range(folded // 2)))
+
+        # The next turn within budget reuses the summary without summarizing again
+        calls = len(self.summarize.calls)
+        self.assertEqual(self.manager.prepare(conversation, "system", "hello", self.summarize), history)
+        self.assertEqual(len(self.summarize.calls), calls)
+
+    def test_recent_turns_are_never_folded(self):
+        conversation = self.make_conversation(4)
+        conversation.messages[-1]["content"] = "x" * 2000
+        history = self.manager.prepare(conversation, "system", "hello", self.summarize)
+        kept = 2 * CONFIG["min_recent_turns"]
+        self.assertEqual(conversation.summary_covered, len(conversation.messages) - kept)
+        self.assertEqual(history[-kept:], conversation.messages[-kept:])
+
+    def test_folding_is_split_into_requests_that_fit_the_budget(self):
+        conversation = self.make_conversation(20)
+        self.manager.prepare(conversation, "system", "hello", self.summarize)
+
+        self.assertGreater(len(self.summarize.calls), 1)
+        self.assertEqual(sum(len(call) for call in self.summarize.calls), conversation.summary_covered)
+        limit = self.manager.budget * self.manager.target_ratio
+        for call in self.summarize.calls:
+            self.assertEqual(len(call) % 2, 0)
+            self.assertLessEqual(self.manager.count_message_tokens(call), limit)
+
+    def test_reserved_tokens_fold_more_turns(self):
+        plain = Conversation()
+        plain.messages = make_turns(12, size=40)
+        self.manager.prepare(plain, "system", "hello", FakeSummarizer())
+        reserved = Conversation()
+        reserved.messages = make_turns(12, size=40)
+        history = self.manager.prepare(reserved, "system", "hello", FakeSummarizer(), reserved_tokens=200)
+
+        self.assertGreater(reserved.summary_covered, plain.summary_covered)
+        self.assertLessEqual(self.prompt_tokens(history, "system", "hello") + 200, self.manager.budget)
+
+    def test_failed_summary_keeps_the_turns(self):
+        def failing(summary, messages):
+            raise ConnectionError("server is down")
+
+        conversation = self.make_conversation(8)
+        history = self.manager.prepare(conversation, "system", "hello", failing)
+        self.assertEqual(history, conversation.messages)
+        self.assertEqual(conversation.summary_covered, 0)
+        self.assertEqual(conversation.summary, "")
+
+    def test_pending_summary_trims_instead_of_folding(self):
+        conversation = self.make_conversation(8)
+        conversation.summary_pending = True
+        history = self.manager.prepare(conversation, "system", "hello", self.summarize)
+
+        self.assertEqual(self.summarize.calls, [])
+        self.assertEqual(conversation.summary_covered, 0)
+        self.assertLess(len(history), len(conversation.messages))
+        self.assertEqual(history, conversation.messages[-len(history):])
+        self.assertLessEqual(self.prompt_tokens(history, "system", "hello"), self.manager.budget)
+
+    def test_available_tokens(self):
+        conversation = self.make_conversation(6)
+        conversation.summary = "s" * 50
+        conversation.summary_covered = 4
+        kept = conversation.messages[-2 * CONFIG["min_recent_turns"]:]
+        used = self.prompt_tokens(self.manager.summary_message(conversation) + kept, "system", "hello")
+        self.assertEqual(self.manager.available_tokens(conversation, "system", "hello"), self.manager.budget - used)
+        self.assertEqual(self.manager.available_tokens(conversation, "x" * 5000, "hello"), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
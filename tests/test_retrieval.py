@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retrieval import EmbeddingIndex
+
+
+TOPICS = ["garden", "school", "travel", "music"]
+
+
+def fake_embed(texts: list) -> list:
+    """Embed a text as the counts of the topic words it mentions"""
+    return [[text.lower().count(topic) for topic in TOPICS] + [0.1] for text in texts]
+
+
+def message(topic: str) -> dict:
+    return {"timestamp": "2024-05-01T10:00:00", "user": f"Tell me about the {topic}", "assistant": f"The {topic} was"}
+
+
+class EmbeddingIndexTest(unittest.TestCase):
+    """Top-k cosine retrieval over embedded bio messages"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.first = os.path.join(self.data_dir, "bio", "2024-05-01_10-00-00.json")
+        self.second = os.path.join(self.data_dir, "bio", "2024-05-02_10-00-00.jsonl")
+        self.calls = []
+        self.index = EmbeddingIndex(self.data_dir, self.embed, "fake-embed", batch_size=2)
+        self.index.sync([(self.first, seq, message(topic)) for seq, topic in enumerate(TOPICS)]
+                        + [(self.second, 0, message("garden"))])
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def embed(self, texts: list) -> list:
+        self.calls.append(len(texts))
+        return fake_embed(texts)
+
+    def test_search_ranks_by_similarity(self):
+        results = self.index.search("our garden", top_k=2)
+        self.assertEqual(len(results), 2)
+        self.assertEqual({(r["session"], r["seq"]) for r in results},
+                         {("bio/2024-05-01_10-00-00", 0), ("bio/2024-05-02_10-00-00", 0)})
+        self.assertGreaterEqual(results[0]["score"], results[1]["score"])
+
+    def test_min_score_drops_weak_matches(self):
+        results = self.index.search("music", top_k=5, min_score=0.5)
+        self.assertEqual([(r["session"], r["seq"]) for r in results], [("bio/2024-05-01_10-00-00", 3)])
+        self.assertEqual(self.index.search("weather", top_k=5, min_score=0.5), [])
+
+    def test_current_session_is_excluded(self):
+        # Sessions are identified without their extension, so a log compacted to JSON is still excluded
+        excluded = self.second[:-len('.jsonl')] + '.json'
+        results = self.index.search("garden", top_k=5, exclude_session=excluded)
+        self.assertNotIn("bio/2024-05-02_10-00-00", [r["session"] for r in results if r["score"] > 0])
+        self.assertEqual(results[0]["session"], "bio/2024-05-01_10-00-00")
+
+    def test_sync_embeds_only_new_messages_and_persists(self):
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual(self.calls, [2, 2, 1])
+        self.assertEqual(self.index.sync([(self.first, 0, message("garden")), (self.first, 4, message("school"))]), 1)
+
+        reloaded = EmbeddingIndex(self.data_dir, fake_embed, "fake-embed")
+        self.assertEqual(len(reloaded), 6)
+        self.assertEqual(reloaded.search("school", top_k=2)[0]["session"], "bio/2024-05-01_10-00-00")
+
+    def test_index_of_another_model_is_discarded(self):
+        reloaded = EmbeddingIndex(self.data_dir, fake_embed, "other-embed")
+        self.assertEqual(len(reloaded), 0)
+        self.assertEqual(reloaded.search("garden"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
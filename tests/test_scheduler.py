@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import MicroBatcher
+from scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, InferenceScheduler, QueueFullError
+
+
+class InferenceSchedulerTest(unittest.TestCase):
+    """Queue limits, priorities and the concurrency limit of the inference queue"""
+
+    def test_full_queue_rejects_requests(self):
+        scheduler = InferenceScheduler(max_concurrency=1, max_queue=2)
+        running = scheduler.enqueue("a")
+        waiting = [scheduler.enqueue("b"), scheduler.enqueue("c")]
+        with self.assertRaises(QueueFullError):
+            scheduler.enqueue("d")
+        self.assertEqual(scheduler.stats()["waiting"], 2)
+
+        # A request that leaves the queue makes room for another
+        scheduler.release(waiting[0])
+        scheduler.enqueue("d")
+        scheduler.release(running)
+
+    def test_interactive_requests_go_before_background_jobs(self):
+        scheduler = InferenceScheduler(max_concurrency=1)
+        running = scheduler.enqueue("a")
+        background = scheduler.enqueue("b", PRIORITY_BACKGROUND)
+        interactive = scheduler.enqueue("c", PRIORITY_INTERACTIVE)
+        self.assertEqual(scheduler.position(interactive), 1)
+        self.assertEqual(scheduler.position(background), 2)
+
+        scheduler.release(running)
+        self.assertIsNone(scheduler.wait(interactive, timeout=0))
+        self.assertEqual(scheduler.wait(background, timeout=0), 1)
+        scheduler.release(interactive)
+        self.assertIsNone(scheduler.wait(background, timeout=0))
+
+    def test_clients_with_fewer_requests_in_flight_go_first(self):
+        scheduler = InferenceScheduler(max_concurrency=2)
+        busy = scheduler.enqueue("a")
+        other = scheduler.enqueue("b")
+        busy_again = scheduler.enqueue("a")
+        quiet = scheduler.enqueue("c")
+
+        scheduler.release(other)
+        self.assertIsNone(scheduler.wait(quiet, timeout=0))
+        self.assertFalse(busy_again.granted)
+        scheduler.release(busy)
+        self.assertIsNone(scheduler.wait(busy_again, timeout=0))
+
+    def test_slots_respect_max_concurrency(self):
+        scheduler = InferenceScheduler(max_concurrency=2, max_queue=16)
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def job(client_id):
+            with scheduler.slot(client_id):
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                time.sleep(0.02)
+                with lock:
+                    running[0] -= 1
+
+        threads = [threading.Thread(target=job, args=(f"client-{i}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(scheduler.stats()["running"], 0)
+        self.assertEqual(scheduler.stats()["waiting"], 0)
+
+
+class MicroBatcherTest(unittest.TestCase):
+    """Background requests sent together, each within its own scheduler slot"""
+
+    def test_batched_requests_each_take_a_slot(self):
+        scheduler = InferenceScheduler(max_concurrency=2, max_queue=16)
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def run(value):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return value * 2
+
+        batcher = MicroBatcher(run, max_size=6, window=0.05, slot=lambda: scheduler.slot("batch"))
+        futures = [batcher.submit(value) for value in range(6)]
+        self.assertEqual([future.result(timeout=5) for future in futures], [value * 2 for value in range(6)])
+        self.assertEqual(peak[0], 2)
+
+    def test_full_queue_fails_only_the_request_turned_away(self):
+        scheduler = InferenceScheduler(max_concurrency=1, max_queue=1)
+        running = scheduler.enqueue("interactive")
+        waiting = scheduler.enqueue("interactive")
+        batcher = MicroBatcher(lambda value: value, max_size=2, window=0.01, slot=lambda: scheduler.slot("batch"))
+        with self.assertRaises(QueueFullError):
+            batcher.submit(1).result(timeout=5)
+
+        scheduler.release(waiting)
+        scheduler.release(running)
+        self.assertEqual(batcher.submit(2).result(timeout=5), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
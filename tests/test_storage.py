@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+import codecs
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from index import SessionIndex
+from storage import iter_session, read_message_at, read_session, tail_messages
+
+
+MESSAGES = [
+    {"timestamp": f"2024-05-0{day}T10:00:00", "user": f"Day {day}: привет, café", "assistant": f"Reply {day}"}
+    for day in range(1, 6)
+]
+
+
+class WindowsSessionFileTest(unittest.TestCase):
+    """JSON session documents saved with CRLF newlines or a byte order mark, as Windows editors do"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.data_dir, "bio"))
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def write_session(self, name: str, bom: bool = False) -> str:
+        session = {"session_type": "biographical", "start_time": MESSAGES[0]["timestamp"], "messages": MESSAGES}
+        text = json.dumps(session, ensure_ascii=False, indent=2).replace("\n", "\r\n")
+        filepath = os.path.join(self.data_dir, "bio", name)
+        with open(filepath, 'wb') as f:
+            f.write((codecs.BOM_UTF8 if bom else b"") + text.encode('utf-8'))
+        return filepath
+
+    def assert_offsets(self, filepath: str):
+        records = list(iter_session(filepath))
+        self.assertEqual([message_entry for _, _, _, message_entry in records], MESSAGES)
+        for _, offset, length, message_entry in records:
+            self.assertEqual(read_message_at(filepath, offset, length), message_entry)
+
+    def test_crlf_offsets(self):
+        self.assert_offsets(self.write_session("2024-05-01_10-00-00.json"))
+
+    def test_bom_offsets(self):
+        filepath = self.write_session("2024-05-01_10-00-00.json", bom=True)
+        self.assert_offsets(filepath)
+        self.assertEqual(read_session(filepath)["messages"], MESSAGES)
+        self.assertEqual(tail_messages(filepath, 2), MESSAGES[-2:])
+
+    def test_index_reads_crlf_messages_by_offset(self):
+        crlf_file = self.write_session("2024-05-01_10-00-00.json")
+        bom_file = self.write_session("2024-05-02_10-00-00.json", bom=True)
+        index = SessionIndex(self.data_dir, db_path=os.path.join(self.data_dir, "index.db"))
+        try:
+            index.reconcile()
+            for filepath in (crlf_file, bom_file):
+                self.assertEqual(index.message_count(filepath), len(MESSAGES))
+                self.assertEqual([index.read_message(filepath, seq) for seq in range(len(MESSAGES))], MESSAGES)
+                self.assertEqual(index.session_messages(filepath, 1, 3), MESSAGES[1:3])
+            self.assertEqual(len(index.recent_messages("bio", limit=20)), 2 * len(MESSAGES))
+        finally:
+            index.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+import gzip
+import importlib.util
+import io
+import threading
+import time
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Whisper models take 16 kHz mono audio
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03
+
+
+def is_available() -> bool:
+    """Check whether the optional faster-whisper package is installed"""
+    return importlib.util.find_spec("faster_whisper") is not None
+
+
+def to_mono_16k(sample_rate: int, samples: np.ndarray) -> np.ndarray:
+    """Convert recorded audio (integer or float, any channel count) to 16 kHz mono float32"""
+    samples = np.asarray(samples)
+    if samples.dtype.kind in 'iu':
+        samples = samples.astype(np.float32) / np.iinfo(samples.dtype).max
+    else:
+        samples = samples.astype(np.float32)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if sample_rate == SAMPLE_RATE or not len(samples):
+        return samples
+    if sample_rate % SAMPLE_RATE == 0:
+        # Browsers record at 48 kHz: averaging each group of samples also filters what 16 kHz cannot hold
+        factor = sample_rate // SAMPLE_RATE
+        return samples[:len(samples) // factor * factor].reshape(-1, factor).mean(axis=1)
+    count = int(round(len(samples) * SAMPLE_RATE / sample_rate))
+    positions = np.linspace(0, len(samples) - 1, count)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def find_pause(audio: np.ndarray, target: int, search: int) -> int:
+    """Find the quietest frame near a sample position, so audio is split between words"""
+    frame = int(SAMPLE_RATE * FRAME_SECONDS)
+    start = max(0, target - search)
+    end = min(len(audio), target + search)
+    count = (end - start) // frame
+    if count < 2:
+        return min(target, len(audio))
+    frames = audio[start:start + count * frame].reshape(count, frame)
+    quietest = int(np.argmin(np.sqrt(np.mean(frames ** 2, axis=1))))
+    return start + quietest * frame + frame // 2
+
+
+def split_segments(audio: np.ndarray, segment_seconds: float = 30.0, search_seconds: float = 2.0) -> List[np.ndarray]:
+    """Split a recording into segments of about segment_seconds, cutting at pauses"""
+    length = int(segment_seconds * SAMPLE_RATE)
+    search = int(search_seconds * SAMPLE_RATE)
+    segments = []
+    start = 0
+    while len(audio) - start > length + search:
+        cut = find_pause(audio, start + length, search)
+        segments.append(audio[start:cut])
+        start = cut
+    segments.append(audio[start:])
+    return segments
+
+
+def encode_audio(audio: np.ndarray, bitrate: int = 24000) -> Tuple[bytes, str]:
+    """Compress 16 kHz mono audio as Opus in Ogg, or as gzip-compressed WAV without PyAV"""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    try:
+        import av
+    except ImportError:
+        raw = io.BytesIO()
+        with wave.open(raw, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(SAMPLE_RATE)
+            wav.writeframes(pcm.tobytes())
+        return gzip.compress(raw.getvalue()), ".wav.gz"
+
+    output = io.BytesIO()
+    with av.open(output, mode='w', format='ogg') as container:
+        stream = container.add_stream('libopus', rate=SAMPLE_RATE)
+        stream.bit_rate = bitrate
+        stream.layout = 'mono'
+        frame = av.AudioFrame.from_ndarray(pcm.reshape(1, -1), format='s16', layout='mono')
+        frame.sample_rate = SAMPLE_RATE
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return output.getvalue(), ".ogg"
+
+
+class VoiceRecording:
+    """Audio of one recording and the transcripts of its segments, transcribed while it is recorded"""
+
+    def __init__(self, prefix: str = ""):
+        # Text typed into the input before recording started
+        self.prefix = prefix
+        self.chunks = []
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.segments = []
+
+    def audio(self) -> np.ndarray:
+        """The whole recording as 16 kHz mono samples"""
+        return np.concatenate(self.chunks + [self.pending])
+
+    def text(self, wait: bool = False) -> str:
+        """Transcript so far: the segments transcribed in order, up to the first one still in progress"""
+        parts = []
+        for segment in self.segments:
+            if not wait and not segment.done():
+                break
+            try:
+                parts.append(segment.result())
+            except Exception as e:
+                print(f"Error transcribing audio: {e}")
+        return " ".join(part for part in parts if part)
+
+    def input_text(self, wait: bool = False) -> str:
+        """Message input contents: the typed text followed by the transcript"""
+        return " ".join(part for part in (self.prefix.strip(), self.text(wait)) if part)
+
+
+class Transcriber:
+    """Local CPU speech-to-text with faster-whisper, transcribing segments on a worker pool"""
+
+    def __init__(self, voice_config: Optional[Dict] = None, metrics=None):
+        voice_config = voice_config or {}
+        self.model_size = voice_config.get("model", "small")
+        self.compute_type = voice_config.get("compute_type", "int8")
+        self.cpu_threads = voice_config.get("cpu_threads", 0)
+        self.workers = voice_config.get("workers", 2)
+        self.language = voice_config.get("language")
+        self.beam_size = voice_config.get("beam_size", 1)
+        self.stream_segment_seconds = voice_config.get("stream_segment_seconds", 8.0)
+        self.segment_seconds = voice_config.get("segment_seconds", 30.0)
+        self.search_seconds = voice_config.get("pause_search_seconds", 1.5)
+        self.bitrate = voice_config.get("bitrate", 24000)
+        self.metrics = metrics
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="transcribe")
+
+    def model(self):
+        """Load the Whisper model on first use"""
+        with self._model_lock:
+            if self._model is None:
+                from faster_whisper import WhisperModel
+                # One worker per pool thread lets CTranslate2 run the transcriptions in parallel
+                self._model = WhisperModel(self.model_size, device="cpu", compute_type=self.compute_type,
+                                           cpu_threads=self.cpu_threads, num_workers=self.workers)
+            return self._model
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        """Transcribe one segment of 16 kHz mono audio"""
+        start = time.perf_counter()
+        segments, _ = self.model().transcribe(
+            audio,
+            language=self.language,
+            beam_size=self.beam_size,
+            vad_filter=True,
+            # Segments are transcribed independently, possibly in parallel
+            condition_on_previous_text=False
+        )
+        text = " ".join(segment.text.strip() for segment in segments).strip()
+        if self.metrics is not None:
+            self.metrics.observe("transcription_seconds", time.perf_counter() - start)
+            self.metrics.inc("transcribed_audio_seconds_total", len(audio) / SAMPLE_RATE)
+        return text
+
+    def submit(self, audio: np.ndarray) -> Future:
+        return self.executor.submit(self.transcribe, audio)
+
+    def feed(self, recording: VoiceRecording, sample_rate: int, samples: np.ndarray):
+        """Add a streamed chunk to a recording, queuing each complete segment for transcription"""
+        recording.pending = np.concatenate([recording.pending, to_mono_16k(sample_rate, samples)])
+        length = int(self.stream_segment_seconds * SAMPLE_RATE)
+        search = int(self.search_seconds * SAMPLE_RATE)
+        while len(recording.pending) > length + search:
+            cut = find_pause(recording.pending, length, search)
+            recording.chunks.append(recording.pending[:cut])
+            recording.segments.append(self.submit(recording.pending[:cut]))
+            recording.pending = recording.pending[cut:]
+
+    def finish(self, recording: VoiceRecording) -> str:
+        """Transcribe the rest of a recording and return the full input text"""
+        if len(recording.pending):
+            recording.chunks.append(recording.pending)
+            recording.segments.append(self.submit(recording.pending))
+            recording.pending = np.zeros(0, dtype=np.float32)
+        return recording.input_text(wait=True)
+
+    def transcribe_file(self, filepath: str) -> Tuple[str, np.ndarray]:
+        """Transcribe an uploaded recording, its segments in parallel, and return the text and the audio"""
+        from faster_whisper import decode_audio
+        audio = decode_audio(filepath, sampling_rate=SAMPLE_RATE)
+        segments = [self.submit(segment) for segment in split_segments(audio, self.segment_seconds,
+                                                                         self.search_seconds)]
+        return " ".join(text for text in (segment.result() for segment in segments) if text), audio
+
+    def encode(self, audio: np.ndarray) -> Tuple[bytes, str]:
+        return encode_audio(audio, self.bitrate)